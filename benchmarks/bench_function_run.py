@@ -0,0 +1,54 @@
+"""
+Calls per second of `Function.run` against the validation path it replaced.
+
+Run with ``python benchmarks/bench_function_run.py``.
+"""
+
+import argparse
+import time
+
+from tool import Function
+
+
+def multiplication(x: int, y: int) -> int:
+    return x * y
+
+
+def legacy_run(function, args):
+    """The `Function.run` body before the fast path: validate, dump, compare types."""
+    validated_args = function.args_model.model_validate(args)
+    result = function._func(**validated_args.model_dump())
+    assert function.return_type == type(result)
+    return result
+
+
+def bench(label, call, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {number / elapsed:12,.0f} calls/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    function = Function(multiplication)
+    unchecked = Function(multiplication, check_return=False)
+    call_args = {"x": 25, "y": 12}
+
+    bench("direct call", lambda: multiplication(**call_args), args.number)
+    bench("legacy run", lambda: legacy_run(function, call_args), args.number)
+    bench("run", lambda: function.run(call_args), args.number)
+    bench("run, check_return=False", lambda: unchecked.run(call_args), args.number)
+    bench(
+        "run, validate=False",
+        lambda: function.run(call_args, validate=False),
+        args.number,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cold import time of the packages, against a budget.
+
+Each module is imported in a fresh interpreter with ``-X importtime`` and the
+best cumulative time of ``--repeat`` runs is compared with its budget. The run
+also fails if importing a module pulls in a heavy optional dependency (the
+ollama client stack, multiprocessing, scikit-learn, numpy or pandas).
+
+Run with ``PYTHONPATH=src python benchmarks/bench_import.py``.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Import budget of each module, in milliseconds.
+BUDGETS = {"tool": 300, "agentic.tool": 350, "agentic.planning": 350}
+
+# Modules the core packages must not import.
+HEAVY = ("ollama", "httpx", "multiprocessing", "sklearn", "numpy", "pandas")
+
+CHECK = (
+    "import sys, {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def import_time(module, repeat=5):
+    """
+    Returns the best cumulative import time of `module`, in milliseconds, and
+    the heavy modules it imported.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    best = float("inf")
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        for line in process.stderr.splitlines():
+            _, cumulative, name = line.rsplit("|", 2)
+            if name.strip() == module:
+                best = min(best, int(cumulative) / 1e3)
+    process = subprocess.run(
+        [sys.executable, "-c", CHECK.format(module=module, heavy=HEAVY)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    heavy = [name for name in process.stdout.strip().split(",") if name]
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiplies every budget, for slower machines",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        elapsed, heavy = import_time(module, args.repeat)
+        budget = BUDGETS.get(module, float("inf")) * args.scale
+        status = "ok" if elapsed <= budget else "OVER BUDGET"
+        if heavy:
+            status += f", imports {', '.join(heavy)}"
+        if status != "ok":
+            failures.append(module)
+        print(f"{module:<20} {elapsed:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
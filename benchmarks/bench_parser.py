@@ -0,0 +1,85 @@
+"""
+Throughput of the tool-call parser against the regex it replaced.
+
+Run with ``python benchmarks/bench_parser.py``.
+"""
+
+import argparse
+import json
+import re
+import time
+
+from tool import ToolCall, ToolCallParser
+
+
+def legacy_parse(content):
+    """
+    The pipeline `ToolCallProcessor` and `_is_final_response` ran before: a
+    regex scan for calls, `ToolCall` construction, and a second regex scan for
+    the final response.
+    """
+    calls = []
+    for match in re.finditer(r"<tool_calls>\n(.+)?\n</tool_calls>", content):
+        try:
+            calls.append(ToolCall(**json.loads(match.group(1))))
+        except json.JSONDecodeError:
+            pass
+    is_final = bool(re.search(r"<response>(.*?)</response>", content, re.DOTALL))
+    return calls, is_final
+
+
+def make_transcript(turns):
+    """Builds a transcript of `turns` thought/tool-call steps and a final response."""
+    parts = []
+    for i in range(turns):
+        call = {"name": "multiplication", "arguments": {"x": i, "y": 12}, "id": i}
+        parts.append(f"<thought>Step {i}: multiply {i} by 12 and keep going.</thought>")
+        parts.append(f"<tool_calls>\n{json.dumps(call)}\n</tool_calls>")
+        parts.append(f"<tool_response>{i * 12}</tool_response>")
+    parts.append("<response>All steps are done.</response>")
+    return "\n".join(parts)
+
+
+def bench(label, fn, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - start)
+    mb_per_s = len(content) / best / 1e6
+    print(f"{label:<28} {best * 1e3:10.2f} ms {mb_per_s:10.1f} MB/s")
+    return best
+
+
+def chunked(content, size=64):
+    parser = ToolCallParser()
+    for i in range(0, len(content), size):
+        parser.feed(content[i : i + size])
+    return parser
+
+
+def legacy_chunked(content, size=64):
+    """Streaming with the regex means rescanning the accumulated text per chunk."""
+    for i in range(size, len(content) + size, size):
+        legacy_parse(content[:i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for turns in args.turns:
+        content = make_transcript(turns)
+        assert len(ToolCallParser(content).calls) == len(legacy_parse(content)[0])
+        print(f"\n{turns} turns, {len(content) / 1e6:.2f} MB")
+        bench("regex (legacy)", legacy_parse, content, args.repeat)
+        bench("ToolCallParser", ToolCallParser, content, args.repeat)
+        if turns <= 100:
+            bench("regex, 64B chunks", legacy_chunked, content, 1)
+        bench("ToolCallParser, 64B chunks", chunked, content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
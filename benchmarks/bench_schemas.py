@@ -0,0 +1,42 @@
+"""
+Prompt size of a toolkit's schemas in each rendering style.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_schemas.py`` to measure the
+tools of ``notebook/functions.py``, or pass ``--module`` to measure another
+module (``--recursive`` for a package).
+"""
+
+import argparse
+import os
+import sys
+
+from tool import SCHEMA_STYLES, ToolKit
+
+NOTEBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "notebook")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="functions")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument(
+        "--styles", nargs="+", choices=SCHEMA_STYLES, default=SCHEMA_STYLES
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, NOTEBOOK)
+    toolkit = ToolKit.from_module(args.module, recursive=args.recursive)
+    reports = toolkit.schema_report(styles=args.styles)
+
+    baseline = reports[args.styles[0]].tokens
+    print(f"{len(toolkit.tools)} tools from {args.module}")
+    for report in reports.values():
+        ratio = report.tokens / baseline if baseline else 0.0
+        print(
+            f"{report.style:<10} {report.chars:8,} chars {report.tokens:8,} tokens "
+            f"{report.tokens_per_tool:8.1f} tokens/tool {ratio:6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
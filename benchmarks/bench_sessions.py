@@ -0,0 +1,83 @@
+"""
+Memory and resume latency of many paused conversations, in memory or spilled to
+a `SessionStore` log.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_sessions.py``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from agentic.session import Session
+from agentic.store import SessionStore
+
+SYSTEM = {"role": "system", "content": "You are a function calling AI model. " * 20}
+
+
+def conversation(i, turns):
+    for turn in range(turns):
+        yield {"role": "user", "content": f"Question {turn} of conversation {i}?"}
+        yield {"role": "assistant", "content": f"<response>Answer {turn}.</response>"}
+
+
+def fill(sessions, turns):
+    for i, session in enumerate(sessions):
+        session.extend(conversation(i, turns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--resident", type=int, default=100)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    sessions = [Session(SYSTEM) for _ in range(args.sessions)]
+    fill(sessions, args.turns)
+    in_memory = tracemalloc.get_traced_memory()[0]
+    del sessions
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.log")
+        tracemalloc.start()
+        store = SessionStore(path, max_resident=args.resident)
+        start = time.perf_counter()
+        sessions = [store.create(SYSTEM) for _ in range(args.sessions)]
+        fill(sessions, args.turns)
+        write = (time.perf_counter() - start) / (args.sessions * args.turns * 2)
+        ids = [session.session_id for session in sessions]
+        del sessions
+        spilled = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        store.close()
+
+        start = time.perf_counter()
+        store = SessionStore(path, max_resident=args.resident)
+        reopen = time.perf_counter() - start
+
+        sample = ids[:: max(1, len(ids) // 1000)]
+        start = time.perf_counter()
+        for session_id in sample:
+            assert len(store.get(session_id).messages) == 1 + 2 * args.turns
+        resume = (time.perf_counter() - start) / len(sample)
+        size = store.size()
+        store.close()
+
+    print(f"{args.sessions:,} sessions of {1 + 2 * args.turns} messages")
+    print(f"in memory          {in_memory / 1e6:8.1f} MB")
+    print(
+        f"store              {spilled / 1e6:8.1f} MB  "
+        f"({args.resident} resident, {size / 1e6:.1f} MB on disk)"
+    )
+    print(f"append             {write * 1e6:8.1f} us/message")
+    print(f"reopen             {reopen * 1e3:8.1f} ms")
+    print(f"resume             {resume * 1e6:8.1f} us/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Offline benchmark suite of the agent hot path, tracked across commits.
+
+Every measurement runs against `ScriptedClient`, so no Ollama server is needed:
+
+* agent loop: per-step overhead of `PlanningAgent` (blocking and streamed) and
+  per-message overhead of `ToolAgent`, with a zero-latency client;
+* parser: `parse_tool_calls` throughput on a 1000-turn transcript;
+* toolkit: `ToolKit` construction time at 10, 100 and 1000 tools;
+* function: `Function.run` calls per second;
+* import: cold import time of `tool` and `agentic.planning`.
+
+Results are appended to ``benchmarks/results.jsonl``, a local history that is
+not tracked by git, with the current commit, and compared with the last result recorded on the same machine at another
+commit. A metric that got worse by more than ``--threshold`` is reported as a
+regression and makes the script exit with status 1.
+
+Run with ``PYTHONPATH=src python benchmarks/run_suite.py``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from bench_import import import_time
+from bench_parser import make_transcript
+from scripted_client import ScriptedClient
+
+from agentic.planning import PlanningAgent
+from agentic.tool import ToolAgent
+from tool import Function, ToolCallParser, ToolKit, parse_tool_calls
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS = os.path.join(HERE, "results.jsonl")
+
+# Unit and direction ("higher" or "lower" is better) of each metric.
+METRICS = {
+    "planning_step_us": ("us/step", "lower"),
+    "planning_stream_step_us": ("us/step", "lower"),
+    "tool_agent_start_us": ("us/message", "lower"),
+    "tool_agent_native_start_us": ("us/message", "lower"),
+    "parse_tool_calls_mb_s": ("MB/s", "higher"),
+    "repair_tool_call_us": ("us/call", "lower"),
+    "toolkit_build_10_ms": ("ms", "lower"),
+    "toolkit_build_100_ms": ("ms", "lower"),
+    "toolkit_build_1000_ms": ("ms", "lower"),
+    "function_run_calls_s": ("calls/s", "higher"),
+    "import_tool_ms": ("ms", "lower"),
+    "import_agentic_ms": ("ms", "lower"),
+}
+
+
+def multiplication(x: int, y: int) -> int:
+    return x * y
+
+
+def best_of(fn, repeat, number=1):
+    """Returns the best time of `repeat` rounds of `number` calls, per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def planning_script(steps):
+    """`steps` turns of one tool call each, then the final response."""
+    script = []
+    for i in range(steps):
+        call = {"name": "multiplication", "arguments": {"x": i, "y": 12}, "id": i}
+        script.append(
+            f"<thought>Step {i}: multiply {i} by 12.</thought>\n"
+            f"<tool_calls>\n{json.dumps(call)}\n</tool_calls>"
+        )
+    script.append("<thought>Done.</thought>\n<response>All steps are done.</response>")
+    return script
+
+
+def bench_agent_loop(repeat, steps=10):
+    script = planning_script(steps)
+    results = {}
+    for stream in (False, True):
+        agent = PlanningAgent(
+            client=ScriptedClient(script),
+            model="scripted",
+            toolkit=[multiplication],
+            max_iter=steps + 1,
+            stream=stream,
+        )
+        result = agent.run("Multiply.")
+        assert result.completed and result.iterations == steps + 1
+        name = "planning_stream_step_us" if stream else "planning_step_us"
+        results[name] = (
+            best_of(lambda: agent.start("Multiply."), repeat) / (steps + 1) * 1e6
+        )
+
+    call = {"name": "multiplication", "arguments": {"x": 25, "y": 12}, "id": 0}
+    tool_call = f"<tool_call>\n{json.dumps(call)}\n</tool_call>"
+    agent = ToolAgent(
+        # The answer request holds the tool results but no assistant message.
+        client=ScriptedClient(
+            lambda messages: "300" if messages[-1]["role"] == "tool" else tool_call
+        ),
+        model="scripted",
+        toolkit=[multiplication],
+    )
+    results["tool_agent_start_us"] = (
+        best_of(lambda: agent.start("Multiply."), repeat, 50) * 1e6
+    )
+
+    function = {"name": call["name"], "arguments": call["arguments"]}
+    native_call = {"content": "", "tool_calls": [{"function": function}]}
+    agent = ToolAgent(
+        client=ScriptedClient(
+            lambda messages: "300" if messages[-1]["role"] == "tool" else native_call
+        ),
+        model="scripted",
+        toolkit=[multiplication],
+        tool_mode="native",
+    )
+    results["tool_agent_native_start_us"] = (
+        best_of(lambda: agent.start("Multiply."), repeat, 50) * 1e6
+    )
+    return results
+
+
+def bench_parser(repeat, turns=1000):
+    content = make_transcript(turns)
+    assert len(parse_tool_calls(content)) == turns
+    elapsed = best_of(lambda: parse_tool_calls(content), repeat)
+
+    # Python literals, single quotes, a trailing comma and no id.
+    malformed = "<tool_call>{'name': 'f', 'arguments': {'flag': True,}}</tool_call>"
+    assert len(ToolCallParser(malformed).calls) == 1
+    repair = best_of(lambda: ToolCallParser(malformed), repeat, 1000)
+    return {
+        "parse_tool_calls_mb_s": len(content) / elapsed / 1e6,
+        "repair_tool_call_us": repair * 1e6,
+    }
+
+
+def make_functions(count):
+    """
+    Generates `count` distinct module-level style functions with a mix of
+    signatures, as a large toolkit would hold.
+    """
+    annotations = ("int", "float", "str", "bool")
+    namespace = {}
+    functions = []
+    for i in range(count):
+        params = ", ".join(
+            f"arg_{j}: {annotations[(i + j) % len(annotations)]}"
+            for j in range(i % 4 + 1)
+        )
+        source = (
+            f"def tool_{i}({params}) -> str:\n"
+            f"    '''Tool number {i}.'''\n"
+            f"    return 'tool_{i}'\n"
+        )
+        exec(source, namespace)
+        functions.append(namespace[f"tool_{i}"])
+    return functions
+
+
+def bench_toolkit(repeat, sizes=(10, 100, 1000)):
+    results = {}
+    for size in sizes:
+        functions = make_functions(size)
+        elapsed = best_of(lambda: ToolKit(tools=functions), max(1, repeat * 10 // size))
+        results[f"toolkit_build_{size}_ms"] = elapsed * 1e3
+    return results
+
+
+def bench_function_run(repeat, number=50_000):
+    function = Function(multiplication)
+    call_args = {"x": 25, "y": 12}
+    elapsed = best_of(lambda: function.run(call_args), repeat, number)
+    return {"function_run_calls_s": 1 / elapsed}
+
+
+def bench_import(repeat):
+    return {
+        "import_tool_ms": import_time("tool", repeat)[0],
+        "import_agentic_ms": import_time("agentic.planning", repeat)[0],
+    }
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or None
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    return commit, dirty
+
+
+def machine():
+    return f"{platform.node()} {platform.machine()} {platform.python_version()}"
+
+
+def load_records(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def find_baseline(records, record):
+    """The last record of the same machine at another commit (or a clean tree)."""
+    for previous in reversed(records):
+        if previous["machine"] != record["machine"]:
+            continue
+        if previous["commit"] != record["commit"] or record["dirty"]:
+            return previous
+    return None
+
+
+def compare(baseline, results, threshold):
+    """
+    Prints each metric with its change against the baseline and returns the
+    names of the metrics that got worse by more than `threshold`.
+    """
+    regressions = []
+    if baseline is not None:
+        print(f"baseline: {baseline['commit']} ({baseline['timestamp']})")
+    for name, value in results.items():
+        unit, better = METRICS[name]
+        line = f"{name:<28} {value:14,.2f} {unit:<11}"
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous:
+            change = value / previous - 1
+            worse = -change if better == "higher" else change
+            line += f" {change:+8.1%}"
+            if worse > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line.rstrip())
+    return regressions
+
+
+SUITES = {
+    "agent": bench_agent_loop,
+    "parser": bench_parser,
+    "toolkit": bench_toolkit,
+    "function": bench_function_run,
+    "import": bench_import,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(SUITES), default=list(SUITES)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative slowdown reported as a regression, by default 0.15",
+    )
+    parser.add_argument("--results", default=RESULTS, help="the JSON lines history")
+    parser.add_argument(
+        "--no-save", action="store_true", help="compare without recording the run"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        results.update(SUITES[name](args.repeat))
+
+    commit, dirty = git_commit()
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine(),
+        "results": results,
+    }
+    regressions = compare(
+        find_baseline(load_records(args.results), record), results, args.threshold
+    )
+
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Deterministic stand-ins for the Ollama clients, for offline benchmarks.
+
+The replies are chosen from the conversation itself (the number of assistant
+messages already in it), so a client is stateless and can serve any number of
+runs, sessions and threads.
+"""
+
+import asyncio
+import time
+from typing import Callable, List, Sequence, Union
+
+Reply = Union[str, dict]
+Script = Union[Sequence[Reply], Callable[[List[dict]], Reply]]
+
+
+def _approx_tokens(text):
+    return (len(text) + 3) // 4
+
+
+class ScriptedClient:
+    """
+    Replays scripted `chat` responses with a configurable latency.
+
+    Parameters
+    ----------
+    script : Union[Sequence[Reply], Callable[[List[dict]], Reply]]
+        The replies, indexed by the number of assistant messages in the request
+        (the last one is repeated), or a function of the request messages. A reply
+        is the text of the message, or a dict with its "content" and native
+        "tool_calls".
+    latency : float, optional
+        Seconds spent before the first token, simulating prompt evaluation.
+    per_token : float, optional
+        Seconds spent per generated token, simulating decoding.
+    chunk_size : int, optional
+        Characters per streamed chunk, by default 4 (about one token).
+
+    Attributes
+    ----------
+    requests : int
+        Number of `chat` calls served.
+    """
+
+    def __init__(
+        self,
+        script: Script,
+        latency: float = 0.0,
+        per_token: float = 0.0,
+        chunk_size: int = 4,
+    ):
+        self.script = script
+        self.latency = latency
+        self.per_token = per_token
+        self.chunk_size = chunk_size
+        self.requests = 0
+
+    def reply(self, messages: List[dict]) -> dict:
+        if callable(self.script):
+            reply = self.script(messages)
+        else:
+            turn = sum(1 for message in messages if message["role"] == "assistant")
+            reply = self.script[min(turn, len(self.script) - 1)]
+        if isinstance(reply, str):
+            reply = {"content": reply}
+        return {"role": "assistant", "content": "", **reply}
+
+    def _stats(self, messages, content):
+        prompt_tokens = sum(_approx_tokens(message["content"]) for message in messages)
+        eval_tokens = _approx_tokens(content)
+        decode = self.per_token * eval_tokens
+        return {
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": eval_tokens,
+            "prompt_eval_duration": int(self.latency * 1e9),
+            "eval_duration": int(decode * 1e9),
+            "total_duration": int((self.latency + decode) * 1e9),
+            "load_duration": 0,
+        }
+
+    def _chunks(self, content):
+        size = self.chunk_size
+        for i in range(0, len(content), size):
+            yield content[i : i + size]
+
+    def chat(self, model: str = "", messages: List[dict] = None, stream=False, **_):
+        self.requests += 1
+        message = self.reply(messages)
+        content = message["content"]
+        if self.latency:
+            time.sleep(self.latency)
+        if stream:
+            return self._stream(messages, message)
+        if self.per_token:
+            time.sleep(self.per_token * _approx_tokens(content))
+        return {
+            "model": model,
+            "message": message,
+            **self._stats(messages, content),
+        }
+
+    def _stream(self, messages, message):
+        content = message["content"]
+        per_chunk = self.per_token * self.chunk_size / 4
+        for chunk in self._chunks(content):
+            if per_chunk:
+                time.sleep(per_chunk)
+            yield {"message": {"role": "assistant", "content": chunk}, "done": False}
+        if message.get("tool_calls"):
+            yield {"message": {**message, "content": ""}, "done": False}
+        yield {
+            "message": {"role": "assistant", "content": ""},
+            **self._stats(messages, content),
+        }
+
+
+class AsyncScriptedClient(ScriptedClient):
+    """
+    The `ollama.AsyncClient` counterpart of `ScriptedClient`.
+    """
+
+    async def chat(
+        self, model: str = "", messages: List[dict] = None, stream=False, **_
+    ):
+        self.requests += 1
+        message = self.reply(messages)
+        content = message["content"]
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if stream:
+            return self._astream(messages, message)
+        if self.per_token:
+            await asyncio.sleep(self.per_token * _approx_tokens(content))
+        return {
+            "model": model,
+            "message": message,
+            **self._stats(messages, content),
+        }
+
+    async def _astream(self, messages, message):
+        content = message["content"]
+        per_chunk = self.per_token * self.chunk_size / 4
+        for chunk in self._chunks(content):
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield {"message": {"role": "assistant", "content": chunk}, "done": False}
+        if message.get("tool_calls"):
+            yield {"message": {**message, "content": ""}, "done": False}
+        yield {
+            "message": {"role": "assistant", "content": ""},
+            **self._stats(messages, content),
+        }
@@ -0,0 +1,609 @@
+import difflib
+import re
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Iterator, List, Tuple
+
+from agentic.batch import BatchResult, aiter_batch, iter_batch
+from agentic.session import Session
+from tool import span
+
+if TYPE_CHECKING:
+    from ollama import AsyncClient, Client
+
+GENERATION_PROMPT = """
+Your task is to generate the most optimized and well-structured Python code based on the user's request.
+
+1. **Code Generation:** Create code that meets the user's requirements while ensuring it is efficient and follows best practices.
+
+2. **Feedback Incorporation:** If the user provides feedback or critique, revise your previous code accordingly. Ensure that the revised code reflects the user's input.
+
+3. **Quality Assurance:** Always maintain a focus on producing code of the highest quality, adhering to Python's PEP guidelines and prioritizing readability.
+"""
+
+REFLECTION_PROMPT = """
+You are tasked with analyzing candidate answers to the user's request. You will give feedbacks and recommendations for each of them.
+The candidates are enclosed within <candidate id="..."></candidate> XML tags.
+
+1.Critique: For each candidate, if there are any issues, inefficiencies, or areas for improvement, provide a detailed list of specific critiques and actionable recommendations without including any Python code in your response.
+Enclose the critique of each candidate within <critique id="..."></critique> XML tags, using the id of the candidate.
+
+2.Focus Areas: Pay special attention to:
+    - Code readability
+    - Conformity to Python's PEP guidelines
+    - Quality of documentation (comments and docstrings)
+
+3.Selection: Give the id of the best candidate within <best></best> XML tags.
+
+4.Conclusion: If the best candidate is well-written and requires no changes, offer a few positive comments about its strengths, then output the token `<DONE>` exactly.
+"""
+
+DONE_TOKEN = "<DONE>"
+
+STATUSES = ("done", "converged", "max_iter")
+
+_CRITIQUE = re.compile(r"<critique\s+id=\"?(\d+)\"?\s*>(.*?)</critique>", re.DOTALL)
+_BEST = re.compile(r"<best>\s*(\d+)\s*</best>")
+
+
+def render_candidates(message: str, drafts: List[str]) -> str:
+    """
+    Builds the request of a batched critique: the user's request and every draft.
+    """
+    parts = [f"<request>{message}</request>"]
+    for i, draft in enumerate(drafts):
+        parts.append(f'<candidate id="{i}">\n{draft}\n</candidate>')
+    return "\n".join(parts)
+
+
+def parse_critique(content: str, count: int) -> Tuple[List[str], int, bool]:
+    """
+    Splits a batched critique into the critique of each candidate.
+
+    Parameters
+    ----------
+    content : str
+        The critic's response.
+    count : int
+        Number of candidates.
+
+    Returns
+    -------
+    Tuple[List[str], int, bool]
+        The critique of each candidate, the index of the best one and whether the
+        critic accepted it. A candidate without its own `<critique>` block gets the
+        whole response, and an invalid `<best>` selects the first candidate.
+    """
+    critiques = [content] * count
+    for match in _CRITIQUE.finditer(content):
+        index = int(match.group(1))
+        if index < count:
+            critiques[index] = match.group(2).strip()
+    best = _BEST.search(content)
+    best = int(best.group(1)) if best is not None else 0
+    if best >= count:
+        best = 0
+    return critiques, best, DONE_TOKEN in content
+
+
+def critique_change(previous: str, current: str) -> float:
+    """
+    Measures how much a critique changed between two rounds.
+
+    Returns
+    -------
+    float
+        0 for identical critiques up to 1 for critiques sharing no words.
+    """
+    matcher = difflib.SequenceMatcher(None, previous.split(), current.split())
+    return 1.0 - matcher.ratio()
+
+
+class ReflectionResult:
+    """
+    The outcome of a reflection run.
+
+    Attributes
+    ----------
+    content : str
+        The best draft of the last round.
+    status : str
+        Why revising stopped: "done" when the critic accepted the best draft,
+        "converged" when the critique stopped changing, or "max_iter".
+    rounds : int
+        Rounds of generation and critique.
+    drafts : List[str]
+        The drafts of the last round.
+    critiques : List[str]
+        The critique of each draft of the last round.
+    best : int
+        Index of the best draft of the last round.
+    sessions : List[Session]
+        The generation history of each candidate.
+    """
+
+    __slots__ = (
+        "content",
+        "status",
+        "rounds",
+        "drafts",
+        "critiques",
+        "best",
+        "sessions",
+    )
+
+    def __init__(
+        self,
+        status: str,
+        rounds: int,
+        drafts: List[str],
+        critiques: List[str],
+        best: int,
+        sessions: List[Session],
+    ):
+        self.content = drafts[best]
+        self.status = status
+        self.rounds = rounds
+        self.drafts = drafts
+        self.critiques = critiques
+        self.best = best
+        self.sessions = sessions
+
+    def __repr__(self):
+        return (
+            f"ReflectionResult(status={self.status!r}, rounds={self.rounds}, "
+            f"drafts={len(self.drafts)}, best={self.best})"
+        )
+
+
+class _ReflectionRun:
+    """
+    The state of a reflection run between rounds. It holds the stop decision, so
+    the sync and async agents only differ by how they wait for the model.
+    """
+
+    __slots__ = (
+        "sessions",
+        "previous",
+        "rounds",
+        "status",
+        "drafts",
+        "critiques",
+        "best",
+    )
+
+    def __init__(self, sessions: List[Session]):
+        self.sessions = sessions
+        self.previous = None
+        self.rounds = 0
+        self.status = None
+
+    def review(
+        self,
+        sessions: List[Session],
+        drafts: List[str],
+        critique: str,
+        max_iter: int,
+        min_change: float,
+    ):
+        """
+        Records the drafts and the critique of a round and decides whether to stop,
+        handing the critiques to the candidates for the next round otherwise.
+        """
+        self.rounds += 1
+        self.sessions = sessions
+        self.drafts = drafts
+        for session, draft in zip(sessions, drafts):
+            session.append({"role": "assistant", "content": draft})
+
+        self.critiques, self.best, done = parse_critique(critique, len(drafts))
+        if done:
+            self.status = "done"
+        elif (
+            self.previous is not None
+            and critique_change(self.previous, critique) < min_change
+        ):
+            self.status = "converged"
+        elif self.rounds >= max_iter:
+            self.status = "max_iter"
+        else:
+            for session, feedback in zip(sessions, self.critiques):
+                session.append({"role": "user", "content": feedback})
+        self.previous = critique
+
+    def result(self) -> ReflectionResult:
+        return ReflectionResult(
+            self.status,
+            self.rounds,
+            self.drafts,
+            self.critiques,
+            self.best,
+            self.sessions,
+        )
+
+
+class ReflectionAgent:
+    """
+    An agent that answers through rounds of generation, critique and revision.
+
+    Each round generates (or revises) `candidates` drafts concurrently, then a
+    critic reviews all of them in a single request, picks the best one and
+    critiques each. Revising stops when the critic accepts the best draft, when
+    the critique changes by less than `min_change` from one round to the next,
+    or after `max_iter` rounds. A round costs two sequential round trips however
+    many candidates there are.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the ReflectionAgent instance.
+    client : Client
+        A client instance to interact with the AI model.
+    model : str
+        Model identifier for the AI model to use.
+    generation_prompt : str, optional
+        System message of the generator, by default GENERATION_PROMPT.
+    reflection_prompt : str, optional
+        System message of the critic, by default REFLECTION_PROMPT. It must ask
+        for `<critique id="...">`, `<best>` and `<DONE>` as the default does.
+    candidates : int, optional
+        Number of drafts generated concurrently at each round, by default 3.
+        Drafts differ through the model's sampling, so keep a non-zero temperature.
+    max_iter : int, optional
+        Maximum number of rounds, at least 1, by default 5.
+    min_change : float, optional
+        Revising stops when the critique changed by less than this fraction of its
+        words since the previous round, by default 0.1. Set it to 0 to only stop
+        on `<DONE>` or `max_iter`.
+
+    Attributes
+    ----------
+    name : str
+        Name of the agent.
+    client : Client
+        The client instance to interact with the AI model.
+    model : str
+        The model identifier for the AI model in use.
+
+    Methods
+    -------
+    run(message: str) -> ReflectionResult
+        Answers a message and returns the drafts, critiques and stop reason.
+    start(message: str) -> str
+        Answers a message with the best draft.
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        client: "Client" = None,
+        model: str = None,
+        generation_prompt: str = GENERATION_PROMPT,
+        reflection_prompt: str = REFLECTION_PROMPT,
+        candidates: int = 3,
+        max_iter: int = 5,
+        min_change: float = 0.1,
+    ):
+        if candidates < 1:
+            raise ValueError("candidates must be at least 1")
+        if max_iter < 1:
+            raise ValueError("max_iter must be at least 1")
+        self.name = name
+        self.client = client
+        self.model = model
+        self.candidates = candidates
+        self.max_iter = max_iter
+        self.min_change = min_change
+        self._generation_system = {"role": "system", "content": generation_prompt}
+        self._reflection_system = {"role": "system", "content": reflection_prompt}
+
+    def sessions(self, message: str) -> List[Session]:
+        """
+        Creates the generation history of each candidate, starting with `message`.
+        """
+        sessions = []
+        for _ in range(self.candidates):
+            session = Session(self._generation_system)
+            session.append({"role": "user", "content": message})
+            sessions.append(session)
+        return sessions
+
+    def _chat(self, messages: List[dict], role: str) -> str:
+        with span("llm.chat", model=self.model, role=role) as chat_span:
+            response = self.client.chat(model=self.model, messages=messages)
+            chat_span.record_response(response)
+        return response["message"]["content"]
+
+    def _generate(self, sessions: List[Session]) -> Tuple[List[Session], List[str]]:
+        """
+        Generates the next draft of every candidate concurrently.
+
+        Returns
+        -------
+        Tuple[List[Session], List[str]]
+            The candidates whose request succeeded, with their drafts. Failed
+            candidates are dropped.
+
+        Raises
+        ------
+        Exception
+            The error of the first candidate, if every request failed.
+        """
+        results = iter_batch(
+            lambda session: self._chat(session.messages, "generator"),
+            sessions,
+            max_concurrency=len(sessions),
+        )
+        return _collect(sorted(results, key=lambda result: result.index))
+
+    def _critique(self, message: str, drafts: List[str]) -> str:
+        messages = [
+            self._reflection_system,
+            {"role": "user", "content": render_candidates(message, drafts)},
+        ]
+        return self._chat(messages, "critic")
+
+    def run(self, message: str) -> ReflectionResult:
+        """
+        Answers a message through rounds of concurrent drafts and batched critiques.
+
+        Parameters
+        ----------
+        message : str
+            The user's request.
+
+        Returns
+        -------
+        ReflectionResult
+            The best draft, with the last round's drafts and critiques.
+        """
+        with span("agent.run", agent=type(self).__name__, model=self.model) as run_span:
+            state = _ReflectionRun(self.sessions(message))
+            while state.status is None:
+                with span(
+                    "reflection.round",
+                    round=state.rounds + 1,
+                    candidates=len(state.sessions),
+                ):
+                    sessions, drafts = self._generate(state.sessions)
+                    critique = self._critique(message, drafts)
+                    state.review(
+                        sessions, drafts, critique, self.max_iter, self.min_change
+                    )
+
+            run_span.set(status=state.status, rounds=state.rounds)
+            return state.result()
+
+    def start(self, message: str) -> str:
+        """
+        Answers a message with the best draft of the last round.
+
+        Parameters
+        ----------
+        message : str
+            The user's request.
+
+        Returns
+        -------
+        str
+            The best draft. Use `run` for the critiques and the stop reason.
+        """
+        return self.run(message).content
+
+    def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently. See `ToolAgent.start_many`.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`.
+        """
+        results = list(self.iter_many(messages, max_concurrency=max_concurrency))
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> Iterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        Iterator[BatchResult]
+            The results, in completion order.
+        """
+        return iter_batch(self.start, messages, max_concurrency=max_concurrency)
+
+
+def _collect(results: List[BatchResult]) -> Tuple[List[Session], List[str]]:
+    ok = [result for result in results if result.ok]
+    if not ok:
+        raise results[0].error
+    return [result.message for result in ok], [result.response for result in ok]
+
+
+class AsyncReflectionAgent(ReflectionAgent):
+    """
+    A `ReflectionAgent` that runs on an event loop.
+
+    Chat requests go through `ollama.AsyncClient`; the drafts of a round are
+    concurrent tasks.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the AsyncReflectionAgent instance.
+    client : AsyncClient
+        An asynchronous client instance to interact with the AI model.
+    model : str
+        Model identifier for the AI model to use.
+    generation_prompt : str, optional
+        System message of the generator, by default GENERATION_PROMPT.
+    reflection_prompt : str, optional
+        System message of the critic, by default REFLECTION_PROMPT.
+    candidates : int, optional
+        Number of drafts generated concurrently at each round, by default 3.
+    max_iter : int, optional
+        Maximum number of rounds, at least 1, by default 5.
+    min_change : float, optional
+        Revising stops when the critique changed by less than this fraction of its
+        words since the previous round, by default 0.1.
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        client: "AsyncClient" = None,
+        model: str = None,
+        generation_prompt: str = GENERATION_PROMPT,
+        reflection_prompt: str = REFLECTION_PROMPT,
+        candidates: int = 3,
+        max_iter: int = 5,
+        min_change: float = 0.1,
+    ):
+        super().__init__(
+            name=name,
+            client=client,
+            model=model,
+            generation_prompt=generation_prompt,
+            reflection_prompt=reflection_prompt,
+            candidates=candidates,
+            max_iter=max_iter,
+            min_change=min_change,
+        )
+
+    async def _chat(self, messages: List[dict], role: str) -> str:
+        with span("llm.chat", model=self.model, role=role) as chat_span:
+            response = await self.client.chat(model=self.model, messages=messages)
+            chat_span.record_response(response)
+        return response["message"]["content"]
+
+    async def _generate(
+        self, sessions: List[Session]
+    ) -> Tuple[List[Session], List[str]]:
+        results = [
+            result
+            async for result in aiter_batch(
+                lambda session: self._chat(session.messages, "generator"),
+                sessions,
+                max_concurrency=len(sessions),
+            )
+        ]
+        return _collect(sorted(results, key=lambda result: result.index))
+
+    async def _critique(self, message: str, drafts: List[str]) -> str:
+        messages = [
+            self._reflection_system,
+            {"role": "user", "content": render_candidates(message, drafts)},
+        ]
+        return await self._chat(messages, "critic")
+
+    async def run(self, message: str) -> ReflectionResult:
+        """
+        Answers a message through rounds of concurrent drafts and batched critiques.
+
+        Parameters
+        ----------
+        message : str
+            The user's request.
+
+        Returns
+        -------
+        ReflectionResult
+            The best draft, with the last round's drafts and critiques.
+        """
+        with span("agent.run", agent=type(self).__name__, model=self.model) as run_span:
+            state = _ReflectionRun(self.sessions(message))
+            while state.status is None:
+                with span(
+                    "reflection.round",
+                    round=state.rounds + 1,
+                    candidates=len(state.sessions),
+                ):
+                    sessions, drafts = await self._generate(state.sessions)
+                    critique = await self._critique(message, drafts)
+                    state.review(
+                        sessions, drafts, critique, self.max_iter, self.min_change
+                    )
+
+            run_span.set(status=state.status, rounds=state.rounds)
+            return state.result()
+
+    async def start(self, message: str) -> str:
+        """
+        Answers a message with the best draft of the last round.
+
+        Parameters
+        ----------
+        message : str
+            The user's request.
+
+        Returns
+        -------
+        str
+            The best draft. Use `run` for the critiques and the stop reason.
+        """
+        return (await self.run(message)).content
+
+    async def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently. See `ToolAgent.start_many`.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`.
+        """
+        results = [
+            result
+            async for result in self.iter_many(
+                messages, max_concurrency=max_concurrency
+            )
+        ]
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        AsyncIterator[BatchResult]
+            The results, in completion order.
+        """
+        return aiter_batch(self.start, messages, max_concurrency=max_concurrency)
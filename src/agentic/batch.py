@@ -0,0 +1,144 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+
+
+class BatchResult:
+    """
+    The outcome of one message of a batch.
+
+    Attributes
+    ----------
+    index : int
+        Position of the message in the batch.
+    message : str
+        The message sent to the agent.
+    response : Any
+        The agent's response, or `None` if it failed.
+    error : Exception
+        The exception raised while serving the message, or `None`.
+    """
+
+    __slots__ = ("index", "message", "response", "error")
+
+    def __init__(
+        self, index: int, message: str, response: Any = None, error: Exception = None
+    ):
+        self.index = index
+        self.message = message
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = f"response={self.response!r}" if self.ok else f"error={self.error!r}"
+        return f"BatchResult(index={self.index}, {outcome})"
+
+
+def _serve(start: Callable[[str], Any], index: int, message: str) -> BatchResult:
+    try:
+        return BatchResult(index, message, response=start(message))
+    except Exception as e:
+        return BatchResult(index, message, error=e)
+
+
+async def _aserve(
+    start: Callable[[str], Awaitable[Any]], index: int, message: str
+) -> BatchResult:
+    try:
+        return BatchResult(index, message, response=await start(message))
+    except Exception as e:
+        return BatchResult(index, message, error=e)
+
+
+def iter_batch(
+    start: Callable[[str], Any], messages: Iterable[str], max_concurrency: int = 8
+) -> Iterator[BatchResult]:
+    """
+    Serves messages on a thread pool and yields the results as they complete.
+
+    At most `max_concurrency` messages are in flight; the next message is only
+    taken from `messages` when one completes, so a lazy iterable is consumed at
+    the pace of the backend. Exceptions are captured in the result of the message
+    that raised them and do not stop the batch.
+
+    Parameters
+    ----------
+    start : Callable[[str], Any]
+        Serves a single message, typically an agent's `start` method.
+    messages : Iterable[str]
+        The messages to serve.
+    max_concurrency : int, optional
+        Maximum number of messages served at the same time, by default 8.
+
+    Yields
+    ------
+    BatchResult
+        The result of each message, in completion order.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    items = enumerate(messages)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        pending = set()
+        while True:
+            for index, message in items:
+                pending.add(executor.submit(_serve, start, index, message))
+                if len(pending) == max_concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+async def aiter_batch(
+    start: Callable[[str], Awaitable[Any]],
+    messages: Iterable[str],
+    max_concurrency: int = 8,
+) -> AsyncIterator[BatchResult]:
+    """
+    Serves messages as concurrent tasks and yields the results as they complete.
+
+    The asynchronous counterpart of `iter_batch`, with the same backpressure and
+    error isolation.
+
+    Parameters
+    ----------
+    start : Callable[[str], Awaitable[Any]]
+        Serves a single message, typically an async agent's `start` method.
+    messages : Iterable[str]
+        The messages to serve.
+    max_concurrency : int, optional
+        Maximum number of messages served at the same time, by default 8.
+
+    Yields
+    ------
+    BatchResult
+        The result of each message, in completion order.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    items = enumerate(messages)
+    pending = set()
+    try:
+        while True:
+            for index, message in items:
+                pending.add(asyncio.ensure_future(_aserve(start, index, message)))
+                if len(pending) == max_concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        # The consumer stopped early: do not leave orphan tasks behind.
+        for task in pending:
+            task.cancel()
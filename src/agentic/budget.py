@@ -0,0 +1,182 @@
+import time
+from typing import Any, Optional
+
+from agentic.context import approx_token_count
+from agentic.session import Session
+
+STATUSES = ("completed", "max_iter", "timeout", "max_tokens")
+
+
+class Budget:
+    """
+    Hard limits of a single agent run.
+
+    Parameters
+    ----------
+    max_iter : int, optional
+        Maximum number of model turns. Defaults to the agent's `max_iter`.
+    timeout : float, optional
+        Wall-clock deadline of the run, in seconds. Streams are stopped and tool
+        calls abandoned when it passes; a blocking (non-streamed) request of a
+        synchronous agent is only bounded by the client's own timeout. By default
+        the run is not timed.
+    max_tokens : int, optional
+        Maximum number of tokens the model may generate over the whole run. Each
+        request is capped with `num_predict`. By default generation is not limited.
+    """
+
+    __slots__ = ("max_iter", "timeout", "max_tokens")
+
+    def __init__(
+        self,
+        max_iter: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        self.max_iter = max_iter
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+
+    def start(self, max_iter: int) -> "BudgetMeter":
+        """
+        Starts measuring a run against this budget.
+
+        Parameters
+        ----------
+        max_iter : int
+            The iteration limit used when the budget does not set one.
+
+        Returns
+        -------
+        BudgetMeter
+            The consumption of the run, starting now.
+        """
+        return BudgetMeter(
+            self, self.max_iter if self.max_iter is not None else max_iter
+        )
+
+    def __repr__(self):
+        return (
+            f"Budget(max_iter={self.max_iter}, timeout={self.timeout}, "
+            f"max_tokens={self.max_tokens})"
+        )
+
+
+class BudgetMeter:
+    """
+    The consumption of a `Budget` during one run.
+
+    Attributes
+    ----------
+    iterations : int
+        Model turns completed.
+    tokens : int
+        Tokens generated, as reported by the backend (`eval_count`) or estimated.
+    """
+
+    __slots__ = ("budget", "max_iter", "iterations", "tokens", "_started_at")
+
+    def __init__(self, budget: Budget, max_iter: int):
+        self.budget = budget
+        self.max_iter = max_iter
+        self.iterations = 0
+        self.tokens = 0
+        self._started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started_at
+
+    def remaining_time(self) -> Optional[float]:
+        """
+        Returns the seconds left before the deadline, or `None` if there is none.
+        """
+        if self.budget.timeout is None:
+            return None
+        return max(0.0, self.budget.timeout - self.elapsed)
+
+    def remaining_tokens(self) -> Optional[int]:
+        """
+        Returns the tokens the model may still generate, or `None` if unlimited.
+        """
+        if self.budget.max_tokens is None:
+            return None
+        return max(0, self.budget.max_tokens - self.tokens)
+
+    def expired(self) -> bool:
+        return self.remaining_time() == 0.0
+
+    def exhausted(self) -> Optional[str]:
+        """
+        Returns the status of the first limit reached, or `None` if the run may go on.
+        """
+        if self.iterations >= self.max_iter:
+            return "max_iter"
+        if self.expired():
+            return "timeout"
+        if self.remaining_tokens() == 0:
+            return "max_tokens"
+        return None
+
+    def chat_options(self) -> dict:
+        """
+        Returns the extra `chat` arguments capping the next generation.
+        """
+        remaining = self.remaining_tokens()
+        if remaining is None:
+            return {}
+        return {"options": {"num_predict": remaining}}
+
+    def count(self, response: Any, content: str) -> int:
+        """
+        Adds the tokens generated by one turn, preferring the backend's `eval_count`.
+        """
+        tokens = response.get("eval_count") if response is not None else None
+        if not tokens:
+            tokens = approx_token_count(content)
+        self.tokens += tokens
+        return tokens
+
+
+class RunResult:
+    """
+    The outcome of a planning run.
+
+    Attributes
+    ----------
+    content : Optional[str]
+        The final response when the run completed. When a budget ran out, the
+        last text the model generated, which may be `None`.
+    status : str
+        "completed", or the budget that ran out: "max_iter", "timeout" or "max_tokens".
+    iterations : int
+        Model turns used.
+    tokens : int
+        Tokens generated.
+    elapsed : float
+        Wall-clock duration of the run, in seconds.
+    session : Session
+        The session holding the transcript, including the partial steps.
+    """
+
+    __slots__ = ("content", "status", "iterations", "tokens", "elapsed", "session")
+
+    def __init__(
+        self, content: Optional[str], status: str, meter: BudgetMeter, session: Session
+    ):
+        self.content = content
+        self.status = status
+        self.iterations = meter.iterations
+        self.tokens = meter.tokens
+        self.elapsed = meter.elapsed
+        self.session = session
+
+    @property
+    def completed(self) -> bool:
+        return self.status == "completed"
+
+    def __repr__(self):
+        return (
+            f"RunResult(status={self.status!r}, iterations={self.iterations}, "
+            f"tokens={self.tokens}, elapsed={self.elapsed:.2f})"
+        )
@@ -0,0 +1,395 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, List, Mapping, Optional
+
+MODES = ("read_write", "read_only", "record", "replay")
+
+# Arguments of `Client.chat` that change the generated response.
+_KEY_FIELDS = ("model", "messages", "tools", "format", "options", "think", "stream")
+
+
+class CacheMissError(KeyError):
+    """
+    Raised in replay mode when a request has no recorded response.
+    """
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if callable(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    return repr(value)
+
+
+def request_key(**request: Any) -> str:
+    """
+    Computes the content address of a chat request.
+
+    Parameters
+    ----------
+    **request : Any
+        The keyword arguments of `Client.chat`. Only arguments that affect the
+        response (model, messages, tools, format, options, think, stream) are hashed.
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the canonical JSON form of the request.
+    """
+    canonical = {
+        field: request[field] for field in _KEY_FIELDS if request.get(field) is not None
+    }
+    payload = json.dumps(
+        canonical, sort_keys=True, separators=(",", ":"), default=_jsonable
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _to_record(response: Any) -> dict:
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude_none=True)
+    return dict(response)
+
+
+class ChatCache:
+    """
+    A content-addressed store of chat responses kept in a local SQLite file.
+
+    When the stored payloads exceed `max_bytes`, the least recently read
+    entries are evicted first.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path of the SQLite database, by default ".chat_cache.sqlite". Use
+        ":memory:" for a cache that lives as long as the process.
+    max_bytes : int, optional
+        Maximum total size of the stored payloads, by default 256 MiB.
+
+    Methods
+    -------
+    get(key: str) -> Optional[Any]
+        Returns the stored response for `key`, or `None`.
+    put(key: str, response: Any)
+        Stores a response, evicting old entries if the store is too large.
+    clear()
+        Removes every entry.
+    close()
+        Closes the database connection.
+    """
+
+    def __init__(self, path: str = ".chat_cache.sqlite", max_bytes: int = 256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+            "accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.commit()
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the stored response for `key`.
+
+        Parameters
+        ----------
+        key : str
+            The request key, see `request_key`.
+
+        Returns
+        -------
+        Optional[Any]
+            The decoded response, or `None` if the key is not stored.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Any):
+        """
+        Stores a response, evicting the least recently read entries beyond `max_bytes`.
+
+        Parameters
+        ----------
+        key : str
+            The request key, see `request_key`.
+        response : Any
+            The response, either a mapping or a pydantic model.
+        """
+        payload = json.dumps(response, separators=(",", ":"), default=_jsonable)
+        size = len(payload.encode())
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._size -= row[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, size, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            self._size += size
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            row = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._size -= row[1]
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._size = 0
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __repr__(self):
+        return f"ChatCache(path={self.path!r}, size={self._size}, max_bytes={self.max_bytes})"
+
+
+def _join_chunks(chunks: List[dict]) -> dict:
+    """
+    Folds streamed chunks into the record stored for a streamed request: the
+    last chunk (with the final statistics) holding the whole text, thinking and
+    native tool calls of the turn, which ollama spreads over the chunks.
+    """
+    record = dict(chunks[-1])
+    message = dict(record.get("message") or {})
+    messages = [chunk.get("message") or {} for chunk in chunks]
+    message["content"] = "".join(part.get("content") or "" for part in messages)
+    thinking = "".join(part.get("thinking") or "" for part in messages)
+    if thinking:
+        message["thinking"] = thinking
+    tool_calls = [call for part in messages for call in part.get("tool_calls") or ()]
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    record["message"] = message
+    return record
+
+
+class CachingClient:
+    """
+    Wraps an ollama `Client` so repeated chat requests are answered from a `ChatCache`.
+
+    The wrapper can be passed as the `client` of any agent. Methods other than
+    `chat` are forwarded to the wrapped client. Cached responses are returned as
+    plain dictionaries, which support the same `response["message"]["content"]`
+    access as ollama's responses.
+
+    Parameters
+    ----------
+    client : Client
+        The client used on cache misses.
+    cache : ChatCache, optional
+        The response store. A `ChatCache` at the default path is opened if omitted.
+    mode : str, optional
+        How the cache is used, by default "read_write":
+
+        - "read_write": answer hits from the cache, store misses. Streams are
+          only stored once complete.
+        - "read_only": answer hits from the cache, never store.
+        - "record": always call the backend and store (overwrite) the response,
+          including streams closed before their end.
+        - "replay": only answer from the cache; misses raise `CacheMissError`.
+
+    Attributes
+    ----------
+    hits : int
+        Number of requests answered from the cache.
+    misses : int
+        Number of requests sent to the backend.
+    """
+
+    def __init__(
+        self, client: Any = None, cache: ChatCache = None, mode: str = "read_write"
+    ):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.client = client
+        self.cache = ChatCache() if cache is None else cache
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        if self.mode == "record":
+            return None
+        record = self.cache.get(key)
+        if record is not None:
+            self.hits += 1
+            return record
+        if self.mode == "replay":
+            raise CacheMissError(key)
+        self.misses += 1
+        return None
+
+    def _store(self, key: str, record: dict):
+        if self.mode in ("read_write", "record"):
+            self.cache.put(key, record)
+
+    def _store_stream(self, key: str, received: List[dict]):
+        """
+        Stores a streamed response. A stream closed before its final chunk (the
+        agent stopped early, the deadline passed or the connection failed) is only
+        stored in "record" mode, so a replay stops at the same point; otherwise a
+        later identical request would be answered with the truncated text.
+        """
+        if not received:
+            return
+        if received[-1].get("done") or self.mode == "record":
+            self._store(key, _join_chunks(received))
+
+    def chat(self, model: str = "", messages: Optional[List[Mapping]] = None, **kwargs):
+        """
+        Sends a chat request, unless an identical request is cached.
+
+        Parameters
+        ----------
+        model : str
+            The model identifier.
+        messages : List[Mapping], optional
+            The conversation to complete.
+        **kwargs
+            Any other argument of `Client.chat`.
+
+        Returns
+        -------
+        Union[Mapping, Iterator[Mapping]]
+            The response, or an iterator of chunks when `stream=True`.
+        """
+        key = request_key(model=model, messages=messages, **kwargs)
+        record = self._lookup(key)
+        stream = kwargs.get("stream", False)
+
+        if record is not None:
+            return iter([record]) if stream else record
+
+        response = self.client.chat(model=model, messages=messages, **kwargs)
+        if stream:
+            return self._record_stream(key, response)
+
+        self._store(key, _to_record(response))
+        return response
+
+    def _record_stream(self, key: str, chunks: Iterator) -> Iterator:
+        received = []
+        try:
+            for chunk in chunks:
+                received.append(_to_record(chunk))
+                yield chunk
+        finally:
+            self._store_stream(key, received)
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def __repr__(self):
+        return (
+            f"CachingClient(mode={self.mode!r}, hits={self.hits}, misses={self.misses})"
+        )
+
+
+class AsyncCachingClient(CachingClient):
+    """
+    Wraps an ollama `AsyncClient` so repeated chat requests are answered from a `ChatCache`.
+
+    See `CachingClient` for the parameters and modes.
+    """
+
+    async def chat(
+        self, model: str = "", messages: Optional[List[Mapping]] = None, **kwargs
+    ):
+        """
+        Sends a chat request, unless an identical request is cached.
+
+        Parameters
+        ----------
+        model : str
+            The model identifier.
+        messages : List[Mapping], optional
+            The conversation to complete.
+        **kwargs
+            Any other argument of `AsyncClient.chat`.
+
+        Returns
+        -------
+        Union[Mapping, AsyncIterator[Mapping]]
+            The response, or an async iterator of chunks when `stream=True`.
+        """
+        key = request_key(model=model, messages=messages, **kwargs)
+        record = self._lookup(key)
+        stream = kwargs.get("stream", False)
+
+        if record is not None:
+            return self._replay_stream(record) if stream else record
+
+        response = await self.client.chat(model=model, messages=messages, **kwargs)
+        if stream:
+            return self._arecord_stream(key, response)
+
+        self._store(key, _to_record(response))
+        return response
+
+    @staticmethod
+    async def _replay_stream(record: dict):
+        yield record
+
+    async def _arecord_stream(self, key: str, chunks):
+        received = []
+        try:
+            async for chunk in chunks:
+                received.append(_to_record(chunk))
+                yield chunk
+        finally:
+            self._store_stream(key, received)
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+    def __repr__(self):
+        return f"AsyncCachingClient(mode={self.mode!r}, hits={self.hits}, misses={self.misses})"
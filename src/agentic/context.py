@@ -0,0 +1,241 @@
+from typing import Callable, List, Tuple
+
+from agentic.session import latest_question
+from tool import ToolCallParser, approx_token_count
+
+POLICIES = ("sliding_window", "truncate", "summarize")
+
+MESSAGE_OVERHEAD = 4
+
+
+def _shorten(text: str, width: int) -> str:
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+def summarize_turns(turns: List[List[dict]], width: int = 80) -> str:
+    """
+    Builds an extractive summary of planning turns from their thoughts, calls and tool responses.
+
+    Parameters
+    ----------
+    turns : List[List[dict]]
+        The dropped turns, each one an assistant message followed by its tool
+        messages, or an earlier question.
+    width : int, optional
+        Maximum length of each tool response in the summary, by default 80.
+
+    Returns
+    -------
+    str
+        One line per turn.
+    """
+    lines = []
+    for turn in turns:
+        if turn[0]["role"] == "user":
+            lines.append(f"- Earlier question: {_shorten(turn[0]['content'], width)}")
+            continue
+        parser = ToolCallParser(turn[0]["content"])
+        thought = " ".join(parser.thoughts)
+        calls = ", ".join(f"{call.name}({call.arguments})" for call in parser.calls)
+        results = ", ".join(
+            _shorten(
+                message["content"]
+                .replace("<tool_response>", "")
+                .replace("</tool_response>", ""),
+                width,
+            )
+            for message in turn[1:]
+        )
+        lines.append(f"- {thought} {calls} -> {results}".strip())
+    return "\n".join(lines)
+
+
+def _group_turns(messages: List[dict]) -> List[List[dict]]:
+    turns = []
+    for message in messages:
+        if message["role"] != "tool" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+class ContextReport:
+    """
+    Prompt size of a single planning step before and after fitting it to the budget.
+
+    Attributes
+    ----------
+    step : int
+        The planning iteration.
+    tokens_before : int
+        Estimated prompt tokens of the full history.
+    tokens_after : int
+        Estimated prompt tokens actually sent.
+    dropped_turns : int
+        Number of older turns removed or summarized.
+    """
+
+    __slots__ = ("step", "tokens_before", "tokens_after", "dropped_turns")
+
+    def __init__(
+        self, step: int, tokens_before: int, tokens_after: int, dropped_turns: int
+    ):
+        self.step = step
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.dropped_turns = dropped_turns
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __repr__(self):
+        return (
+            f"ContextReport(step={self.step}, tokens_before={self.tokens_before}, "
+            f"tokens_after={self.tokens_after}, saved={self.saved})"
+        )
+
+
+class ContextWindow:
+    """
+    Keeps the prompt of a planning agent within a token budget.
+
+    The system message and the question (the latest user message, so that a
+    session serving several questions keeps the current one) are always kept.
+    The rest of the history is split into turns (an assistant message followed
+    by the tool responses it triggered); the latest turn is always kept and
+    older turns, including those of earlier questions, are compressed according
+    to `policy` until the prompt fits the budget.
+
+    Parameters
+    ----------
+    max_tokens : int
+        The prompt budget, in tokens as measured by `count_tokens`.
+    policy : str, optional
+        How older turns are compressed, by default "sliding_window":
+
+        - "sliding_window": drop the oldest turns.
+        - "truncate": first shorten tool responses longer than `max_tool_tokens`,
+          then drop the oldest turns.
+        - "summarize": replace the dropped turns with one summary message built by
+          `summarize`. The summary is added after choosing the turns to drop, so it
+          should be short compared to the budget.
+    max_tool_tokens : int, optional
+        Size tool responses are cut to by the "truncate" policy, by default 256.
+    count_tokens : Callable[[str], int], optional
+        Token counter, by default `approx_token_count`. Pass the model's tokenizer
+        for exact budgets.
+    summarize : Callable[[List[List[dict]]], str], optional
+        Builds the summary used by the "summarize" policy, by default `summarize_turns`.
+        It can, for instance, call a small model.
+
+    Methods
+    -------
+    fit(messages: List[dict], step: int = 0) -> Tuple[List[dict], ContextReport]
+        Returns the messages to send and a report of the tokens saved.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        policy: str = "sliding_window",
+        max_tool_tokens: int = 256,
+        count_tokens: Callable[[str], int] = approx_token_count,
+        summarize: Callable[[List[List[dict]]], str] = summarize_turns,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.max_tokens = max_tokens
+        self.policy = policy
+        self.max_tool_tokens = max_tool_tokens
+        self.count_tokens = count_tokens
+        self.summarize = summarize
+
+    def _message_tokens(self, message: dict) -> int:
+        return self.count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+    def _split(
+        self, messages: List[dict]
+    ) -> Tuple[List[dict], List[dict], List[List[dict]], int]:
+        """
+        Splits the history into the pinned system message and latest question, and
+        turns. Also returns the number of turns that precede the question.
+        """
+        head = 1 if messages and messages[0]["role"] == "system" else 0
+        question = latest_question(messages)
+        if question is None or question < head:
+            return messages[:head], [], _group_turns(messages[head:]), 0
+        earlier = _group_turns(messages[head:question])
+        turns = earlier + _group_turns(messages[question + 1 :])
+        return messages[:head], [messages[question]], turns, len(earlier)
+
+    def _truncate(self, message: dict) -> dict:
+        content = message["content"]
+        if (
+            message["role"] != "tool"
+            or self.count_tokens(content) <= self.max_tool_tokens
+        ):
+            return message
+        # Keep roughly max_tool_tokens worth of characters, measured with the same ratio.
+        keep = len(content) * self.max_tool_tokens // self.count_tokens(content)
+        return {
+            **message,
+            "content": f"{content[:keep]}... [truncated {len(content) - keep} characters]",
+        }
+
+    def fit(
+        self, messages: List[dict], step: int = 0
+    ) -> Tuple[List[dict], ContextReport]:
+        """
+        Fits a history into the token budget.
+
+        Parameters
+        ----------
+        messages : List[dict]
+            The full history. It is not modified.
+        step : int, optional
+            The planning iteration, recorded in the report.
+
+        Returns
+        -------
+        Tuple[List[dict], ContextReport]
+            The messages to send and a report of the estimated tokens saved.
+        """
+        tokens_before = sum(self._message_tokens(message) for message in messages)
+        if tokens_before <= self.max_tokens:
+            return messages, ContextReport(step, tokens_before, tokens_before, 0)
+
+        head, question, turns, earlier = self._split(messages)
+        if self.policy == "truncate":
+            turns = [[self._truncate(message) for message in turn] for turn in turns]
+
+        turn_tokens = [sum(self._message_tokens(m) for m in turn) for turn in turns]
+        pinned = head + question
+        total = sum(self._message_tokens(m) for m in pinned) + sum(turn_tokens)
+
+        # The latest turn is kept, unless it answers an earlier question.
+        keep = 1 if len(turns) > earlier else 0
+        dropped = 0
+        while total > self.max_tokens and dropped < len(turns) - keep:
+            total -= turn_tokens[dropped]
+            dropped += 1
+
+        summary = []
+        if dropped and self.policy == "summarize":
+            summary = [
+                {
+                    "role": "system",
+                    "content": f"Summary of earlier steps:\n{self.summarize(turns[:dropped])}",
+                }
+            ]
+
+        kept = [message for turn in turns[dropped:] for message in turn]
+        # The question goes back after the kept turns that preceded it.
+        before = sum(len(turn) for turn in turns[dropped:earlier])
+        fitted = head + summary + kept[:before] + question + kept[before:]
+        tokens_after = sum(self._message_tokens(message) for message in fitted)
+        return fitted, ContextReport(step, tokens_before, tokens_after, dropped)
+
+    def __repr__(self):
+        return f"ContextWindow(max_tokens={self.max_tokens}, policy={self.policy!r})"
@@ -1,10 +1,39 @@
-import json
-import re
-from typing import Any, Callable, List, Union
+import asyncio
+from concurrent.futures import Future, wait
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
 
-from ollama._client import Client
+from agentic.batch import BatchResult, aiter_batch, iter_batch
+from agentic.budget import Budget, BudgetMeter, RunResult
+from agentic.context import ContextWindow
+from agentic.session import Session
+from agentic.tool import call_errors, check_tool_mode, tool_error
+from tool import (
+    ToolCall,
+    ToolCallParser,
+    ToolCallProcessor,
+    ToolDispatcher,
+    ToolIndex,
+    ToolKit,
+    format_native_calls,
+    span,
+)
 
-from agentic.tool import ToolCallProcessor, ToolKit
+if TYPE_CHECKING:
+    # The agents only need an object with ollama's `chat` API; importing the client
+    # stack is deferred to the caller.
+    from ollama import AsyncClient, Client
+
+    from agentic.store import SessionStore
 
 REACT_PROMPT = """
 You are a function calling AI model. You operate breaking a task given by a user's question into steps: <thought>, <tool_calls>, <tool_response>.
@@ -25,6 +54,13 @@ If a function call is needed and the function is listed, return a JSON object co
 {"name": <function-name>, "arguments": <args-json-object>, "id": <monotonically-increasing-id>}
 </tool_calls>
 
+An argument can be the result of another call of the same <tool_calls> block: write {"$ref": <id>} in place of its value.
+Calls run as soon as the results they reference are ready, so put every call whose arguments are known, or can be referenced, in the same block:
+<tool_calls>
+{"name": "multiply", "arguments": {"a": 25, "b": 12}, "id": 0}
+{"name": "add", "arguments": {"a": {"$ref": 0}, "b": 3}, "id": 1}
+</tool_calls>
+
 The function call response will be enclosed within <tool_response></tool_response> XML tags.
 <tool_response>
 tool response
@@ -49,12 +85,30 @@ Then you can go to the next step with depends on first:
 <tool_calls>{\"name\": \"show_message\",\"arguments\": {\"message\": \"IT'S FRIDAY\"}, \"id\": 1}</tool_calls>
 
 Then you will be feeded with the result of the function call:
-<tool_response>{\"success\": True}</tool_response>
+<tool_response>{\"success\": true}</tool_response>
 
 And if no more function calls are needed, you can respond with:
 <response>Today is friday! I showed a message remenbering you of this.</response>
 """
 
+NATIVE_REACT_PROMPT = """
+You are a function calling AI model. You operate breaking a task given by a user's question into steps: <thought>, tool calls, tool responses.
+Take special attention to the functions params dtypes.
+You may call one or more of the provided functions to assist with the user query.
+
+The reasoning and thoughts should be enclosed within <thought></thought> XML tags.
+<thought>
+thought/reasoning
+</thought>
+
+Then call the functions you need, all at once when their arguments are known. Their results are sent back to you as tool messages.
+
+When no more function calls are needed, give the final response to the user enclosed within <response></response> XML tags.
+<response>
+Response after reasoning and acting (ReAct)
+</response>
+"""
+
 
 class PlanningAgent:
     """
@@ -72,7 +126,36 @@ class PlanningAgent:
     toolkit : Union[ToolKit, List[Callable[..., Any]]], optional
         A ToolKit instance or a list of callables to initialize the toolkit.
     system_message : str, optional
-        A formatted system message used to initialize the agent. Defaults to `REACT_PROMPT`.
+        A formatted system message used to initialize the agent. Defaults to
+        `REACT_PROMPT`, or `NATIVE_REACT_PROMPT` in native mode.
+    max_iter : int, optional
+        Maximum number of planning iterations, by default 20.
+    max_workers : int, optional
+        Number of threads used to run the tool calls of a single step concurrently.
+        By default the calls are run sequentially.
+    stream : bool, optional
+        Whether to stream each turn, by default False. Tool calls are dispatched as
+        soon as their closing tag arrives and generation stops at `</response>`;
+        combine with `max_workers` to overlap tool latency with decoding.
+    context : ContextWindow, optional
+        Keeps the prompt sent at each step within a token budget. By default the
+        full history is sent.
+    budget : Budget, optional
+        Default limits of a run (iterations, wall-clock time, generated tokens).
+        By default only `max_iter` applies.
+    tool_index : ToolIndex, optional
+        Selects the tools whose schemas are sent for each message, instead of every
+        tool of the toolkit. Tools the model calls outside the selection are added
+        to it. By default every schema is sent.
+    schema_style : str, optional
+        How tool schemas are rendered in the system message, one of "json" (the
+        default), "compact", "summary" or "signature". See `ToolKit.render_schemas`.
+    tool_mode : str, optional
+        How tools are offered to the model, by default "xml": schemas are embedded
+        in the system message and calls are parsed from `<tool_calls>` tags. With
+        "native" the toolkit is passed as the `tools` argument of the chat API and
+        calls are read from `message.tool_calls`, falling back to tags when a model
+        answers with text; a turn without any call is the final response.
 
     Attributes
     ----------
@@ -82,10 +165,18 @@ class PlanningAgent:
         The model identifier for the chat API.
     toolkit : ToolKit
         The toolkit containing callable functions for the agent to use.
-    input_messages : List[dict]
-        A list of messages exchanged between the user, system, and assistant.
     system_message : str
         The system message initialized for the agent.
+    dispatcher : ToolDispatcher
+        Runs the tool calls requested at each step.
+    budget : Budget
+        Default limits of a run.
+    tool_index : ToolIndex
+        Selects the tools whose schemas are sent, or `None`.
+    schema_style : str
+        How tool schemas are rendered in the system message.
+    tool_mode : str
+        How tools are offered to the model, "xml" or "native".
 
     Methods
     -------
@@ -93,7 +184,11 @@ class PlanningAgent:
         Returns a string representation of the schemas for each tool in the toolkit.
     _initialize_system_message(system_message: str) -> str
         Initializes the system message using the provided template and tool schemas.
-    start(message: str) -> str
+    session(max_messages: int = None, store: SessionStore = None, session_id: str = None) -> Session
+        Creates a conversation served by this agent.
+    run(message: str, session: Session = None, budget: Budget = None) -> RunResult
+        Answers a message within a budget and returns a structured result.
+    start(message: str, session: Session = None) -> str
         Starts the interaction with the user by processing the input message
         and returning the final response from the assistant.
     """
@@ -101,11 +196,18 @@ class PlanningAgent:
     def __init__(
         self,
         name: str = None,
-        client: Client = None,
+        client: "Client" = None,
         model: str = None,
         toolkit: Union[ToolKit, List[Callable[..., Any]]] = None,
-        system_message: str = REACT_PROMPT,
+        system_message: str = None,
         max_iter=20,
+        max_workers: int = None,
+        stream: bool = False,
+        context: ContextWindow = None,
+        budget: Budget = None,
+        tool_index: ToolIndex = None,
+        schema_style: str = "json",
+        tool_mode: str = "xml",
     ):
         """
         Initializes the PlanningAgent with the provided parameters.
@@ -121,17 +223,48 @@ class PlanningAgent:
         toolkit : Union[ToolKit, List[Callable[..., Any]]], optional
             A ToolKit instance or a list of callables to initialize the toolkit.
         system_message : str, optional
-            A formatted system message used to initialize the agent. Defaults to `REACT_PROMPT`.
+            A formatted system message used to initialize the agent. Defaults to
+            `REACT_PROMPT`, or `NATIVE_REACT_PROMPT` in native mode.
+        max_iter : int, optional
+            Maximum number of planning iterations, by default 20.
+        max_workers : int, optional
+            Number of threads used to run the tool calls of a single step concurrently.
+            By default the calls are run sequentially.
+        stream : bool, optional
+            Whether to stream each turn and dispatch tool calls early, by default False.
+        context : ContextWindow, optional
+            Keeps the prompt sent at each step within a token budget.
+        budget : Budget, optional
+            Default limits of a run.
+        tool_index : ToolIndex, optional
+            Selects the tools whose schemas are sent for each message.
+        schema_style : str, optional
+            How tool schemas are rendered in the system message, by default "json".
+        tool_mode : str, optional
+            How tools are offered to the model, "xml" (the default) or "native".
         """
+        check_tool_mode(tool_mode)
+        if system_message is None:
+            system_message = (
+                NATIVE_REACT_PROMPT if tool_mode == "native" else REACT_PROMPT
+            )
         self.client = client
         self.model = model
         if isinstance(toolkit, list):
             self.toolkit = ToolKit(tools=toolkit)
         else:
             self.toolkit = toolkit
-        self.input_messages = []
+        self.schema_style = schema_style
+        self.tool_mode = tool_mode
         self.system_message = self._initialize_system_message(system_message)
+        self._system = {"role": "system", "content": self.system_message}
+        self._template = system_message
         self.max_iter = max_iter
+        self.dispatcher = ToolDispatcher(self.toolkit, max_workers=max_workers)
+        self.stream = stream
+        self.context = context
+        self.budget = Budget() if budget is None else budget
+        self.tool_index = tool_index
 
     def _tool_schemas_str(self) -> str:
         """
@@ -142,9 +275,7 @@ class PlanningAgent:
         str
             A string containing the formatted JSON schemas of the tools.
         """
-        return "\n\n".join(
-            [json.dumps(schema, indent=4) for schema in self.toolkit.tools_schemas()]
-        )
+        return self.toolkit.render_schemas(style=self.schema_style)
 
     def _initialize_system_message(self, system_message: str) -> str:
         """
@@ -158,27 +289,417 @@ class PlanningAgent:
         Returns
         -------
         str
-            The initialized system message with tool schemas included.
+            The initialized system message with tool schemas included, or the
+            template itself in native mode.
+        """
+        if self.tool_mode == "native":
+            return system_message
+        return self.toolkit.render_prompt(system_message, style=self.schema_style)
+
+    def session(
+        self,
+        max_messages: int = None,
+        store: "SessionStore" = None,
+        session_id: str = None,
+    ) -> Session:
+        """
+        Creates a conversation served by this agent.
+
+        Parameters
+        ----------
+        max_messages : int, optional
+            Maximum number of messages kept in the session history. By default the
+            history is unbounded.
+        store : SessionStore, optional
+            Writes the history through to an on-disk log, so the session can be
+            evicted from memory and resumed with `store.get(session.session_id)`.
+            By default the history only lives in memory.
+        session_id : str, optional
+            The key of the session in `store`, random by default.
+
+        Returns
+        -------
+        Session
+            A new session whose history holds the agent's system message.
         """
-        return system_message % self._tool_schemas_str()
+        if store is not None:
+            return store.create(
+                self._system, session_id=session_id, max_messages=max_messages
+            )
+        return Session(self._system, max_messages=max_messages)
+
+    def _select_tools(self, session: Session, names: Iterable[str]):
+        """
+        Exposes more tools to the model in a session, rewriting its system message
+        with their schemas. The first selection replaces the full list of tools.
+
+        Parameters
+        ----------
+        session : Session
+            The conversation.
+        names : Iterable[str]
+            The tools to add to the session's selection.
+        """
+        first = session.tools is None
+        if first:
+            session.tools = []
+        added = [name for name in names if name not in session.tools]
+        session.tools.extend(added)
+        # In native mode the selection is sent as the `tools` argument instead.
+        if (added or first) and self.tool_mode != "native":
+            prompt = self.toolkit.render_prompt(
+                self._template, session.tools, self.schema_style
+            )
+            session.set_system_message({"role": "system", "content": prompt})
 
-    def _is_final_response(self, content, pattern=r"<response>(.*?)</response>"):
+    def _prompt_messages(self, session: Session, step: int) -> List[dict]:
+        """
+        Returns the messages sent at a step, fitted to the context budget if one is set.
+
+        Parameters
+        ----------
+        session : Session
+            The conversation being served.
+        step : int
+            The planning iteration.
+
+        Returns
+        -------
+        List[dict]
+            The messages to send to the model.
         """
-        Check if the input string contains <response></response> tags.
+        if self.context is None:
+            return session.messages
+        messages, report = self.context.fit(session.messages, step)
+        session.context_reports.append(report)
+        return messages
+
+    def _tool_definitions(self, session: Session) -> Union[List[dict], None]:
+        """
+        Returns the `tools` argument of a chat request: the definitions of the
+        session's tools in native mode, `None` otherwise.
+        """
+        if self.tool_mode != "native":
+            return None
+        return self.toolkit.tool_definitions(session.tools)
+
+    def _chat_options(self, meter: BudgetMeter, tools: List[dict]) -> dict:
+        options = meter.chat_options()
+        if tools is not None:
+            options["tools"] = tools
+        return options
+
+    def _turn(
+        self, message: Any, parser: ToolCallParser
+    ) -> Tuple[List[ToolCall], bool]:
+        """
+        Reads the tool calls of a complete model turn and whether it is final.
+
+        Parameters
+        ----------
+        message : Mapping
+            The `message` of the chat response.
+        parser : ToolCallParser
+            The parser that scanned the turn's text.
+
+        Returns
+        -------
+        Tuple[List[ToolCall], bool]
+            The calls to run, and whether the turn holds the final response.
+        """
+        if self.tool_mode != "native":
+            return parser.calls, parser.done
+        calls = parser.feed_native(message) or parser.calls
+        # A turn whose only calls were rejected is not final: they are reported.
+        return calls, parser.done or not (calls or call_errors(parser))
+
+    def _assistant_message(
+        self, content: str, scheduled: List[Tuple[ToolCall, Any]]
+    ) -> dict:
+        message = {"role": "assistant", "content": content}
+        if self.tool_mode == "native" and scheduled:
+            message["tool_calls"] = format_native_calls([call for call, _ in scheduled])
+        return message
 
-        Args:
-            input_string (str): The string to check for <response> tags.
+    def _tool_message(self, call: ToolCall, result: Any) -> dict:
+        if self.tool_mode == "native":
+            return {"role": "tool", "content": str(result), "tool_name": call.name}
+        return {"role": "tool", "content": f"<tool_response>{result}</tool_response>"}
+
+    def _error_message(self, error: str) -> dict:
+        if self.tool_mode == "native":
+            return {"role": "tool", "content": error}
+        return {"role": "tool", "content": f"<tool_response>{error}</tool_response>"}
+
+    def _stream_calls(self, message: Any, parser: ToolCallParser) -> List[ToolCall]:
+        """
+        Returns the tool calls completed by a streamed chunk: those whose closing
+        tag it holds and, in native mode, its structured calls. Both are numbered
+        by the parser, so their ids never collide.
+        """
+        calls = parser.feed(message["content"])
+        if self.tool_mode == "native":
+            calls = calls + parser.feed_native(message)
+        return calls
+
+    def _stream_final(
+        self, chunk: Any, parser: ToolCallParser, scheduled: List[Tuple[ToolCall, Any]]
+    ) -> bool:
+        """
+        Whether a streamed turn holds the final response. In native mode a complete
+        turn without any call is final.
+        """
+        if parser.done:
+            return True
+        return (
+            self.tool_mode == "native"
+            and not scheduled
+            and not call_errors(parser)
+            and chunk is not None
+            and bool(chunk["done"])
+        )
+
+    def _begin_run(
+        self, message: str, session: Session, budget: Budget
+    ) -> Tuple[Session, BudgetMeter]:
+        """
+        Starts serving a message: opens the session and the budget meter, selects
+        the tools and adds the question to the history.
+        """
+        if session is None:
+            session = self.session()
+        meter = (self.budget if budget is None else budget).start(self.max_iter)
+        if self.tool_index is not None:
+            self._select_tools(session, self.tool_index.select(message))
+        session.append({"role": "user", "content": f"<question>{message}</question>"})
+        return session, meter
+
+    def _read_response(
+        self, response: Any, meter: BudgetMeter
+    ) -> Tuple[str, List[ToolCall], List[str], bool]:
+        """
+        Reads a complete chat response: its text, the calls to run and the errors
+        of the calls that could not be read (none for the final response), and
+        whether it is final. Counts the generated tokens.
+        """
+        content = response["message"]["content"]
+        meter.count(response, content)
+        processor = ToolCallProcessor(content)
+        calls, is_final = self._turn(response["message"], processor.parser)
+        if is_final:
+            return content, [], [], is_final
+        return content, calls, call_errors(processor.parser), is_final
+
+    def _read_chunk(
+        self,
+        chunk: Any,
+        parser: ToolCallParser,
+        graph: Any,
+        scheduled: List[Tuple[ToolCall, Any]],
+        meter: BudgetMeter,
+    ) -> bool:
+        """
+        Schedules the tool calls completed by a streamed chunk on `graph`, and
+        returns whether to stop reading: at `</response>` or once the deadline passed.
+        """
+        for call in self._stream_calls(chunk["message"], parser):
+            scheduled.append((call, graph.submit(call)))
+        return parser.done or meter.expired()
+
+    def _end_stream(
+        self,
+        chunk: Any,
+        parser: ToolCallParser,
+        scheduled: List[Tuple[ToolCall, Any]],
+        meter: BudgetMeter,
+    ) -> Tuple[str, List[Tuple[ToolCall, Any]], List[str], bool]:
+        """
+        Completes a streamed turn: counts the generated tokens and returns its
+        text, the scheduled calls ordered by `id`, the errors of the calls that
+        could not be read and whether it is final.
+        """
+        # Only the last chunk of a complete stream carries `eval_count`.
+        meter.count(chunk, parser.content)
+        scheduled.sort(key=lambda item: item[0].id)
+        is_final = self._stream_final(chunk, parser, scheduled)
+        errors = [] if is_final else call_errors(parser)
+        return parser.content, scheduled, errors, is_final
+
+    def _record_turn(
+        self,
+        session: Session,
+        meter: BudgetMeter,
+        content: str,
+        scheduled: List[Tuple[ToolCall, Any]],
+    ):
+        meter.iterations += 1
+        session.append(self._assistant_message(content, scheduled))
+
+    def _record_results(
+        self,
+        session: Session,
+        meter: BudgetMeter,
+        scheduled: List[Tuple[ToolCall, Any]],
+        pending: Iterable[Any],
+        errors: List[str],
+    ) -> Union[str, None]:
+        """
+        Adds the result of every finished call to the history, failed calls
+        included so the model can recover, followed by the errors of the calls
+        that could not be read, and cancels the calls still pending.
+
+        Returns
+        -------
+        Union[str, None]
+            The status ending the run, or `None` to keep planning.
+        """
+        for call, future in scheduled:
+            if future in pending:
+                future.cancel()
+                continue
+            try:
+                result = future.result()
+            except (Exception, asyncio.CancelledError) as e:
+                result = tool_error(e)
+            session.append(self._tool_message(call, result))
+        session.extend(self._error_message(error) for error in errors)
+        if self.tool_index is not None:
+            names = [call.name for call, _ in scheduled]
+            self._select_tools(session, self.tool_index.expand(session.tools, names))
+        return "timeout" if pending else meter.exhausted()
+
+    def _stream_step(
+        self, messages: List[dict], meter: BudgetMeter, tools: List[dict] = None
+    ) -> Tuple[str, List[Tuple[ToolCall, Future]], List[str], bool]:
+        """
+        Streams one model turn, dispatching each tool call as soon as its
+        closing tag arrives (and the results it references are available) and
+        stopping generation at `</response>` or when the run's deadline passes.
+
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        meter : BudgetMeter
+            The consumption of the run's budget, updated with the generated tokens.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
+
+        Returns
+        -------
+        Tuple[str, List[Tuple[ToolCall, Future]], List[str], bool]
+            The text generated in this turn, the scheduled calls ordered by `id`, the
+            errors of the calls that could not be read, and whether the turn holds
+            the final response.
+        """
+        parser = ToolCallParser()
+        graph = self.dispatcher.graph()
+        scheduled = []
+        chunk = None
+        with span("llm.stream", model=self.model) as chat_span:
+            chunks = self.client.chat(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                **self._chat_options(meter, tools),
+            )
+            try:
+                for chunk in chunks:
+                    if self._read_chunk(chunk, parser, graph, scheduled, meter):
+                        break
+            finally:
+                # Closing the stream drops the connection, which stops generation.
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                graph.close()
+            chat_span.record_response(chunk)
+            chat_span.set(tool_calls=len(scheduled))
+        return self._end_stream(chunk, parser, scheduled, meter)
+
+    def _step(
+        self, messages: List[dict], meter: BudgetMeter, tools: List[dict] = None
+    ) -> Tuple[str, List[Tuple[ToolCall, Future]], List[str], bool]:
+        """
+        Runs one model turn and schedules the tool calls it requests.
+
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        meter : BudgetMeter
+            The consumption of the run's budget, updated with the generated tokens.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
+
+        Returns
+        -------
+        Tuple[str, List[Tuple[ToolCall, Future]], List[str], bool]
+            The text generated in this turn, the scheduled calls ordered by `id`, the
+            errors of the calls that could not be read, and whether the turn holds
+            the final response.
+        """
+        if self.stream:
+            return self._stream_step(messages, meter, tools)
+
+        with span("llm.chat", model=self.model) as chat_span:
+            response = self.client.chat(
+                model=self.model, messages=messages, **self._chat_options(meter, tools)
+            )
+            chat_span.record_response(response)
+        content, calls, errors, is_final = self._read_response(response, meter)
+        return content, self.dispatcher.dispatch(calls), errors, is_final
+
+    def run(
+        self, message: str, session: Session = None, budget: Budget = None
+    ) -> RunResult:
+        """
+        Answers a message within a budget of iterations, time and generated tokens.
+
+        Parameters
+        ----------
+        message : str
+            The user's input message to be processed.
+        session : Session, optional
+            The conversation the message belongs to. The steps are appended to its
+            history. By default a new session is used for this call only.
+        budget : Budget, optional
+            The limits of this run, by default the agent's `budget`.
 
-        Returns:
-            bool: True if the tags are found, False otherwise.
+        Returns
+        -------
+        RunResult
+            The final response, or the partial result of a run that ran out of budget.
         """
-        # Search for the pattern in the input string
-        match = bool(re.search(pattern, content, re.DOTALL))
+        with span("agent.run", agent=type(self).__name__, model=self.model) as run_span:
+            session, meter = self._begin_run(message, session, budget)
+            content = None
+            status = meter.exhausted()
+            while status is None:
+                with span("agent.step", step=meter.iterations):
+                    messages = self._prompt_messages(session, meter.iterations)
+                    content, scheduled, errors, is_final = self._step(
+                        messages, meter, self._tool_definitions(session)
+                    )
+                    self._record_turn(session, meter, content, scheduled)
+                    if is_final:
+                        status = "completed"
+                        break
 
-        # Return True if the tags are found
-        return match
+                    with span("tools.wait", calls=len(scheduled)):
+                        _, pending = wait(
+                            [future for _, future in scheduled],
+                            timeout=meter.remaining_time(),
+                        )
+                    status = self._record_results(
+                        session, meter, scheduled, pending, errors
+                    )
 
-    def start(self, message: str) -> str:
+            run_span.set(
+                status=status, iterations=meter.iterations, tokens=meter.tokens
+            )
+            return RunResult(content, status, meter, session)
+
+    def start(self, message: str, session: Session = None) -> str:
         """
         Starts the interaction with the user by processing the input message
         and returning the final response from the assistant.
@@ -187,54 +708,363 @@ class PlanningAgent:
         ----------
         message : str
             The user's input message to be processed.
+        session : Session, optional
+            The conversation the message belongs to. The steps are appended to its
+            history. By default a new session is used for this call only.
 
         Returns
         -------
         str
-            The final response generated by the assistant.
+            The final response generated by the assistant, or `None` if the agent's
+            budget ran out first. Use `run` for the partial result.
         """
-        self.input_messages.append(
-            {
-                "role": "system",
-                "content": self.system_message,
-            }
-        )
-        self.input_messages.append(
-            {"role": "user", "content": f"<question>{message}</question>"}
+        result = self.run(message, session=session)
+        return result.content if result.completed else None
+
+    def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently, each one in its own session.
+
+        Every request goes through the agent's client, so the batch shares its
+        HTTP connection pool. At most `max_concurrency` messages are in flight, and
+        a message that fails is reported in its result without stopping the others.
+        Each message is served with `run`, within the agent's budget.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`. The response of
+            each is its `RunResult`, which tells a completed run from one that ran
+            out of budget.
+        """
+        results = list(self.iter_many(messages, max_concurrency=max_concurrency))
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> Iterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        See `start_many` for the concurrency and error handling.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve. A lazy iterable is consumed as slots free up.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        Iterator[BatchResult]
+            The results, in completion order, each holding a `RunResult`.
+        """
+        return iter_batch(self.run, messages, max_concurrency=max_concurrency)
+
+
+class AsyncPlanningAgent(PlanningAgent):
+    """
+    A `PlanningAgent` that runs on an event loop.
+
+    Chat requests go through `ollama.AsyncClient`, coroutine tools are awaited
+    natively and regular tools are pushed to an executor, so a single event loop
+    can drive many agents sharing one client and toolkit.
+
+    Parameters
+    ----------
+    name : str, optional
+        The name of the planning agent.
+    client : AsyncClient, optional
+        An instance of the AsyncClient class used for communication.
+    model : str, optional
+        The model identifier for the chat API.
+    toolkit : Union[ToolKit, List[Callable[..., Any]]], optional
+        A ToolKit instance or a list of callables to initialize the toolkit.
+    system_message : str, optional
+        A formatted system message used to initialize the agent. Defaults to
+        `REACT_PROMPT`, or `NATIVE_REACT_PROMPT` in native mode.
+    max_iter : int, optional
+        Maximum number of planning iterations, by default 20.
+    max_workers : int, optional
+        Number of threads used to run regular (non-coroutine) tools. By default the
+        event loop's default executor is used.
+    stream : bool, optional
+        Whether to stream each turn and dispatch tool calls as soon as they are
+        complete, by default False.
+    context : ContextWindow, optional
+        Keeps the prompt sent at each step within a token budget.
+    budget : Budget, optional
+        Default limits of a run. The deadline also cancels a model request in progress.
+    tool_index : ToolIndex, optional
+        Selects the tools whose schemas are sent for each message.
+    schema_style : str, optional
+        How tool schemas are rendered in the system message, by default "json".
+    tool_mode : str, optional
+        How tools are offered to the model, "xml" (the default) or "native".
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        client: "AsyncClient" = None,
+        model: str = None,
+        toolkit: Union[ToolKit, List[Callable[..., Any]]] = None,
+        system_message: str = None,
+        max_iter=20,
+        max_workers: int = None,
+        stream: bool = False,
+        context: ContextWindow = None,
+        budget: Budget = None,
+        tool_index: ToolIndex = None,
+        schema_style: str = "json",
+        tool_mode: str = "xml",
+    ):
+        super().__init__(
+            name=name,
+            client=client,
+            model=model,
+            toolkit=toolkit,
+            system_message=system_message,
+            max_iter=max_iter,
+            max_workers=max_workers,
+            stream=stream,
+            context=context,
+            budget=budget,
+            tool_index=tool_index,
+            schema_style=schema_style,
+            tool_mode=tool_mode,
         )
 
-        final_response = None
+    async def _stream_step(
+        self, messages: List[dict], meter: BudgetMeter, tools: List[dict] = None
+    ) -> Tuple[str, List[Tuple[ToolCall, asyncio.Future]], List[str], bool]:
+        """
+        Streams one model turn, dispatching each tool call as soon as its
+        closing tag arrives (and the results it references are available) and
+        stopping generation at `</response>` or when the run's deadline passes.
 
-        i = 0
-        while True or i < self.max_iter:
-            response = self.client.chat(model=self.model, messages=self.input_messages)
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        meter : BudgetMeter
+            The consumption of the run's budget, updated with the generated tokens.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
 
-            response_content = response["message"]["content"]
+        Returns
+        -------
+        Tuple[str, List[Tuple[ToolCall, asyncio.Future]], List[str], bool]
+            The text generated in this turn, the scheduled calls ordered by `id`, the
+            errors of the calls that could not be read, and whether the turn holds
+            the final response.
+        """
+        parser = ToolCallParser()
+        graph = self.dispatcher.agraph()
+        scheduled = []
+        chunk = None
+        with span("llm.stream", model=self.model) as chat_span:
+            chunks = await self.client.chat(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                **self._chat_options(meter, tools),
+            )
+            try:
+                async for chunk in chunks:
+                    if self._read_chunk(chunk, parser, graph, scheduled, meter):
+                        break
+            except asyncio.CancelledError:
+                # The deadline passed mid-stream: stop the calls already scheduled.
+                await graph.cancel()
+                raise
+            finally:
+                if hasattr(chunks, "aclose"):
+                    await chunks.aclose()
+                graph.close()
+            chat_span.record_response(chunk)
+            chat_span.set(tool_calls=len(scheduled))
+        return self._end_stream(chunk, parser, scheduled, meter)
 
-            if self._is_final_response(response_content):
-                final_response = response_content
-                break
+    async def _step(
+        self, messages: List[dict], meter: BudgetMeter, tools: List[dict] = None
+    ) -> Tuple[str, List[Tuple[ToolCall, asyncio.Future]], List[str], bool]:
+        """
+        Runs one model turn and schedules the tool calls it requests.
 
-            processor = ToolCallProcessor(response_content)
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        meter : BudgetMeter
+            The consumption of the run's budget, updated with the generated tokens.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
 
-            self.input_messages.append(
-                {"role": "assistant", "content": response_content}
+        Returns
+        -------
+        Tuple[str, List[Tuple[ToolCall, asyncio.Future]], List[str], bool]
+            The text generated in this turn, the scheduled calls ordered by `id`, the
+            errors of the calls that could not be read, and whether the turn holds
+            the final response.
+        """
+        if self.stream:
+            return await self._stream_step(messages, meter, tools)
+
+        with span("llm.chat", model=self.model) as chat_span:
+            response = await self.client.chat(
+                model=self.model, messages=messages, **self._chat_options(meter, tools)
             )
+            chat_span.record_response(response)
+        content, calls, errors, is_final = self._read_response(response, meter)
+        return content, self.dispatcher.adispatch(calls), errors, is_final
 
-            for call in processor.calls:
-                try:
-                    result = self.toolkit.get_tool_by_name(call.name).run(
-                        call.arguments
-                    )
+    async def run(
+        self, message: str, session: Session = None, budget: Budget = None
+    ) -> RunResult:
+        """
+        Answers a message within a budget of iterations, time and generated tokens.
+
+        The deadline also bounds each model request, which is cancelled when it passes.
 
-                    self.input_messages.append(
-                        {
-                            "role": "tool",
-                            "content": f"<tool_response>{result}</tool_response>",
-                        }
+        Parameters
+        ----------
+        message : str
+            The user's input message to be processed.
+        session : Session, optional
+            The conversation the message belongs to. The steps are appended to its
+            history. By default a new session is used for this call only.
+        budget : Budget, optional
+            The limits of this run, by default the agent's `budget`.
+
+        Returns
+        -------
+        RunResult
+            The final response, or the partial result of a run that ran out of budget.
+        """
+        with span("agent.run", agent=type(self).__name__, model=self.model) as run_span:
+            session, meter = self._begin_run(message, session, budget)
+            content = None
+            status = meter.exhausted()
+            while status is None:
+                with span("agent.step", step=meter.iterations):
+                    messages = self._prompt_messages(session, meter.iterations)
+                    try:
+                        content, scheduled, errors, is_final = await asyncio.wait_for(
+                            self._step(
+                                messages, meter, self._tool_definitions(session)
+                            ),
+                            meter.remaining_time(),
+                        )
+                    except asyncio.TimeoutError:
+                        status = "timeout"
+                        break
+                    self._record_turn(session, meter, content, scheduled)
+                    if is_final:
+                        status = "completed"
+                        break
+
+                    pending = ()
+                    if scheduled:
+                        with span("tools.wait", calls=len(scheduled)):
+                            _, pending = await asyncio.wait(
+                                [future for _, future in scheduled],
+                                timeout=meter.remaining_time(),
+                            )
+                    status = self._record_results(
+                        session, meter, scheduled, pending, errors
                     )
-                except AttributeError as ae:
-                    print(ae)
-            i += 1
 
-        return final_response
+            run_span.set(
+                status=status, iterations=meter.iterations, tokens=meter.tokens
+            )
+            return RunResult(content, status, meter, session)
+
+    async def start(self, message: str, session: Session = None) -> str:
+        """
+        Starts the interaction with the user by processing the input message
+        and returning the final response from the assistant.
+
+        Parameters
+        ----------
+        message : str
+            The user's input message to be processed.
+        session : Session, optional
+            The conversation the message belongs to. The steps are appended to its
+            history. By default a new session is used for this call only.
+
+        Returns
+        -------
+        str
+            The final response generated by the assistant, or `None` if the agent's
+            budget ran out first. Use `run` for the partial result.
+        """
+        result = await self.run(message, session=session)
+        return result.content if result.completed else None
+
+    async def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently, each one in its own session.
+
+        Every request goes through the agent's client, so the batch shares its
+        HTTP connection pool. At most `max_concurrency` messages are in flight, and
+        a message that fails is reported in its result without stopping the others.
+        Each message is served with `run`, within the agent's budget.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`. The response of
+            each is its `RunResult`, which tells a completed run from one that ran
+            out of budget.
+        """
+        results = [
+            result
+            async for result in self.iter_many(
+                messages, max_concurrency=max_concurrency
+            )
+        ]
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        See `start_many` for the concurrency and error handling.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve. A lazy iterable is consumed as slots free up.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        AsyncIterator[BatchResult]
+            The results, in completion order, each holding a `RunResult`.
+        """
+        return aiter_batch(self.run, messages, max_concurrency=max_concurrency)
@@ -0,0 +1,478 @@
+import asyncio
+import functools
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+_END = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _transport_errors() -> tuple:
+    errors = (ConnectionError, TimeoutError)
+    try:
+        import httpx
+    except ImportError:
+        return errors
+    return errors + (httpx.TransportError,)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _load(endpoint: "Endpoint") -> tuple:
+    return endpoint.outstanding, endpoint.requests
+
+
+def _model_names(response: Any) -> List[str]:
+    names = []
+    for model in response["models"]:
+        name = model["model"] if "model" in model else model["name"]
+        names.append(name)
+    return names
+
+
+class Endpoint:
+    """
+    One backend of a client pool.
+
+    Attributes
+    ----------
+    host : str
+        The backend's URL, or the `repr` of a client given as is.
+    client : Client
+        The client used for the backend's requests. It keeps its connections
+        open between requests.
+    models : Set[str]
+        The models the backend is known to have loaded, from its last health check
+        and the requests it served since.
+    outstanding : int
+        Requests sent to the backend and not completed yet.
+    requests : int
+        Requests sent to the backend.
+    errors : int
+        Requests that failed with a backend error.
+    healthy : bool
+        Whether the last request or health check succeeded.
+    retry_at : float
+        `time.monotonic()` time before which an unhealthy backend is avoided.
+    """
+
+    __slots__ = (
+        "host",
+        "client",
+        "models",
+        "outstanding",
+        "requests",
+        "errors",
+        "healthy",
+        "retry_at",
+    )
+
+    def __init__(self, host: str, client: Any):
+        self.host = host
+        self.client = client
+        self.models = set()
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.healthy = True
+        self.retry_at = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy or now >= self.retry_at
+
+    def __repr__(self):
+        return (
+            f"Endpoint({self.host!r}, healthy={self.healthy}, "
+            f"outstanding={self.outstanding}, requests={self.requests}, "
+            f"models={sorted(self.models)})"
+        )
+
+
+class ClientPool:
+    """
+    Spreads chat requests over several ollama backends.
+
+    The pool can be passed as the `client` of any agent. Each request goes to the
+    backend with the fewest outstanding requests among those that already have
+    the requested model loaded, so models are not loaded on every node. A backend
+    without the model is only used when none has it, or when every backend that
+    has it is at least `spill_over` requests busier.
+
+    A request failing with a connection error, a timeout or a 5xx response is
+    retried on another backend, and the failed backend is avoided for `cooldown`
+    seconds; the first request after the cooldown probes it again. A 404 response
+    (model not found) is retried elsewhere without marking the backend unhealthy.
+    Every `health_interval` seconds, a background check asks each backend for its
+    loaded models (`Client.ps`) and restores the ones that answer.
+
+    Parameters
+    ----------
+    hosts : Iterable[Union[str, Client]]
+        The backends: URLs such as "http://node-1:11434", for which a `Client` is
+        created, or client instances used as is.
+    max_connections : int, optional
+        Size of the connection pool of each backend's client. By default httpx's.
+    cooldown : float, optional
+        Seconds a failed backend is avoided, by default 10.
+    health_interval : float, optional
+        Seconds between background health checks, by default 30. `None` disables
+        them; `check_health` can still be called explicitly.
+    spill_over : int, optional
+        How many more outstanding requests the backends that have the model must
+        have than another backend before the latter is used, by default 4.
+    max_attempts : int, optional
+        Backends tried for one request, by default all of them.
+    **client_options
+        Keyword arguments of the `Client` created for each URL, e.g. `timeout`.
+
+    Attributes
+    ----------
+    endpoints : List[Endpoint]
+        The backends, with their load and health.
+    """
+
+    def __init__(
+        self,
+        hosts: Iterable[Any],
+        max_connections: int = None,
+        cooldown: float = 10.0,
+        health_interval: Optional[float] = 30.0,
+        spill_over: int = 4,
+        max_attempts: int = None,
+        **client_options: Any,
+    ):
+        if max_connections is not None:
+            import httpx
+
+            client_options["limits"] = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            )
+        self.endpoints = [
+            (
+                Endpoint(host, self._make_client(host, client_options))
+                if isinstance(host, str)
+                else Endpoint(repr(host), host)
+            )
+            for host in hosts
+        ]
+        if not self.endpoints:
+            raise ValueError("a client pool needs at least one host")
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self.spill_over = spill_over
+        self.max_attempts = max_attempts or len(self.endpoints)
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    @staticmethod
+    def _make_client(host: str, options: Mapping[str, Any]) -> Any:
+        try:
+            from ollama import Client
+        except ImportError as e:
+            raise ImportError(
+                "ClientPool requires the 'ollama' package: "
+                "install agentic_workflow[ollama]"
+            ) from e
+        return Client(host=host, **options)
+
+    def _acquire(self, model: str, tried: List[Endpoint]) -> Endpoint:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in tried]
+            # When every backend is down, probe them anyway rather than fail.
+            available = [e for e in candidates if e.available(now)] or candidates
+            endpoint = min(available, key=_load)
+            loaded = [e for e in available if model in e.models]
+            if loaded:
+                best = min(loaded, key=_load)
+                if best.outstanding - endpoint.outstanding < self.spill_over:
+                    endpoint = best
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, model: str, error: Exception = None):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.healthy = True
+                endpoint.models.add(model)
+                return
+            status = _status_code(error)
+            if status == 404:
+                endpoint.models.discard(model)
+            elif self._is_backend_error(error):
+                endpoint.errors += 1
+                endpoint.healthy = False
+                endpoint.retry_at = time.monotonic() + self.cooldown
+
+    @staticmethod
+    def _is_backend_error(error: Exception) -> bool:
+        status = _status_code(error)
+        if status is not None:
+            return status >= 500
+        return isinstance(error, _transport_errors())
+
+    def _retryable(self, error: Exception) -> bool:
+        return _status_code(error) == 404 or self._is_backend_error(error)
+
+    def _health_due(self) -> bool:
+        if self.health_interval is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.health_interval
+            return True
+
+    def _set_health(self, endpoint: Endpoint, response: Any = None, error=None):
+        with self._lock:
+            if error is not None:
+                endpoint.healthy = False
+                endpoint.retry_at = time.monotonic() + self.cooldown
+                return
+            endpoint.healthy = True
+            if response is not None:
+                endpoint.models = set(_model_names(response))
+
+    def chat(self, model: str = "", messages: Optional[List[Mapping]] = None, **kwargs):
+        """
+        Sends a chat request to the least loaded backend, failing over on errors.
+
+        Parameters
+        ----------
+        model : str
+            The model identifier.
+        messages : List[Mapping], optional
+            The conversation to complete.
+        **kwargs
+            Any other argument of `Client.chat`.
+
+        Returns
+        -------
+        Union[Mapping, Iterator[Mapping]]
+            The response, or an iterator of chunks when `stream=True`. A stream
+            fails over until its first chunk; later errors are raised to the caller.
+
+        Raises
+        ------
+        Exception
+            The error of the last backend tried, when every attempt failed or the
+            error is not a backend error (e.g. a 400 response).
+        """
+        if self._health_due():
+            threading.Thread(target=self.check_health, daemon=True).start()
+
+        stream = kwargs.get("stream", False)
+        tried = []
+        while True:
+            endpoint = self._acquire(model, tried)
+            try:
+                response = endpoint.client.chat(
+                    model=model, messages=messages, **kwargs
+                )
+                if stream:
+                    first = next(response, _END)
+            except Exception as e:
+                self._release(endpoint, model, e)
+                tried.append(endpoint)
+                if not self._retryable(e) or len(tried) >= self.max_attempts:
+                    raise
+                continue
+            if stream:
+                return _PooledStream(self, endpoint, model, first, response)
+            self._release(endpoint, model)
+            return response
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        Asks every backend for its loaded models and updates its health.
+
+        Clients without a `ps` method are assumed healthy.
+
+        Returns
+        -------
+        Dict[str, bool]
+            Whether each backend answered, by host.
+        """
+        for endpoint in self.endpoints:
+            ps = getattr(endpoint.client, "ps", None)
+            try:
+                response = ps() if ps is not None else None
+            except Exception as e:
+                self._set_health(endpoint, error=e)
+            else:
+                self._set_health(endpoint, response)
+        return {endpoint.host: endpoint.healthy for endpoint in self.endpoints}
+
+    def __repr__(self):
+        healthy = sum(endpoint.healthy for endpoint in self.endpoints)
+        outstanding = sum(endpoint.outstanding for endpoint in self.endpoints)
+        return (
+            f"{type(self).__name__}(endpoints={len(self.endpoints)}, "
+            f"healthy={healthy}, outstanding={outstanding})"
+        )
+
+
+class _PooledStream:
+    """
+    The chunks of a streamed response, holding the backend's slot until the
+    stream ends or is closed.
+    """
+
+    def __init__(self, pool, endpoint, model, first, chunks):
+        self._pool = pool
+        self._endpoint = endpoint
+        self._model = model
+        self._first = first
+        self._chunks = chunks
+        self._done = False
+
+    def _finish(self, error: Exception = None):
+        if not self._done:
+            self._done = True
+            self._pool._release(self._endpoint, self._model, error)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._first is not _END:
+            chunk, self._first = self._first, _END
+            return chunk
+        if self._done:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._first is not _END:
+            chunk, self._first = self._first, _END
+            return chunk
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+
+    def close(self):
+        self._finish()
+        if hasattr(self._chunks, "close"):
+            self._chunks.close()
+
+    async def aclose(self):
+        self._finish()
+        if hasattr(self._chunks, "aclose"):
+            await self._chunks.aclose()
+
+    def __del__(self):
+        self._finish()
+
+
+class AsyncClientPool(ClientPool):
+    """
+    Spreads chat requests over several ollama backends, for `ollama.AsyncClient`.
+
+    See `ClientPool` for the routing, failover and health checks. Background health
+    checks run as tasks of the event loop serving the requests.
+    """
+
+    @staticmethod
+    def _make_client(host: str, options: Mapping[str, Any]) -> Any:
+        try:
+            from ollama import AsyncClient
+        except ImportError as e:
+            raise ImportError(
+                "AsyncClientPool requires the 'ollama' package: "
+                "install agentic_workflow[ollama]"
+            ) from e
+        return AsyncClient(host=host, **options)
+
+    async def chat(
+        self, model: str = "", messages: Optional[List[Mapping]] = None, **kwargs
+    ):
+        """
+        Sends a chat request to the least loaded backend, failing over on errors.
+
+        Parameters
+        ----------
+        model : str
+            The model identifier.
+        messages : List[Mapping], optional
+            The conversation to complete.
+        **kwargs
+            Any other argument of `AsyncClient.chat`.
+
+        Returns
+        -------
+        Union[Mapping, AsyncIterator[Mapping]]
+            The response, or an async iterator of chunks when `stream=True`.
+        """
+        if self._health_due():
+            self._health_task = asyncio.ensure_future(self.check_health())
+
+        stream = kwargs.get("stream", False)
+        tried = []
+        while True:
+            endpoint = self._acquire(model, tried)
+            try:
+                response = await endpoint.client.chat(
+                    model=model, messages=messages, **kwargs
+                )
+                if stream:
+                    try:
+                        first = await response.__anext__()
+                    except StopAsyncIteration:
+                        first = _END
+            except Exception as e:
+                self._release(endpoint, model, e)
+                tried.append(endpoint)
+                if not self._retryable(e) or len(tried) >= self.max_attempts:
+                    raise
+                continue
+            if stream:
+                return _PooledStream(self, endpoint, model, first, response)
+            self._release(endpoint, model)
+            return response
+
+    async def check_health(self) -> Dict[str, bool]:
+        """
+        Asks every backend for its loaded models, concurrently, and updates its health.
+
+        Returns
+        -------
+        Dict[str, bool]
+            Whether each backend answered, by host.
+        """
+
+        async def check(endpoint):
+            ps = getattr(endpoint.client, "ps", None)
+            try:
+                response = await ps() if ps is not None else None
+            except Exception as e:
+                self._set_health(endpoint, error=e)
+            else:
+                self._set_health(endpoint, response)
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+        return {endpoint.host: endpoint.healthy for endpoint in self.endpoints}
@@ -0,0 +1,185 @@
+from collections import deque
+from typing import Iterable, List, Optional
+
+# Number of context reports a session keeps: those of the most recent steps.
+MAX_CONTEXT_REPORTS = 100
+
+
+def latest_question(messages: List[dict]) -> Optional[int]:
+    """
+    Finds the message holding the current question of a conversation.
+
+    Parameters
+    ----------
+    messages : List[dict]
+        The message history.
+
+    Returns
+    -------
+    Optional[int]
+        The index of the last user message, or `None` if there is none.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index]["role"] == "user":
+            return index
+    return None
+
+
+class Session:
+    """
+    The conversation state of one user of an agent.
+
+    Agents hold the immutable configuration (client, model, toolkit and system
+    prompt) and serve any number of sessions, so the same agent can be shared by
+    many conversations. A session only stores its message history, which starts
+    with the agent's system message and is optionally bounded.
+
+    Parameters
+    ----------
+    system_message : dict
+        The system message the history starts with. It is shared, not copied,
+        between the sessions of an agent.
+    max_messages : int, optional
+        Maximum number of messages kept, the system message included. When the
+        limit is exceeded the oldest messages after the system message are
+        dropped, except the latest user message, which holds the current
+        question. By default the history is unbounded.
+
+    Attributes
+    ----------
+    messages : List[dict]
+        The message history.
+    context_reports : Deque[ContextReport]
+        The prompt tokens saved by the agent's context window at each of the last
+        `MAX_CONTEXT_REPORTS` steps.
+    tools : Optional[List[str]]
+        The tools exposed to the model, when the agent selects them with a
+        `ToolIndex`. `None` means every tool of the toolkit.
+    closed : bool
+        Whether `close` was called.
+
+    Methods
+    -------
+    append(message: dict)
+        Adds a message to the history.
+    extend(messages: Iterable[dict])
+        Adds several messages to the history.
+    set_system_message(system_message: dict)
+        Replaces the system message the history starts with.
+    reset()
+        Clears the history, keeping the system message.
+    close()
+        Releases the history. A closed session can no longer be used.
+    """
+
+    __slots__ = (
+        "system_message",
+        "max_messages",
+        "context_reports",
+        "tools",
+        "_messages",
+    )
+
+    def __init__(self, system_message: dict, max_messages: int = None):
+        if max_messages is not None and max_messages < 3:
+            raise ValueError(
+                "max_messages must keep the system message, the question and one more"
+            )
+        self.system_message = system_message
+        self.max_messages = max_messages
+        self.context_reports = deque(maxlen=MAX_CONTEXT_REPORTS)
+        self.tools = None
+        self._messages = [system_message]
+
+    @property
+    def messages(self) -> List[dict]:
+        if self._messages is None:
+            raise RuntimeError("the session is closed")
+        return self._messages
+
+    @property
+    def closed(self) -> bool:
+        return self._messages is None
+
+    def append(self, message: dict):
+        """
+        Adds a message to the history, dropping the oldest ones beyond `max_messages`.
+
+        Parameters
+        ----------
+        message : dict
+            The message to add.
+        """
+        self.messages.append(message)
+        self._trim()
+
+    def extend(self, messages: Iterable[dict]):
+        """
+        Adds several messages to the history, dropping the oldest ones beyond `max_messages`.
+
+        Parameters
+        ----------
+        messages : Iterable[dict]
+            The messages to add.
+        """
+        self.messages.extend(messages)
+        self._trim()
+
+    def set_system_message(self, system_message: dict):
+        """
+        Replaces the system message, e.g. after the tools exposed to the model changed.
+
+        Parameters
+        ----------
+        system_message : dict
+            The new system message.
+        """
+        self.messages[0] = system_message
+        self.system_message = system_message
+
+    def _trim(self):
+        messages = self._messages
+        excess = len(messages) - (self.max_messages or len(messages))
+        if excess <= 0:
+            return
+        question = latest_question(messages)
+        if question is None or question > excess:
+            del messages[1 : 1 + excess]
+            return
+        # The question is pinned: drop what precedes it, then its oldest replies.
+        del messages[1:question]
+        excess -= question - 1
+        del messages[2 : 2 + excess]
+
+    def reset(self):
+        """
+        Clears the history and the context reports, keeping the system message
+        and the tools it exposes.
+        """
+        if self._messages is None:
+            raise RuntimeError("the session is closed")
+        self._messages = [self.system_message]
+        self.context_reports.clear()
+
+    def close(self):
+        """
+        Releases the history. Using the session afterwards raises `RuntimeError`.
+        """
+        self._messages = None
+        self.context_reports.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __repr__(self):
+        if self.closed:
+            return "Session(closed)"
+        return (
+            f"Session(messages={len(self._messages)}, max_messages={self.max_messages})"
+        )
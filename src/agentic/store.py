@@ -0,0 +1,525 @@
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+from agentic.session import Session
+
+# Record kinds of the log: a message, a system message, a reset and a deletion.
+_MESSAGE, _SYSTEM, _RESET, _DELETE = b"m", b"s", b"r", b"d"
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return str(value)
+
+
+def _encode(session_id: str, kind: bytes, payload: Any) -> bytes:
+    data = json.dumps(
+        payload, separators=(",", ":"), ensure_ascii=False, default=_jsonable
+    )
+    return session_id.encode() + b"\t" + kind + b"\t" + data.encode() + b"\n"
+
+
+class StoredSession(Session):
+    """
+    A `Session` whose history is written through to a `SessionStore`.
+
+    Every message is appended to the store's log before it is added to the
+    history, so the conversation survives evictions and restarts. An evicted
+    session releases its history; it is read back from the log the next time the
+    messages are accessed, without replaying any model call.
+
+    Sessions are created with `SessionStore.create` or resumed with
+    `SessionStore.get`, not instantiated directly.
+
+    Attributes
+    ----------
+    session_id : str
+        The key of the session in the store.
+    store : SessionStore
+        The store holding the session, or `None` once it is closed.
+    last_used : float
+        `time.monotonic()` time of the last access to the history.
+    resident : bool
+        Whether the history is in memory.
+    """
+
+    __slots__ = ("session_id", "store", "last_used", "__weakref__")
+
+    def __init__(
+        self,
+        store: "SessionStore",
+        session_id: str,
+        system_message: dict,
+        max_messages: int = None,
+    ):
+        super().__init__(system_message, max_messages=max_messages)
+        self.session_id = session_id
+        self.store = store
+        self.last_used = time.monotonic()
+
+    @property
+    def messages(self) -> List[dict]:
+        if self.store is None:
+            raise RuntimeError("the session is closed")
+        if self._messages is None:
+            self.store._load(self)
+        self.store._touch(self)
+        return self._messages
+
+    @property
+    def closed(self) -> bool:
+        return self.store is None
+
+    @property
+    def resident(self) -> bool:
+        return self._messages is not None
+
+    def _locked(self) -> threading.RLock:
+        """
+        Returns the store's lock, held while the history is changed so that an
+        eviction from another thread cannot release it halfway.
+        """
+        if self.store is None:
+            raise RuntimeError("the session is closed")
+        return self.store._lock
+
+    def append(self, message: dict):
+        with self._locked():
+            messages = self.messages
+            self.store._write(self.session_id, _MESSAGE, message)
+            messages.append(message)
+            self._trim()
+
+    def extend(self, messages: Iterable[dict]):
+        for message in messages:
+            self.append(message)
+
+    def set_system_message(self, system_message: dict):
+        with self._locked():
+            messages = self.messages
+            self.store._write(
+                self.session_id,
+                _SYSTEM,
+                {"message": system_message, "tools": self.tools},
+            )
+            messages[0] = system_message
+            self.system_message = system_message
+
+    def reset(self):
+        """
+        Clears the history and the context reports, keeping the system message
+        and the tools it exposes. The cleared messages are dropped from the log at
+        the next `SessionStore.compact`.
+        """
+        if self.store is None:
+            raise RuntimeError("the session is closed")
+        self.store._reset(self)
+        self._messages = [self.system_message]
+        self.context_reports.clear()
+
+    def _release(self):
+        self._messages = None
+        self.context_reports.clear()
+
+    def close(self):
+        """
+        Releases the history and detaches the session from its store. The
+        conversation stays in the store and can be resumed with `SessionStore.get`.
+        """
+        if self.store is not None:
+            self.store._forget(self)
+        self._release()
+        self.store = None
+
+    def __repr__(self):
+        if self.closed:
+            return f"StoredSession({self.session_id!r}, closed)"
+        if not self.resident:
+            return f"StoredSession({self.session_id!r}, evicted)"
+        return (
+            f"StoredSession({self.session_id!r}, messages={len(self._messages)}, "
+            f"max_messages={self.max_messages})"
+        )
+
+
+class SessionStore:
+    """
+    Keeps conversations in an append-only log on disk and at most `max_resident`
+    of them in memory.
+
+    Each message is appended to the log as one line, `<session id>\\t<kind>\\t<json>`,
+    and the offset of every line is kept in a per-session index, so resuming a
+    session reads back its own lines only. Opening an existing log rebuilds the
+    index with a single scan that does not decode the messages. When more than
+    `max_resident` sessions are in memory, the least recently used one is
+    evicted; `evict_idle` also evicts the sessions idle for a given time.
+
+    Resets and deletions are appended as records too; `compact` rewrites the log
+    without the records they made obsolete.
+
+    Parameters
+    ----------
+    path : str
+        The log file. It is created if missing.
+    max_resident : int, optional
+        Maximum number of sessions whose history is kept in memory, by default 1024.
+    sync : bool, optional
+        Whether every record is flushed to the disk (`os.fsync`) before the call
+        returns, by default False: records are flushed to the operating system,
+        which survives a crash of the process but not of the machine.
+
+    Attributes
+    ----------
+    path : str
+        The log file.
+    max_resident : int
+        Maximum number of sessions kept in memory.
+
+    Methods
+    -------
+    create(system_message: dict, session_id: str = None, max_messages: int = None) -> StoredSession
+        Starts a new conversation.
+    get(session_id: str, max_messages: int = None) -> StoredSession
+        Resumes a conversation.
+    evict(session_id: str) -> bool
+        Releases the history of a session from memory.
+    evict_idle(idle: float) -> int
+        Releases the sessions not used for `idle` seconds.
+    delete(session_id: str)
+        Removes a conversation from the store.
+    compact()
+        Rewrites the log without obsolete records.
+    close()
+        Closes the log.
+    """
+
+    def __init__(self, path: str, max_resident: int = 1024, sync: bool = False):
+        if max_resident < 1:
+            raise ValueError("max_resident must be at least 1")
+        self.path = path
+        self.max_resident = max_resident
+        self.sync = sync
+        self._lock = threading.RLock()
+        self._index: Dict[str, array] = {}
+        self._resident: "OrderedDict[str, StoredSession]" = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._open()
+
+    def _open(self):
+        self._size = self._scan()
+        self._writer = open(self.path, "ab")
+        self._reader = open(self.path, "rb")
+
+    def _scan(self) -> int:
+        """
+        Rebuilds the index from the log and returns the length of its valid part.
+        A last line cut short by a crash is truncated.
+        """
+        index = self._index = {}
+        offset = 0
+        if not os.path.exists(self.path):
+            return offset
+        with open(self.path, "rb") as log:
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break
+                session_id, kind, _ = line.split(b"\t", 2)
+                session_id = session_id.decode()
+                if kind == _RESET:
+                    index[session_id] = array("q")
+                elif kind == _DELETE:
+                    index.pop(session_id, None)
+                else:
+                    index.setdefault(session_id, array("q")).append(offset)
+                offset += len(line)
+        if offset != os.path.getsize(self.path):
+            os.truncate(self.path, offset)
+        return offset
+
+    def _append(self, line: bytes) -> int:
+        offset = self._size
+        self._writer.write(line)
+        self._writer.flush()
+        if self.sync:
+            os.fsync(self._writer.fileno())
+        self._size += len(line)
+        return offset
+
+    def _write(self, session_id: str, kind: bytes, payload: Any):
+        line = _encode(session_id, kind, payload)
+        with self._lock:
+            self._index[session_id].append(self._append(line))
+
+    def _reset(self, session: StoredSession):
+        system = {"message": session.system_message, "tools": session.tools}
+        with self._lock:
+            self._append(_encode(session.session_id, _RESET, None))
+            offset = self._append(_encode(session.session_id, _SYSTEM, system))
+            self._index[session.session_id] = array("q", [offset])
+
+    def _read(self, session_id: str) -> List[tuple]:
+        with self._lock:
+            offsets = self._index.get(session_id)
+            if offsets is None:
+                raise KeyError(session_id)
+            lines = []
+            for offset in offsets:
+                self._reader.seek(offset)
+                lines.append(self._reader.readline())
+        records = []
+        for line in lines:
+            _, kind, data = line.split(b"\t", 2)
+            records.append((kind, json.loads(data)))
+        return records
+
+    def _load(self, session: StoredSession):
+        """
+        Reads the history of an evicted session back from the log.
+        """
+        messages = []
+        tools = None
+        for kind, payload in self._read(session.session_id):
+            if kind == _MESSAGE:
+                messages.append(payload)
+                continue
+            session.system_message = payload["message"]
+            tools = payload["tools"]
+            if messages:
+                messages[0] = session.system_message
+            else:
+                messages.append(session.system_message)
+        # An evicted session keeps its tools, which may be newer than the log.
+        if session.tools is None:
+            session.tools = tools
+        session._messages = messages
+        session._trim()
+
+    def _touch(self, session: StoredSession):
+        session.last_used = time.monotonic()
+        with self._lock:
+            resident = self._resident
+            if resident.get(session.session_id) is session:
+                resident.move_to_end(session.session_id)
+                return
+            resident[session.session_id] = session
+            while len(resident) > self.max_resident:
+                _, oldest = resident.popitem(last=False)
+                oldest._release()
+
+    def _forget(self, session: StoredSession):
+        with self._lock:
+            if self._resident.get(session.session_id) is session:
+                del self._resident[session.session_id]
+            if self._live.get(session.session_id) is session:
+                del self._live[session.session_id]
+
+    def create(
+        self, system_message: dict, session_id: str = None, max_messages: int = None
+    ) -> StoredSession:
+        """
+        Starts a new conversation.
+
+        Parameters
+        ----------
+        system_message : dict
+            The system message the history starts with.
+        session_id : str, optional
+            The key of the session. A random one is generated by default.
+        max_messages : int, optional
+            Maximum number of messages kept in memory, see `Session`. The log keeps
+            every message.
+
+        Returns
+        -------
+        StoredSession
+            The new session, resident in memory.
+
+        Raises
+        ------
+        ValueError
+            If the id is already used or holds a tab or a newline.
+        """
+        if session_id is None:
+            session_id = uuid.uuid4().hex
+        elif "\t" in session_id or "\n" in session_id:
+            raise ValueError("session ids cannot hold tabs or newlines")
+        line = _encode(session_id, _SYSTEM, {"message": system_message, "tools": None})
+        with self._lock:
+            if session_id in self._index:
+                raise ValueError(f"session {session_id!r} already exists")
+            self._index[session_id] = array("q", [self._append(line)])
+            session = StoredSession(self, session_id, system_message, max_messages)
+            self._live[session_id] = session
+            self._touch(session)
+        return session
+
+    def get(self, session_id: str, max_messages: int = None) -> StoredSession:
+        """
+        Resumes a conversation, from memory if it is resident or from the log.
+
+        Parameters
+        ----------
+        session_id : str
+            The key of the session.
+        max_messages : int, optional
+            Maximum number of messages kept in memory, when the session is read
+            back from the log.
+
+        Returns
+        -------
+        StoredSession
+            The session. Its history is read from the log on first access.
+
+        Raises
+        ------
+        KeyError
+            If the store holds no such session.
+        """
+        with self._lock:
+            session = self._live.get(session_id)
+            if session is not None:
+                return session
+            if session_id not in self._index:
+                raise KeyError(session_id)
+            # The system message is read back with the history.
+            session = StoredSession(self, session_id, None, max_messages)
+            session._messages = None
+            self._live[session_id] = session
+        return session
+
+    def evict(self, session_id: str) -> bool:
+        """
+        Releases the history of a session from memory. It is read back from the
+        log on next use.
+
+        Returns
+        -------
+        bool
+            Whether the session was resident.
+        """
+        with self._lock:
+            session = self._resident.pop(session_id, None)
+            if session is None:
+                return False
+            session._release()
+            return True
+
+    def evict_idle(self, idle: float) -> int:
+        """
+        Releases the history of every session not used for `idle` seconds.
+
+        Returns
+        -------
+        int
+            The number of sessions evicted.
+        """
+        deadline = time.monotonic() - idle
+        evicted = 0
+        with self._lock:
+            # The resident sessions are ordered from the least recently used.
+            while self._resident:
+                session = next(iter(self._resident.values()))
+                if session.last_used > deadline:
+                    break
+                self._resident.popitem(last=False)
+                session._release()
+                evicted += 1
+        return evicted
+
+    def delete(self, session_id: str):
+        """
+        Removes a conversation from the store. Its records are dropped from the
+        log at the next `compact`.
+
+        Raises
+        ------
+        KeyError
+            If the store holds no such session.
+        """
+        with self._lock:
+            if session_id not in self._index:
+                raise KeyError(session_id)
+            self._append(_encode(session_id, _DELETE, None))
+            del self._index[session_id]
+            session = self._live.get(session_id)
+            if session is not None:
+                session.close()
+
+    def compact(self):
+        """
+        Rewrites the log with the current records of every session only, dropping
+        those of deleted sessions and reset histories. The new log replaces the
+        old one atomically.
+        """
+        temp_path = self.path + ".compact"
+        with self._lock:
+            self._writer.flush()
+            index = {}
+            offset = 0
+            with open(temp_path, "wb") as temp:
+                for session_id, offsets in self._index.items():
+                    new_offsets = index[session_id] = array("q")
+                    for old in offsets:
+                        self._reader.seek(old)
+                        line = self._reader.readline()
+                        temp.write(line)
+                        new_offsets.append(offset)
+                        offset += len(line)
+                temp.flush()
+                os.fsync(temp.fileno())
+            self._writer.close()
+            self._reader.close()
+            os.replace(temp_path, self.path)
+            self._index = index
+            self._size = offset
+            self._writer = open(self.path, "ab")
+            self._reader = open(self.path, "rb")
+
+    @property
+    def resident(self) -> int:
+        return len(self._resident)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._index)
+
+    def size(self) -> int:
+        """
+        Returns the length of the log, in bytes.
+        """
+        return self._size
+
+    def close(self):
+        """
+        Closes the log. Resident sessions keep their history but can no longer be
+        written to.
+        """
+        with self._lock:
+            self._writer.close()
+            self._reader.close()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"SessionStore({self.path!r}, sessions={len(self._index)}, "
+            f"resident={len(self._resident)}, bytes={self._size})"
+        )
@@ -1,9 +1,33 @@
-import json
-from typing import Any, Callable, List, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
 
-from ollama._client import Client
+from agentic.batch import BatchResult, aiter_batch, iter_batch
+from agentic.session import Session
+from tool import (
+    ToolCall,
+    ToolCallParser,
+    ToolDispatcher,
+    ToolIndex,
+    ToolKit,
+    format_native_calls,
+    span,
+)
 
-from agentic.tool import ToolCallProcessor, ToolKit
+if TYPE_CHECKING:
+    # The agents only need an object with ollama's `chat` API; importing the client
+    # stack is deferred to the caller.
+    from ollama import AsyncClient, Client
+
+    from agentic.store import SessionStore
 
 TOOL_PROMPT = """
 You are a function calling AI model.
@@ -20,6 +44,64 @@ For each function call to a listed function, return a JSON object with function
 </tool_call>
 """
 
+NATIVE_TOOL_PROMPT = """
+You are a function calling AI model.
+If a function or tool is unavailable, respond with trained data.
+You may call one or more of the provided functions to assist with the user query.
+"""
+
+# How tools are offered to the model and how its calls are read back:
+# - "xml": schemas in the system message, calls scraped from <tool_call> tags.
+# - "native": the toolkit is sent as the `tools` argument of the chat API and the
+#   calls are read from `message.tool_calls`, falling back to tags when it is empty.
+TOOL_MODES = ("xml", "native")
+
+
+def check_tool_mode(tool_mode: str):
+    if tool_mode not in TOOL_MODES:
+        raise ValueError(f"tool_mode must be one of {TOOL_MODES}, got {tool_mode!r}")
+
+
+def tool_error(error: BaseException) -> str:
+    """
+    Describes a failed tool call as its result, so the model can fix the arguments
+    or work around the failure instead of the run being aborted.
+
+    Parameters
+    ----------
+    error : BaseException
+        The exception raised by the call (invalid arguments, a failing tool, a
+        timeout or a failed dependency).
+
+    Returns
+    -------
+    str
+        The text sent back to the model.
+    """
+    return f"Error: {type(error).__name__}: {error}"
+
+
+def call_errors(parser: ToolCallParser) -> List[str]:
+    """
+    Describes the tool calls of a turn that could not be run, because their block
+    is not valid JSON even after repair or their payload is not a valid call, so
+    the model learns that they failed and can send them again.
+
+    Parameters
+    ----------
+    parser : ToolCallParser
+        The parser that read the turn.
+
+    Returns
+    -------
+    List[str]
+        The text sent back to the model for each rejected payload.
+    """
+    return [
+        f"Error: invalid tool call {payload}: {error}"
+        for payload, error in parser.errors + parser.invalid_calls
+    ]
+
 
 class ToolAgent:
     """
@@ -36,7 +118,24 @@ class ToolAgent:
     toolkit : Union[ToolKit, List[Callable[..., Any]]], optional
         A toolkit containing callable tools for use in responses. If a list is provided, it is converted to a ToolKit instance.
     system_message : str, optional
-        System message template containing available tools and instructions, by default TOOL_PROMPT.
+        System message template containing available tools and instructions, by default
+        TOOL_PROMPT, or NATIVE_TOOL_PROMPT in native mode.
+    max_workers : int, optional
+        Number of threads used to run the tool calls of a single model turn concurrently.
+        By default the calls are run sequentially.
+    tool_index : ToolIndex, optional
+        Selects the tools whose schemas are sent for each message, instead of every
+        tool of the toolkit. Tools the model calls outside the selection are added
+        to it. By default every schema is sent.
+    schema_style : str, optional
+        How tool schemas are rendered in the system message, one of "json" (the
+        default), "compact", "summary" or "signature". See `ToolKit.render_schemas`.
+    tool_mode : str, optional
+        How tools are offered to the model, by default "xml": schemas are embedded
+        in the system message and calls are parsed from `<tool_call>` tags. With
+        "native" the toolkit is passed as the `tools` argument of the chat API and
+        calls are read from `message.tool_calls`; tagged calls are still parsed
+        when a model answers with text. The system message is then used as is.
 
     Attributes
     ----------
@@ -46,31 +145,48 @@ class ToolAgent:
         The model identifier for the AI model in use.
     toolkit : ToolKit
         A toolkit containing tools available for calling within the AI's responses.
-    input_messages : list
-        A list of dictionaries containing system and user messages.
-    output_messages : list
-        A list of dictionaries containing user and tool response messages.
     system_message : str
         The system message generated with available tools for the AI model.
+    dispatcher : ToolDispatcher
+        Runs the tool calls requested by the model.
+    tool_index : ToolIndex
+        Selects the tools whose schemas are sent, or `None`.
+    schema_style : str
+        How tool schemas are rendered in the system message.
+    tool_mode : str
+        How tools are offered to the model, "xml" or "native".
     """
 
     def __init__(
         self,
         name: str = None,
-        client: Client = None,
+        client: "Client" = None,
         model: str = None,
         toolkit: Union[ToolKit, List[Callable[..., Any]]] = None,
-        system_message: str = TOOL_PROMPT,
+        system_message: str = None,
+        max_workers: int = None,
+        tool_index: ToolIndex = None,
+        schema_style: str = "json",
+        tool_mode: str = "xml",
     ):
+        check_tool_mode(tool_mode)
+        if system_message is None:
+            system_message = (
+                NATIVE_TOOL_PROMPT if tool_mode == "native" else TOOL_PROMPT
+            )
         self.client = client
         self.model = model
         if isinstance(toolkit, list):
             self.toolkit = ToolKit(tools=toolkit)
         else:
             self.toolkit = toolkit
-        self.input_messages = []
-        self.output_messages = []
+        self.schema_style = schema_style
+        self.tool_mode = tool_mode
         self.system_message = self._initialize_system_message(system_message)
+        self._system = {"role": "system", "content": self.system_message}
+        self._template = system_message
+        self.dispatcher = ToolDispatcher(self.toolkit, max_workers=max_workers)
+        self.tool_index = tool_index
 
     def _tool_schemas_str(self) -> str:
         """
@@ -81,9 +197,7 @@ class ToolAgent:
         str
             JSON-formatted string of all available tool schemas.
         """
-        return "\n\n".join(
-            [json.dumps(schema, indent=4) for schema in self.toolkit.tools_schemas()]
-        )
+        return self.toolkit.render_schemas(style=self.schema_style)
 
     def _initialize_system_message(self, system_message: str) -> str:
         """
@@ -97,11 +211,131 @@ class ToolAgent:
         Returns
         -------
         str
-            The formatted system message with tool schemas embedded.
+            The formatted system message with tool schemas embedded, or the
+            template itself in native mode.
+        """
+        if self.tool_mode == "native":
+            return system_message
+        return self.toolkit.render_prompt(system_message, style=self.schema_style)
+
+    def session(
+        self,
+        max_messages: int = None,
+        store: "SessionStore" = None,
+        session_id: str = None,
+    ) -> Session:
+        """
+        Creates a conversation served by this agent.
+
+        Parameters
+        ----------
+        max_messages : int, optional
+            Maximum number of messages kept in the session history. By default the
+            history is unbounded.
+        store : SessionStore, optional
+            Writes the history through to an on-disk log, so the session can be
+            evicted from memory and resumed with `store.get(session.session_id)`.
+            By default the history only lives in memory.
+        session_id : str, optional
+            The key of the session in `store`, random by default.
+
+        Returns
+        -------
+        Session
+            A new session whose history holds the agent's system message.
         """
-        return system_message % self._tool_schemas_str()
+        if store is not None:
+            return store.create(
+                self._system, session_id=session_id, max_messages=max_messages
+            )
+        return Session(self._system, max_messages=max_messages)
 
-    def start(self, message: str) -> str:
+    def _select_tools(self, session: Session, names: Iterable[str]):
+        """
+        Exposes more tools to the model in a session, rewriting its system message
+        with their schemas. The first selection replaces the full list of tools.
+
+        Parameters
+        ----------
+        session : Session
+            The conversation.
+        names : Iterable[str]
+            The tools to add to the session's selection.
+        """
+        first = session.tools is None
+        if first:
+            session.tools = []
+        added = [name for name in names if name not in session.tools]
+        session.tools.extend(added)
+        # In native mode the selection is sent as the `tools` argument instead.
+        if (added or first) and self.tool_mode != "native":
+            prompt = self.toolkit.render_prompt(
+                self._template, session.tools, self.schema_style
+            )
+            session.set_system_message({"role": "system", "content": prompt})
+
+    def _tool_definitions(self, session: Session) -> Union[List[dict], None]:
+        """
+        Returns the `tools` argument of a chat request: the definitions of the
+        session's tools in native mode, `None` otherwise.
+        """
+        if self.tool_mode != "native":
+            return None
+        return self.toolkit.tool_definitions(session.tools)
+
+    def _tool_calls(self, message: Any) -> Tuple[List[ToolCall], bool, List[str]]:
+        """
+        Reads the tool calls of a response message.
+
+        Parameters
+        ----------
+        message : Mapping
+            The `message` of the chat response.
+
+        Returns
+        -------
+        Tuple[List[ToolCall], bool, List[str]]
+            The calls, whether they came from `message.tool_calls`, and the errors
+            of the calls that could not be read, see `call_errors`.
+        """
+        parser = ToolCallParser()
+        if self.tool_mode == "native":
+            calls = parser.feed_native(message)
+            if calls:
+                return calls, True, call_errors(parser)
+        return parser.feed(message["content"]), False, call_errors(parser)
+
+    def _tool_message(self, call: ToolCall, result: Any) -> dict:
+        if self.tool_mode == "native":
+            return {"role": "tool", "content": str(result), "tool_name": call.name}
+        return {"role": "tool", "content": f"result of call to {call.name}: {result}"}
+
+    def _error_message(self, error: str) -> dict:
+        return {"role": "tool", "content": error}
+
+    def _chat(self, messages: List[dict], tools: List[dict] = None) -> Any:
+        """
+        Sends a chat request, recording its timings in an "llm.chat" span.
+
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
+
+        Returns
+        -------
+        Any
+            The model response.
+        """
+        options = {} if tools is None else {"tools": tools}
+        with span("llm.chat", model=self.model) as chat_span:
+            response = self.client.chat(model=self.model, messages=messages, **options)
+            chat_span.record_response(response)
+        return response
+
+    def start(self, message: str, session: Session = None) -> str:
         """
         Send a message to the model and handle tool calls returned by the model.
 
@@ -109,37 +343,289 @@ class ToolAgent:
         ----------
         message : str
             The user's message or query to the model.
+        session : Session, optional
+            The conversation the message belongs to. The exchange is appended to its
+            history. By default a new session is used for this call only.
 
         Returns
         -------
         str
             The model's final response after processing any tool calls.
         """
-        self.input_messages.append(
-            {
-                "role": "system",
-                "content": self.system_message,
-            }
+        with span("agent.start", agent=type(self).__name__, model=self.model):
+            if session is None:
+                session = self.session()
+            if self.tool_index is not None:
+                self._select_tools(session, self.tool_index.select(message))
+            session.append({"role": "user", "content": message})
+
+            response = self._chat(session.messages, self._tool_definitions(session))
+
+            calls, native, errors = self._tool_calls(response["message"])
+            if native:
+                session.append(
+                    {
+                        "role": "assistant",
+                        "content": response["message"]["content"],
+                        "tool_calls": format_native_calls(calls),
+                    }
+                )
+            for call, future in self.dispatcher.dispatch(calls):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = tool_error(e)
+                session.append(self._tool_message(call, result))
+            session.extend(self._error_message(error) for error in errors)
+
+            if self.tool_index is not None:
+                names = [call.name for call in calls]
+                self._select_tools(
+                    session, self.tool_index.expand(session.tools, names)
+                )
+
+            # The answer is generated from the exchange without the tool-calling prompt.
+            result = self._chat(session.messages[1:])
+            content = result["message"]["content"]
+            session.append({"role": "assistant", "content": content})
+
+            return content
+
+    def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently, each one in its own session.
+
+        Every request goes through the agent's client, so the batch shares its
+        HTTP connection pool. At most `max_concurrency` messages are in flight, and
+        a message that fails is reported in its result without stopping the others.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`.
+        """
+        results = list(self.iter_many(messages, max_concurrency=max_concurrency))
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> Iterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        See `start_many` for the concurrency and error handling.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve. A lazy iterable is consumed as slots free up.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        Iterator[BatchResult]
+            The results, in completion order.
+        """
+        return iter_batch(self.start, messages, max_concurrency=max_concurrency)
+
+
+class AsyncToolAgent(ToolAgent):
+    """
+    A `ToolAgent` that runs on an event loop.
+
+    Chat requests go through `ollama.AsyncClient`, coroutine tools are awaited
+    natively and regular tools are pushed to an executor, so a single event loop
+    can drive many agents sharing one client and toolkit.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the AsyncToolAgent instance.
+    client : AsyncClient
+        An asynchronous client instance to interact with the AI model.
+    model : str
+        Model identifier for the AI model to use.
+    toolkit : Union[ToolKit, List[Callable[..., Any]]], optional
+        A toolkit containing callable tools for use in responses. If a list is provided, it is converted to a ToolKit instance.
+    system_message : str, optional
+        System message template containing available tools and instructions, by default
+        TOOL_PROMPT, or NATIVE_TOOL_PROMPT in native mode.
+    max_workers : int, optional
+        Number of threads used to run regular (non-coroutine) tools. By default the
+        event loop's default executor is used.
+    tool_index : ToolIndex, optional
+        Selects the tools whose schemas are sent for each message.
+    schema_style : str, optional
+        How tool schemas are rendered in the system message, by default "json".
+    tool_mode : str, optional
+        How tools are offered to the model, "xml" (the default) or "native".
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        client: "AsyncClient" = None,
+        model: str = None,
+        toolkit: Union[ToolKit, List[Callable[..., Any]]] = None,
+        system_message: str = None,
+        max_workers: int = None,
+        tool_index: ToolIndex = None,
+        schema_style: str = "json",
+        tool_mode: str = "xml",
+    ):
+        super().__init__(
+            name=name,
+            client=client,
+            model=model,
+            toolkit=toolkit,
+            system_message=system_message,
+            max_workers=max_workers,
+            tool_index=tool_index,
+            schema_style=schema_style,
+            tool_mode=tool_mode,
         )
-        self.input_messages.append({"role": "user", "content": message})
 
-        response = self.client.chat(model=self.model, messages=self.input_messages)
+    async def _chat(self, messages: List[dict], tools: List[dict] = None) -> Any:
+        """
+        Sends a chat request, recording its timings in an "llm.chat" span.
 
-        processor = ToolCallProcessor(response["message"]["content"])
-        self.output_messages.append({"role": "user", "content": message})
+        Parameters
+        ----------
+        messages : List[dict]
+            The messages to send to the model.
+        tools : List[dict], optional
+            The tool definitions sent in native mode.
 
-        for call in processor.calls:
-            try:
-                result = self.toolkit.get_tool_by_name(call.name).run(call.arguments)
-                self.output_messages.append(
+        Returns
+        -------
+        Any
+            The model response.
+        """
+        options = {} if tools is None else {"tools": tools}
+        with span("llm.chat", model=self.model) as chat_span:
+            response = await self.client.chat(
+                model=self.model, messages=messages, **options
+            )
+            chat_span.record_response(response)
+        return response
+
+    async def start(self, message: str, session: Session = None) -> str:
+        """
+        Send a message to the model and handle tool calls returned by the model.
+
+        Parameters
+        ----------
+        message : str
+            The user's message or query to the model.
+        session : Session, optional
+            The conversation the message belongs to. The exchange is appended to its
+            history. By default a new session is used for this call only.
+
+        Returns
+        -------
+        str
+            The model's final response after processing any tool calls.
+        """
+        with span("agent.start", agent=type(self).__name__, model=self.model):
+            if session is None:
+                session = self.session()
+            if self.tool_index is not None:
+                self._select_tools(session, self.tool_index.select(message))
+            session.append({"role": "user", "content": message})
+
+            response = await self._chat(
+                session.messages, self._tool_definitions(session)
+            )
+
+            calls, native, errors = self._tool_calls(response["message"])
+            if native:
+                session.append(
                     {
-                        "role": "tool",
-                        "content": f"result of call to {call.name}: {result}",
+                        "role": "assistant",
+                        "content": response["message"]["content"],
+                        "tool_calls": format_native_calls(calls),
                     }
                 )
-            except AttributeError as ae:
-                print(ae)
+            for call, task in self.dispatcher.adispatch(calls):
+                try:
+                    result = await task
+                except Exception as e:
+                    result = tool_error(e)
+                session.append(self._tool_message(call, result))
+            session.extend(self._error_message(error) for error in errors)
+
+            if self.tool_index is not None:
+                names = [call.name for call in calls]
+                self._select_tools(
+                    session, self.tool_index.expand(session.tools, names)
+                )
+
+            result = await self._chat(session.messages[1:])
+            content = result["message"]["content"]
+            session.append({"role": "assistant", "content": content})
 
-        result = self.client.chat(model=self.model, messages=self.output_messages)
+            return content
 
-        return result["message"]["content"]
+    async def start_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> List[BatchResult]:
+        """
+        Serves many messages concurrently, each one in its own session.
+
+        Every request goes through the agent's client, so the batch shares its
+        HTTP connection pool. At most `max_concurrency` messages are in flight, and
+        a message that fails is reported in its result without stopping the others.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        List[BatchResult]
+            One result per message, in the order of `messages`.
+        """
+        results = [
+            result
+            async for result in self.iter_many(
+                messages, max_concurrency=max_concurrency
+            )
+        ]
+        results.sort(key=lambda result: result.index)
+        return results
+
+    def iter_many(
+        self, messages: Iterable[str], max_concurrency: int = 8
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Serves many messages concurrently and yields each result as soon as it completes.
+
+        See `start_many` for the concurrency and error handling.
+
+        Parameters
+        ----------
+        messages : Iterable[str]
+            The messages to serve. A lazy iterable is consumed as slots free up.
+        max_concurrency : int, optional
+            Maximum number of messages served at the same time, by default 8.
+
+        Returns
+        -------
+        AsyncIterator[BatchResult]
+            The results, in completion order.
+        """
+        return aiter_batch(self.start, messages, max_concurrency=max_concurrency)
@@ -1 +1,30 @@
-from ._base import Function, Tool, ToolCallProcessor, ToolKit
+from ._base import Function, Tool, ToolCall, ToolKit
+from ._cache import CacheStats, ToolCache
+from ._dispatch import ToolDispatcher, ToolTimeoutError, UnknownToolError
+from ._graph import AsyncToolGraph, ToolDependencyError, ToolGraph
+from ._index import ToolIndex
+from ._parser import (
+    ToolCallParser,
+    ToolCallProcessor,
+    format_native_calls,
+    native_tool_calls,
+    parse_tool_calls,
+)
+from ._process import ProcessPool, shared_process_pool
+from ._render import (
+    SCHEMA_STYLES,
+    SchemaReport,
+    approx_token_count,
+    docstring_summary,
+)
+from ._repair import REPAIRS, RepairStats, repair_json, repair_stats
+from ._trace import (
+    JsonLinesExporter,
+    LatencyHistogram,
+    OpenTelemetryExporter,
+    Span,
+    Tracer,
+    get_tracer,
+    set_tracer,
+    span,
+)
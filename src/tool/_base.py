@@ -1,9 +1,93 @@
-import re
 import json
+import types
+import typing
+import asyncio
+import hashlib
 import inspect
+import pkgutil
+import functools
+import importlib
+import contextvars
 from inspect import signature
-from pydantic import BaseModel, create_model
-from typing import List, Any, Callable, Union, Mapping, Dict
+from concurrent.futures import Executor
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from types import ModuleType
+from typing import List, Any, Callable, Optional, Union, Mapping, Dict, Iterable
+
+from . import _trace
+from ._cache import ToolCache, canonical_args
+from ._process import ProcessPool, import_path, shared_process_pool
+from ._render import (
+    RENDERERS,
+    SEPARATORS,
+    SCHEMA_STYLES,
+    SchemaReport,
+    approx_token_count,
+    check_style,
+    tool_definition,
+)
+
+
+# Added in Python 3.9 and 3.10; compared only to the origin of generic annotations.
+_ANNOTATED = getattr(typing, "Annotated", None)
+_UNION_TYPE = getattr(types, "UnionType", None)
+
+
+def compile_type_check(annotation: Any) -> Optional[Callable[[Any], bool]]:
+    """
+    Builds a predicate telling whether a value matches a type annotation.
+
+    The check is shallow: `Optional`/`Union` accept any of their members,
+    generic aliases such as `List[int]` only check the container type, and
+    subclasses are accepted.
+
+    Parameters
+    ----------
+    annotation : Any
+        The annotation to check against.
+
+    Returns
+    -------
+    Optional[Callable[[Any], bool]]
+        The predicate, or `None` when the annotation cannot be checked (e.g. `Any`,
+        a missing annotation or a type variable).
+    """
+    if annotation is inspect.Signature.empty or annotation is Any:
+        return None
+    if annotation is None or annotation is type(None):
+        return lambda value: value is None
+
+    origin = typing.get_origin(annotation)
+    if origin is not None:
+        if origin is _ANNOTATED:
+            return compile_type_check(typing.get_args(annotation)[0])
+        if origin is Union or origin is _UNION_TYPE:
+            checks = [compile_type_check(arg) for arg in typing.get_args(annotation)]
+            if any(check is None for check in checks):
+                return None
+            return lambda value: any(check(value) for check in checks)
+        if origin is typing.Literal:
+            allowed = typing.get_args(annotation)
+            return lambda value: value in allowed
+        annotation = origin
+
+    if not isinstance(annotation, type):
+        return None
+    return lambda value: isinstance(value, annotation)
+
+
+# Placeholder of the attributes `Function` resolves on first use.
+_UNRESOLVED = object()
+
+
+@functools.lru_cache(maxsize=1024)
+def _shared_args_model(fields: tuple) -> type:
+    """
+    Creates the argument model of a signature, shared by every function whose
+    parameters have the same names, annotations and defaults. The cache is bounded
+    so that tools generated at run time do not grow it forever.
+    """
+    return create_model('DynamicArgs', **{name: (annotation, default) for name, annotation, default, _ in fields})
 
 class Function(BaseModel):
     """
@@ -13,6 +97,10 @@ class Function(BaseModel):
     ----------
     func : Callable[..., Any]
         The function to be wrapped, whose metadata will be stored.
+    check_return : Union[bool, str], optional
+        How results are checked against the return annotation. `True` (the default)
+        runs a shallow, type-aware `isinstance` check, `"deep"` validates the whole
+        value with pydantic in strict mode, and `False` disables the check.
 
     Attributes
     ----------
@@ -32,12 +120,24 @@ class Function(BaseModel):
     Methods
     -------
     get_args_model(signature: inspect.Signature)
-        Creates a dynamic Pydantic model for validating the arguments of the function.
-    run(args: Mapping[str, Any]) -> Any
+        Returns the Pydantic model validating the arguments of a signature.
+    signature : inspect.Signature
+        The signature of the function.
+    args_model : Type[BaseModel]
+        The Pydantic model validating the arguments of the function.
+    run(args: Mapping[str, Any], validate: bool = True) -> Any
         Runs the function with validated arguments and checks the return type.
+    arun(args: Mapping[str, Any], executor: Executor = None, validate: bool = True) -> Any
+        Awaitable version of `run` that does not block the event loop.
+
+    Notes
+    -----
+    Wrapping a function is cheap: the signature, the argument model and the
+    return check are built on first use, and functions whose parameters have the
+    same names, annotations and defaults share one argument model.
     """
     
-    def __init__(self, func: Callable[..., Any]):
+    def __init__(self, func: Callable[..., Any], check_return: Union[bool, str] = True):
         """
         Initializes the Function wrapper.
 
@@ -45,18 +145,65 @@ class Function(BaseModel):
         ----------
         func : Callable[..., Any]
             The function to wrap.
+        check_return : Union[bool, str], optional
+            How results are checked against the return annotation, by default True.
         """
         super().__init__()
-        self._func = func
-        self._name = func.__name__
-        self._doc = func.__doc__
-        self._signature = signature(func)
-        self._return_type = self._signature.return_annotation
-        self._dynamic_model = self.get_args_model(self._signature)
+        # Pydantic stores undeclared private attributes in `__dict__`; filling it
+        # directly skips its per-attribute `__setattr__`, the bulk of the cost of
+        # wrapping a function.
+        self.__dict__.update(
+            _func=func,
+            _name=func.__name__,
+            _doc=func.__doc__,
+            _check_return=check_return,
+            _signature=None,
+            _return_type=_UNRESOLVED,
+            _dynamic_model=None,
+            _validator=None,
+            _return_check=_UNRESOLVED,
+        )
+
+    @staticmethod
+    def _resolve_return_type(func: Callable[..., Any], signature: inspect.Signature) -> Any:
+        """
+        Returns the return annotation, resolving string (postponed) annotations when possible.
+        """
+        annotation = signature.return_annotation
+        if isinstance(annotation, str):
+            try:
+                annotation = typing.get_type_hints(func).get("return", annotation)
+            except Exception:
+                pass
+        return annotation
+
+    def _compile_return_check(self, check_return: Union[bool, str]) -> Optional[Callable[[Any], bool]]:
+        """
+        Builds the predicate used by `run` to check results, or `None` to skip the check.
+        """
+        if not check_return:
+            return None
+        if check_return == "deep":
+            if self.return_type is inspect.Signature.empty:
+                return None
+            adapter = TypeAdapter(self.return_type)
+
+            def check(value):
+                try:
+                    adapter.validate_python(value, strict=True)
+                except ValidationError:
+                    return False
+                return True
+
+            return check
+        return compile_type_check(self.return_type)
 
     def get_args_model(self, signature: inspect.Signature):
         """
-        Creates a dynamic Pydantic model based on the function's signature.
+        Returns a Pydantic model based on the function's signature.
+
+        Models are shared between signatures whose parameters have the same names,
+        annotations and defaults. Parameters with a default are optional.
 
         Parameters
         ----------
@@ -68,16 +215,49 @@ class Function(BaseModel):
         BaseModel
             A Pydantic model for validating the function's arguments.
         """
-        model = create_model(
-            'DynamicArgs',
-            **{
-                param_name: (param.annotation, ...)
-                if param.annotation != param.empty
-                else (Any, ...)
-                for param_name, param in signature.parameters.items()
-            }
+        fields = tuple(
+            (
+                param_name,
+                param.annotation if param.annotation != param.empty else Any,
+                param.default if param.default is not param.empty else ...,
+                # Equal defaults of different types (0 and False) need their own model.
+                type(param.default),
+            )
+            for param_name, param in signature.parameters.items()
         )
-        return model
+        try:
+            return _shared_args_model(fields)
+        except TypeError:
+            # Unhashable annotations or defaults cannot key the shared models.
+            return _shared_args_model.__wrapped__(fields)
+
+    @property
+    def signature(self) -> inspect.Signature:
+        """
+        Returns the signature of the wrapped function, inspected on first access.
+
+        Returns
+        -------
+        inspect.Signature
+            The signature of the function.
+        """
+        if self._signature is None:
+            self._signature = signature(self._func)
+        return self._signature
+
+    @property
+    def args_model(self) -> type:
+        """
+        Returns the Pydantic model validating the arguments, built on first access.
+
+        Returns
+        -------
+        Type[BaseModel]
+            The model, shared with functions of identical signatures.
+        """
+        if self._dynamic_model is None:
+            self._dynamic_model = self.get_args_model(self.signature)
+        return self._dynamic_model
 
     @property
     def name(self):
@@ -103,6 +283,18 @@ class Function(BaseModel):
         """
         return self._doc
 
+    @property
+    def is_coroutine(self):
+        """
+        Returns whether the wrapped function is a coroutine function.
+
+        Returns
+        -------
+        bool
+            True if calling the function returns an awaitable.
+        """
+        return inspect.iscoroutinefunction(self._func)
+
     @property
     def return_type(self):
         """
@@ -113,9 +305,11 @@ class Function(BaseModel):
         Any
             The return type of the function.
         """
+        if self._return_type is _UNRESOLVED:
+            self._return_type = self._resolve_return_type(self._func, self.signature)
         return self._return_type
 
-    def run(self, args: Mapping[str, Any]) -> Any:
+    def run(self, args: Mapping[str, Any], validate: bool = True) -> Any:
         """
         Runs the function with the provided arguments after validation.
 
@@ -123,6 +317,9 @@ class Function(BaseModel):
         ----------
         args : Mapping[str, Any]
             A dictionary of argument names and their values to be passed to the function.
+        validate : bool, optional
+            Whether to validate the arguments, by default True. Trusted internal
+            callers can skip validation and pass the arguments through unchanged.
 
         Returns
         -------
@@ -131,14 +328,102 @@ class Function(BaseModel):
 
         Raises
         ------
+        pydantic.ValidationError
+            If `validate` is set and the arguments do not match the signature.
         AssertionError
             If the type of the result does not match the expected return type.
+
+        Notes
+        -----
+        Coroutine functions are driven to completion with `asyncio.run`, so
+        they must not be run from a thread that already has a running event loop.
+        """
+        tracer = _trace._tracer
+        if tracer is None:
+            result = self._invoke(self._prepare_args(args, validate))
+            return self._check_result(result)
+
+        with tracer.span("tool", tool=self._name):
+            with tracer.span("validate"):
+                kwargs = self._prepare_args(args, validate)
+            with tracer.span("execute"):
+                result = self._invoke(kwargs)
+            return self._check_result(result)
+
+    def _invoke(self, kwargs: Mapping[str, Any]) -> Any:
         """
-        validated_args = self._dynamic_model.model_validate(args)
-        result = self._func(**validated_args.model_dump())
-        assert self._return_type == type(result), f"Expected return type {self._return_type}, but got {type(result)}"
+        Calls the wrapped function, driving coroutines to completion.
+        """
+        result = self._func(**kwargs)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+        return result
+
+    def _prepare_args(self, args: Mapping[str, Any], validate: bool) -> Mapping[str, Any]:
+        """
+        Validates (and coerces) the arguments without copying them through `model_dump`.
+        """
+        if not validate:
+            return args
+        validator = self._validator
+        if validator is None:
+            validator = self._validator = self.args_model.__pydantic_validator__
+        return validator.validate_python(args).__dict__
+
+    def _check_result(self, result: Any) -> Any:
+        check = self._return_check
+        if check is _UNRESOLVED:
+            check = self._return_check = self._compile_return_check(self._check_return)
+        if check is not None and not check(result):
+            raise AssertionError(f"Expected return type {self.return_type}, but got {type(result)}")
         return result
 
+    async def arun(self, args: Mapping[str, Any], executor: Executor = None, validate: bool = True) -> Any:
+        """
+        Runs the function from a coroutine after validation.
+
+        Coroutine functions are awaited on the running event loop. Regular
+        functions are pushed to `executor` so they do not block the loop.
+
+        Parameters
+        ----------
+        args : Mapping[str, Any]
+            A dictionary of argument names and their values to be passed to the function.
+        executor : Executor, optional
+            The executor used for regular functions. Defaults to the loop's default executor.
+        validate : bool, optional
+            Whether to validate the arguments, by default True.
+
+        Returns
+        -------
+        Any
+            The result of the function call.
+
+        Raises
+        ------
+        AssertionError
+            If the type of the result does not match the expected return type.
+        """
+        if not self.is_coroutine:
+            loop = asyncio.get_running_loop()
+            if _trace._tracer is None:
+                return await loop.run_in_executor(executor, self.run, args, validate)
+            # Executor threads do not inherit context variables: carry the current span over.
+            run = functools.partial(contextvars.copy_context().run, self.run, args, validate)
+            return await loop.run_in_executor(executor, run)
+
+        tracer = _trace._tracer
+        if tracer is None:
+            result = await self._func(**self._prepare_args(args, validate))
+            return self._check_result(result)
+
+        with tracer.span("tool", tool=self._name):
+            with tracer.span("validate"):
+                kwargs = self._prepare_args(args, validate)
+            with tracer.span("execute"):
+                result = await self._func(**kwargs)
+            return self._check_result(result)
+
     def __repr__(self):
         """
         Returns a string representation of the Function object.
@@ -149,7 +434,7 @@ class Function(BaseModel):
             A representation including the function name, signature, and a preview of the docstring.
         """
         doc_preview = (self._doc[:30] + '...') if self._doc and len(self._doc) > 30 else self._doc
-        return f"Function(name={self._name}, signature={self._signature}, doc={doc_preview})"
+        return f"Function(name={self._name}, signature={self.signature}, doc={doc_preview})"
 
 
 class Tool(Function):
@@ -161,6 +446,23 @@ class Tool(Function):
     ----------
     func : Callable[..., Any]
         The function to be wrapped and processed as a Tool.
+    check_return : Union[bool, str], optional
+        How results are checked against the return annotation, by default True.
+    cache : ToolCache, optional
+        A cache used to memoize results. Only pass one for pure tools, whose
+        result depends on nothing but their arguments.
+    ttl : float, optional
+        Time to live of this tool's cached results, in seconds. Defaults to the cache's `ttl`.
+    process_pool : ProcessPool, optional
+        Runs the tool in worker processes instead of the calling thread, for
+        CPU-bound tools that would otherwise hold the GIL. The function must be
+        importable by name and its arguments and results picklable.
+    timeout : float, optional
+        Seconds a call may run before the dispatcher abandons it. By default calls
+        are not timed. A timed call of a tool with a process pool runs in a process
+        of its own, which is terminated when it overruns; other timed tools run in a
+        thread of their own, which cannot be stopped and finishes in the background.
+        See `ToolDispatcher` for the cap on such threads.
 
     Attributes
     ----------
@@ -176,14 +478,32 @@ class Tool(Function):
         The expected return type of the function.
     _dynamic_model : Type[BaseModel]
         A dynamically created Pydantic model for validating the function's arguments.
+    _cache : Optional[ToolCache]
+        The cache memoizing this tool's results, if it is pure.
+    _process_pool : Optional[ProcessPool]
+        The pool running this tool, if it is CPU-bound.
 
     Methods
     -------
     schema : dict
         Provides a schema representation of the function's metadata.
+    definition : dict
+        Describes the tool for the `tools` argument of ollama's chat API.
+    pure : bool
+        Whether results of this tool are memoized.
+    timeout : Optional[float]
+        Seconds a call may run before it is abandoned.
     """
     
-    def __init__(self, func: Callable[..., Any]):
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        check_return: Union[bool, str] = True,
+        cache: ToolCache = None,
+        ttl: float = None,
+        process_pool: ProcessPool = None,
+        timeout: float = None,
+    ):
         """
         Initializes the Tool wrapper.
 
@@ -191,13 +511,128 @@ class Tool(Function):
         ----------
         func : Callable[..., Any]
             The function to wrap.
+        check_return : Union[bool, str], optional
+            How results are checked against the return annotation, by default True.
+        cache : ToolCache, optional
+            A cache used to memoize the results of a pure tool.
+        ttl : float, optional
+            Time to live of this tool's cached results, in seconds.
+        process_pool : ProcessPool, optional
+            Runs the tool in worker processes.
+        timeout : float, optional
+            Seconds a call may run before the dispatcher abandons it.
+
+        Raises
+        ------
+        ValueError
+            If `process_pool` is given and the function cannot be imported by name.
+        """
+        super().__init__(func, check_return=check_return)
+        self.__dict__.update(
+            _schema=None,
+            _definition=None,
+            _cache=cache,
+            _ttl=ttl,
+            _cache_name=f"{func.__module__}.{func.__qualname__}",
+            _process_pool=process_pool,
+            _import_path=import_path(func) if process_pool is not None else None,
+            _timeout=timeout,
+        )
+
+    @property
+    def pure(self) -> bool:
         """
-        super().__init__(func)
+        Returns whether the results of this tool are memoized.
+
+        Returns
+        -------
+        bool
+            True if the tool has a cache.
+        """
+        return self._cache is not None
+
+    @property
+    def timeout(self) -> Optional[float]:
+        """
+        Returns the seconds a call may run before the dispatcher abandons it.
+
+        Returns
+        -------
+        Optional[float]
+            The timeout, or None if calls are not timed.
+        """
+        return self._timeout
+
+    def _invoke(self, kwargs: Mapping[str, Any]) -> Any:
+        """
+        Calls the wrapped function, in a worker process if the tool has a process pool.
+        The calling thread waits without holding the GIL. A timed call runs in a
+        process of its own, terminated when the timeout passes.
+        """
+        if self._process_pool is None:
+            return super()._invoke(kwargs)
+        return self._process_pool.submit(self._import_path, kwargs, self._timeout).result()
+
+    def run(self, args: Mapping[str, Any], validate: bool = True) -> Any:
+        """
+        Runs the tool, answering from the cache when the tool is pure.
+
+        Parameters
+        ----------
+        args : Mapping[str, Any]
+            A dictionary of argument names and their values to be passed to the function.
+        validate : bool, optional
+            Whether to validate the arguments, by default True.
+
+        Returns
+        -------
+        Any
+            The result of the function call. Cached results are shared between
+            callers and must not be mutated.
+        """
+        if self._cache is None:
+            return super().run(args, validate)
+
+        kwargs = self._prepare_args(args, validate)
+        key = (self._func, canonical_args(kwargs))
+        hit, result = self._cache.get(self._cache_name, key)
+        if not hit:
+            result = super().run(kwargs, validate=False)
+            self._cache.set(self._cache_name, key, result, ttl=self._ttl)
+        return result
+
+    async def arun(self, args: Mapping[str, Any], executor: Executor = None, validate: bool = True) -> Any:
+        """
+        Awaitable version of `run`, answering from the cache when the tool is pure
+        and awaiting the worker process when the tool has a process pool.
+        """
+        if self._process_pool is None and (self._cache is None or not self.is_coroutine):
+            return await super().arun(args, executor=executor, validate=validate)
+
+        kwargs = self._prepare_args(args, validate)
+        if self._cache is not None:
+            key = (self._func, canonical_args(kwargs))
+            hit, result = self._cache.get(self._cache_name, key)
+            if hit:
+                return result
+
+        if self._process_pool is not None:
+            # Await the worker process directly rather than blocking an executor thread on it.
+            with _trace.span("tool", tool=self._name, process=True):
+                future = self._process_pool.submit(self._import_path, kwargs, self._timeout)
+                result = self._check_result(await asyncio.wrap_future(future))
+        else:
+            result = await super().arun(kwargs, executor=executor, validate=False)
+
+        if self._cache is not None:
+            self._cache.set(self._cache_name, key, result, ttl=self._ttl)
+        return result
     
     @property
     def schema(self):
         """
         Generates a schema dictionary representing the function's metadata.
+        The schema is built on first access and reused afterwards.
 
         Returns
         -------
@@ -205,13 +640,34 @@ class Tool(Function):
             A dictionary containing the function's name, docstring, and parameters.
             The parameters include their types as specified in the function signature.
         """
+        if self._schema is None:
+            self._schema = self._build_schema()
+        return self._schema
+
+    @property
+    def definition(self) -> dict:
+        """
+        Describes the tool for the `tools` argument of ollama's chat API, so the
+        model returns structured tool calls instead of tagged text.
+        The definition is built on first access and reused afterwards.
+
+        Returns
+        -------
+        dict
+            A function definition with the JSON schema of the arguments.
+        """
+        if self._definition is None:
+            self._definition = tool_definition(self)
+        return self._definition
+
+    def _build_schema(self) -> dict:
         schema = {
             "name": self.name,
             "doc": self.doc,
             "parameters": {
                 "properties": {
                     param_name: {"type": param.annotation.__name__ if param.annotation != param.empty else "unknown"}
-                    for param_name, param in self._signature.parameters.items()
+                    for param_name, param in self.signature.parameters.items()
                 }
             }
         }
@@ -230,7 +686,7 @@ class Tool(Function):
             A representation including the function name, signature, and a preview of the docstring.
         """
         doc_preview = (self._doc[:30] + '...') if self._doc and len(self._doc) > 30 else self._doc
-        return f"Tool(name={self._name}, signature={self._signature}, doc={doc_preview})"
+        return f"Tool(name={self._name}, signature={self.signature}, doc={doc_preview})"
 
 
 
@@ -244,23 +700,57 @@ class ToolKit(BaseModel):
     ----------
     tools : Union[Callable[..., Any], List[Callable[..., Any]]]
         A single callable or a list of callables to be added to the toolkit.
+    cache : ToolCache, optional
+        The cache memoizing results of tools registered as pure. Pass the same
+        instance to several toolkits to share results across agents. A private
+        cache is created by default.
+    process_pool : ProcessPool, optional
+        The pool running the tools registered with `process=True`. By default the
+        pool shared by the whole process is used.
 
     Attributes
     ----------
     _tools : dict
         A dictionary mapping tool names to their respective `Tool` instances.
+    _cache : ToolCache
+        The cache memoizing results of pure tools.
 
     Methods
     -------
     tools : List[Tool]
         Returns the list of `Tool` instances in the toolkit.
+    register(func, pure=False, ttl=None, check_return=True, process=False, timeout=None) -> Tool
+        Adds a single tool, optionally marking it as pure or CPU-bound.
+    register_module(module, predicate=None, recursive=False, **options) -> List[Tool]
+        Adds the public functions of a module, or of every module of a package.
+    from_module(module, predicate=None, recursive=False, **options) -> ToolKit
+        Creates a toolkit from the public functions of a module or package.
+    cache : ToolCache
+        Returns the cache memoizing results of pure tools.
+    process_pool : ProcessPool
+        Returns the pool running CPU-bound tools.
     tools_schemas() -> List[dict]
         Returns a list of schemas for each `Tool` in the toolkit.
+    fingerprint : str
+        A digest of the toolkit's schemas, used to key the rendered prompts.
+    render_schemas(names: Iterable[str] = None, style: str = "json") -> str
+        Returns the schemas, or those of the named tools, rendered for a prompt.
+    render_prompt(template: str, names: Iterable[str] = None, style: str = "json") -> str
+        Returns `template` formatted with the rendered schemas.
+    schema_report(styles=SCHEMA_STYLES, count_tokens=approx_token_count) -> Dict[str, SchemaReport]
+        Measures the prompt size of the schemas in each rendering style.
+    tool_definitions(names: Iterable[str] = None) -> List[dict]
+        Returns the tools, or the named ones, in the format of ollama's `tools` argument.
     get_tool_by_name(name: str) -> Union[Tool, None]
         Retrieves a `Tool` by its name.
     """
     
-    def __init__(self, tools: Union[Callable[..., Any], List[Callable[..., Any]]]):
+    def __init__(
+        self,
+        tools: Union[Callable[..., Any], List[Callable[..., Any]]],
+        cache: ToolCache = None,
+        process_pool: ProcessPool = None,
+    ):
         """
         Initializes the ToolKit with the provided tools.
 
@@ -268,9 +758,18 @@ class ToolKit(BaseModel):
         ----------
         tools : Union[Callable[..., Any], List[Callable[..., Any]]]
             A callable or list of callables to initialize the toolkit.
+        cache : ToolCache, optional
+            The cache memoizing results of pure tools.
+        process_pool : ProcessPool, optional
+            The pool running CPU-bound tools, by default the shared one.
         """
         super().__init__()
         self._tools = {}
+        self._cache = ToolCache() if cache is None else cache
+        self._process_pool = process_pool
+        self._schemas = None
+        self._fingerprint = None
+        self._rendered = {}
         self.tools = tools  # Use the setter to initialize tools
 
     @property
@@ -299,31 +798,336 @@ class ToolKit(BaseModel):
             tools = [tools]
 
         for tool in tools:
-            tool_instance = Tool(tool)
-            name = tool_instance.name
+            self.register(tool)
 
-            # Handle conflicts by appending a number if a name already exists
-            if name in self._tools:
-                counter = 1
+    @property
+    def cache(self) -> ToolCache:
+        """
+        Returns the cache memoizing results of pure tools.
+
+        Returns
+        -------
+        ToolCache
+            The cache shared by every pure tool of the toolkit.
+        """
+        return self._cache
+
+    @property
+    def process_pool(self) -> ProcessPool:
+        """
+        Returns the pool running the tools registered with `process=True`.
+
+        Returns
+        -------
+        ProcessPool
+            The toolkit's pool, or the pool shared by the whole process.
+        """
+        if self._process_pool is None:
+            self._process_pool = shared_process_pool()
+        return self._process_pool
+
+    def register(
+        self,
+        func: Callable[..., Any],
+        pure: bool = False,
+        ttl: float = None,
+        check_return: Union[bool, str] = True,
+        process: bool = False,
+        timeout: float = None,
+    ) -> Tool:
+        """
+        Adds a single tool to the toolkit, ensuring a unique name.
+
+        Parameters
+        ----------
+        func : Callable[..., Any]
+            The callable to add.
+        pure : bool, optional
+            Whether the tool is pure, i.e. its result only depends on its arguments.
+            Results of pure tools are memoized in the toolkit's cache. By default False.
+        ttl : float, optional
+            Time to live of the tool's cached results, in seconds.
+        check_return : Union[bool, str], optional
+            How results are checked against the return annotation, by default True.
+        process : bool, optional
+            Whether to run the tool in the toolkit's process pool, for CPU-bound
+            tools. The function must be importable by name. By default False.
+        timeout : float, optional
+            Seconds a call may run before the dispatcher abandons it. See `Tool`
+            for how an overrunning call is stopped.
+
+        Returns
+        -------
+        Tool
+            The registered tool.
+        """
+        tool_instance = Tool(
+            func,
+            check_return=check_return,
+            cache=self._cache if pure else None,
+            ttl=ttl,
+            process_pool=self.process_pool if process else None,
+            timeout=timeout,
+        )
+        name = tool_instance.name
+
+        # Handle conflicts by appending a number if a name already exists
+        if name in self._tools:
+            counter = 1
+            new_name = f"{name}_{counter}"
+            while new_name in self._tools:
+                counter += 1
                 new_name = f"{name}_{counter}"
-                while new_name in self._tools:
-                    counter += 1
-                    new_name = f"{name}_{counter}"
-                name = new_name
+            name = new_name
+
+        # Store the tool instance with the resolved name
+        self._tools[name] = tool_instance
+
+        self._invalidate()
+        return tool_instance
 
-            # Store the tool instance with the resolved name
-            self._tools[name] = tool_instance
+    def register_module(
+        self,
+        module: Union[str, ModuleType],
+        predicate: Callable[[Callable[..., Any]], bool] = None,
+        recursive: bool = False,
+        **options: Any,
+    ) -> List[Tool]:
+        """
+        Adds the public functions defined in a module, in definition order.
+
+        Functions whose name starts with an underscore and functions imported from
+        other modules are skipped. Tools are cheap to register: their validation
+        models are only built when they are first run.
+
+        Parameters
+        ----------
+        module : Union[str, ModuleType]
+            The module, or its dotted name.
+        predicate : Callable[[Callable[..., Any]], bool], optional
+            Selects the functions to register, by default every public function.
+        recursive : bool, optional
+            Whether to also register the functions of every submodule, when
+            `module` is a package. By default False.
+        **options : Any
+            Passed to `register` for every function, e.g. `pure` or `timeout`.
+
+        Returns
+        -------
+        List[Tool]
+            The registered tools.
+        """
+        if isinstance(module, str):
+            module = importlib.import_module(module)
+        modules = [module]
+        if recursive and hasattr(module, "__path__"):
+            for info in pkgutil.walk_packages(module.__path__, module.__name__ + "."):
+                modules.append(importlib.import_module(info.name))
+
+        registered = []
+        for current in modules:
+            for name, func in vars(current).items():
+                if name.startswith("_") or not inspect.isfunction(func):
+                    continue
+                if func.__module__ != current.__name__:
+                    continue
+                if predicate is not None and not predicate(func):
+                    continue
+                registered.append(self.register(func, **options))
+        return registered
+
+    @classmethod
+    def from_module(
+        cls,
+        module: Union[str, ModuleType],
+        predicate: Callable[[Callable[..., Any]], bool] = None,
+        recursive: bool = False,
+        cache: ToolCache = None,
+        process_pool: ProcessPool = None,
+        **options: Any,
+    ) -> "ToolKit":
+        """
+        Creates a toolkit from the public functions of a module or package.
+
+        Parameters
+        ----------
+        module : Union[str, ModuleType]
+            The module, or its dotted name.
+        predicate : Callable[[Callable[..., Any]], bool], optional
+            Selects the functions to register, by default every public function.
+        recursive : bool, optional
+            Whether to include the submodules of a package, by default False.
+        cache : ToolCache, optional
+            The cache memoizing results of pure tools.
+        process_pool : ProcessPool, optional
+            The pool running CPU-bound tools, by default the shared one.
+        **options : Any
+            Passed to `register` for every function.
+
+        Returns
+        -------
+        ToolKit
+            The toolkit. See `register_module`.
+        """
+        toolkit = cls(tools=[], cache=cache, process_pool=process_pool)
+        toolkit.register_module(module, predicate=predicate, recursive=recursive, **options)
+        return toolkit
+
+    def _invalidate(self):
+        """
+        Drops the cached schemas and prompts after the set of tools changed.
+        """
+        self._schemas = None
+        self._fingerprint = None
+        self._rendered = {}
 
     def tools_schemas(self) -> List[dict]:
         """
         Returns a list of schemas for each `Tool` in the toolkit.
 
+        The list is built once and reused until tools are added; the schema
+        dictionaries are shared and must not be mutated.
+
         Returns
         -------
         List[dict]
             A list of schema dictionaries, one for each `Tool`.
         """
-        return [tool.schema for tool in self._tools.values()]
+        if self._schemas is None:
+            self._schemas = [tool.schema for tool in self._tools.values()]
+        return list(self._schemas)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Returns a digest of the toolkit's schemas.
+
+        Returns
+        -------
+        str
+            A hex digest that changes whenever the rendered schemas would change.
+        """
+        if self._fingerprint is None:
+            payload = json.dumps(self.tools_schemas(), sort_keys=True, default=str)
+            self._fingerprint = hashlib.sha1(payload.encode()).hexdigest()
+        return self._fingerprint
+
+    def render_schemas(self, names: Iterable[str] = None, style: str = "json") -> str:
+        """
+        Returns the schemas rendered for a prompt.
+
+        Parameters
+        ----------
+        names : Iterable[str], optional
+            The tools to render, in order. By default every tool is rendered.
+        style : str, optional
+            How each schema is rendered, by default "json":
+
+            - "json": indented JSON with the full docstring.
+            - "compact": JSON without whitespace, with the dedented docstring.
+            - "summary": JSON without whitespace, with the docstring's first paragraph.
+            - "signature": a Python-like signature followed by the docstring's
+              first paragraph, e.g. `add(x: int, y: int = 0) -> int: Add two integers.`
+
+        Returns
+        -------
+        str
+            The rendered schemas. The full set is cached by `fingerprint` and style,
+            a subset is joined from the cached schema of each tool.
+
+        Raises
+        ------
+        ValueError
+            If `style` is unknown.
+        """
+        check_style(style)
+        separator = SEPARATORS[style]
+        if names is not None:
+            return separator.join(self._render_schema(name, style) for name in names)
+
+        def build():
+            return separator.join(self._render_schema(name, style) for name in self._tools)
+
+        return self._render(("schemas", style), build)
+
+    def _render_schema(self, name: str, style: str) -> str:
+        return self._render(("schema", style, name), lambda: RENDERERS[style](self._tools[name]))
+
+    def render_prompt(self, template: str, names: Iterable[str] = None, style: str = "json") -> str:
+        """
+        Formats a prompt template with the rendered schemas.
+
+        Parameters
+        ----------
+        template : str
+            A prompt template with a single `%s` placeholder for the schemas.
+        names : Iterable[str], optional
+            The tools whose schemas are included, by default every tool.
+        style : str, optional
+            How each schema is rendered, see `render_schemas`. By default "json".
+
+        Returns
+        -------
+        str
+            The formatted prompt. Prompts with every tool are cached by
+            `fingerprint`, template and style.
+        """
+        if names is not None:
+            return template % self.render_schemas(names, style)
+        return self._render((template, style), lambda: template % self.render_schemas(style=style))
+
+    def schema_report(
+        self,
+        styles: Iterable[str] = SCHEMA_STYLES,
+        count_tokens: Callable[[str], int] = approx_token_count,
+    ) -> Dict[str, SchemaReport]:
+        """
+        Measures the prompt size of the toolkit's schemas in several rendering styles.
+
+        Parameters
+        ----------
+        styles : Iterable[str], optional
+            The styles to measure, by default all of them.
+        count_tokens : Callable[[str], int], optional
+            Token counter, by default the four-characters-per-token rule. Pass the
+            model's tokenizer for exact counts.
+
+        Returns
+        -------
+        Dict[str, SchemaReport]
+            The size of the rendered schemas in each style.
+        """
+        reports = {}
+        for style in styles:
+            text = self.render_schemas(style=style)
+            reports[style] = SchemaReport(style, len(self._tools), len(text), count_tokens(text))
+        return reports
+
+    def tool_definitions(self, names: Iterable[str] = None) -> List[dict]:
+        """
+        Returns the tools in the format of the `tools` argument of ollama's chat API.
+
+        Parameters
+        ----------
+        names : Iterable[str], optional
+            The tools to describe, in order. By default every tool is described.
+
+        Returns
+        -------
+        List[dict]
+            One function definition per tool. The definitions are shared and must
+            not be mutated.
+        """
+        if names is None:
+            names = self._tools
+        return [self._tools[name].definition for name in names]
+
+    def _render(self, key: Any, build: Callable[[], str]) -> str:
+        cache_key = (self.fingerprint, key)
+        rendered = self._rendered.get(cache_key)
+        if rendered is None:
+            rendered = self._rendered[cache_key] = build()
+        return rendered
 
     def get_tool_by_name(self, name: str) -> Union[Tool, None]:
         """
@@ -376,59 +1180,3 @@ class ToolCall(BaseModel):
     name: str
     arguments: dict
     id: int
-
-def parse_tool_calls(content: str) -> List[Dict[str, Union[str, dict, int]]]:
-    """
-    Parses multiple <tool_call> entries from a string and returns a list of dictionaries.
-
-    Parameters
-    ----------
-    content : str
-        A string containing multiple XML-like <tool_call> entries, where each entry contains JSON data.
-
-    Returns
-    -------
-    List[Dict[str, Union[str, dict, int]]]
-        A list of dictionaries parsed from the JSON content inside each <tool_call> tag.
-    """
-    call_request_list = []
-
-    # Use regex to find matches between <tool_call> tags
-    for match in re.finditer(r"<tool_calls>\n(.+)?\n</tool_calls>", content):
-        try:
-            group_json = json.loads(match.group(1))
-            call_request_list.append(group_json)
-        except json.JSONDecodeError as e:
-            print(f"Failed to decode JSON: {e}, Content: {match.group(1)}")
-
-    return call_request_list
-
-class ToolCallProcessor:
-    def __init__(self, message: str):
-        self.message = message
-        self.calls = self.create_tool_calls(self.message)
-
-    def create_tool_calls(self, content: str) -> List[ToolCall]:
-        """
-        Creates `ToolCall` instances from parsed tool calls in the content.
-
-        Parameters
-        ----------
-        content : str
-            The message content to parse for tool calls.
-
-        Returns
-        -------
-        List[ToolCall]
-            A list of `ToolCall` instances created from the parsed content.
-        """
-        parsed_calls = parse_tool_calls(content)
-        tool_calls = []
-
-        for call in parsed_calls:
-            try:
-                tool_calls.append(ToolCall(**call))
-            except TypeError as e:
-                print(f"TypeError: {e} for call: {call}")
-
-        return tool_calls
\ No newline at end of file
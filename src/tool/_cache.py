@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Mapping, Optional, Tuple
+
+_MISSING = object()
+
+
+def canonical_args(args: Mapping[str, Any]) -> str:
+    """
+    Serializes call arguments into a canonical string usable as a cache key.
+
+    Parameters
+    ----------
+    args : Mapping[str, Any]
+        The validated arguments of a call.
+
+    Returns
+    -------
+    str
+        A JSON document with sorted keys. Values that are not JSON serializable
+        fall back to their `repr`.
+    """
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+class CacheStats:
+    """
+    Hit and miss counters of a single tool.
+
+    Attributes
+    ----------
+    hits : int
+        Number of calls answered from the cache.
+    misses : int
+        Number of calls that had to run the tool.
+    """
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self, hits: int = 0, misses: int = 0):
+        self.hits = hits
+        self.misses = misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return f"CacheStats(hits={self.hits}, misses={self.misses})"
+
+
+class ToolCache:
+    """
+    A thread-safe, size-bounded LRU cache for the results of pure tools.
+
+    A single instance can be shared between toolkits and agents, so that
+    identical calls made by different sessions of a process are run once.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries kept, by default 1024. The least recently used
+        entry is evicted first.
+    ttl : float, optional
+        Default time to live of an entry, in seconds. `None` (the default) keeps
+        entries until they are evicted.
+    clock : Callable[[], float], optional
+        The time source of the expiry dates, by default `time.monotonic`.
+
+    Methods
+    -------
+    get(name: str, key: Hashable) -> Tuple[bool, Any]
+        Looks up a result and updates the counters of tool `name`.
+    set(name: str, key: Hashable, value: Any, ttl: float = None)
+        Stores a result.
+    stats(name: str = None) -> Union[CacheStats, Dict[str, CacheStats]]
+        Returns the counters of one tool, or of every tool.
+    clear()
+        Drops every entry and counter.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _counters(self, name: str) -> CacheStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CacheStats()
+        return stats
+
+    def get(self, name: str, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Looks up a result.
+
+        Parameters
+        ----------
+        name : str
+            The tool the lookup is accounted to.
+        key : Hashable
+            The cache key of the call.
+
+        Returns
+        -------
+        Tuple[bool, Any]
+            Whether the key was found, and the cached value if so.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self._counters(name).hits += 1
+                    return True, value
+                del self._entries[key]
+            self._counters(name).misses += 1
+            return False, None
+
+    def set(self, name: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a result, evicting the least recently used entries beyond `maxsize`.
+
+        Parameters
+        ----------
+        name : str
+            The tool the value belongs to.
+        key : Hashable
+            The cache key of the call.
+        value : Any
+            The result to store. It is shared with later hits and must not be mutated.
+        ttl : float, optional
+            Time to live of this entry in seconds, defaulting to the cache's `ttl`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self, name: str = None):
+        """
+        Returns hit and miss counters.
+
+        Parameters
+        ----------
+        name : str, optional
+            The tool to report. If omitted, the counters of every tool are returned.
+
+        Returns
+        -------
+        Union[CacheStats, Dict[str, CacheStats]]
+            A copy of the requested counters.
+        """
+        with self._lock:
+            if name is not None:
+                stats = self._stats.get(name, CacheStats())
+                return CacheStats(stats.hits, stats.misses)
+            return {
+                tool: CacheStats(stats.hits, stats.misses)
+                for tool, stats in self._stats.items()
+            }
+
+    def clear(self):
+        """
+        Drops every entry and counter.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"ToolCache(size={len(self)}, maxsize={self.maxsize}, ttl={self.ttl})"
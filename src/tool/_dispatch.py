@@ -0,0 +1,372 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from . import _trace
+from ._base import Tool, ToolCall, ToolKit
+from ._graph import AsyncToolGraph, ToolGraph, _chain
+
+
+class ToolTimeoutError(TimeoutError):
+    """
+    Raised for a tool call that ran longer than its tool's `timeout`.
+    """
+
+
+class UnknownToolError(LookupError):
+    """
+    Raised for a call to a tool the toolkit does not hold, e.g. a name invented by
+    the model. The message lists the registered tools so the model can correct it.
+    """
+
+
+class ToolDispatcher:
+    """
+    Runs the tool calls requested by a model turn against a `ToolKit`.
+
+    Calls are executed inline, one after the other, unless `max_workers` is
+    given, in which case they are submitted to a bounded thread pool so that
+    independent I/O-bound tools overlap. Coroutine tools are awaited by
+    `Function.run` inside the worker, so they also run concurrently.
+
+    The calls of a turn may reference each other's results with `{"$ref": <id>}`
+    arguments; `dispatch` and `adispatch` run them as a dependency graph, see
+    `ToolGraph`.
+
+    Calls to tools registered with a `timeout` fail with `ToolTimeoutError` when
+    they overrun, and the caller is released on time. How the call itself is
+    stopped depends on the tool:
+
+    - a tool with a process pool runs in a process of its own, which is terminated;
+    - a coroutine tool awaited by `adispatch` is cancelled;
+    - any other tool runs in a daemon thread of its own. A thread cannot be
+      interrupted, so the timeout is only advisory: the call finishes in the
+      background and its result is discarded. It never holds a worker of the
+      pool nor delays the exit of the interpreter, but its thread lives until
+      the call returns. To bound this leak, while `max_abandoned_threads`
+      timed-out calls are still running, new calls to such tools fail with
+      `ToolTimeoutError` without starting.
+
+    Parameters
+    ----------
+    toolkit : ToolKit
+        The toolkit used to resolve tool names.
+    max_workers : int, optional
+        Size of the thread pool. `None` (the default) runs calls sequentially.
+    max_abandoned_threads : int, optional
+        Maximum number of threads of timed-out calls still running, by default 32.
+
+    Attributes
+    ----------
+    toolkit : ToolKit
+        The toolkit used to resolve tool names.
+    max_workers : Optional[int]
+        Size of the thread pool, or `None` for sequential dispatch.
+    max_abandoned_threads : int
+        Maximum number of threads of timed-out calls still running.
+    abandoned_threads : int
+        Number of threads of timed-out calls still running.
+
+    Methods
+    -------
+    submit(call: ToolCall) -> Future
+        Schedules a single tool call and returns a future for its result.
+    dispatch(calls: List[ToolCall]) -> List[Tuple[ToolCall, Future]]
+        Schedules every call and returns them paired with their futures, in `id` order.
+    graph() -> ToolGraph
+        Returns a graph that schedules the calls of one turn as they arrive.
+    asubmit(call: ToolCall) -> asyncio.Task
+        Schedules a single tool call on the running event loop.
+    adispatch(calls: List[ToolCall]) -> List[Tuple[ToolCall, asyncio.Future]]
+        Event-loop counterpart of `dispatch`.
+    agraph() -> AsyncToolGraph
+        Event-loop counterpart of `graph`.
+    shutdown(wait: bool = True)
+        Releases the thread pool, if one was created.
+    """
+
+    def __init__(
+        self,
+        toolkit: ToolKit,
+        max_workers: Optional[int] = None,
+        max_abandoned_threads: int = 32,
+    ):
+        self.toolkit = toolkit
+        self.max_workers = max_workers
+        self.max_abandoned_threads = max_abandoned_threads
+        self._executor = None
+        # Futures of the timed-out calls whose thread is still running.
+        self._abandoned = set()
+        self._lock = threading.Lock()
+
+    @property
+    def abandoned_threads(self) -> int:
+        return len(self._abandoned)
+
+    def _tool(self, call: ToolCall) -> Tool:
+        """
+        Returns the tool a call is addressed to, or raises `UnknownToolError`.
+        """
+        tool = self.toolkit.get_tool_by_name(call.name)
+        if tool is None:
+            names = ", ".join(self.toolkit._tools) or "none"
+            raise UnknownToolError(
+                f"call {call.id} requests the unknown tool {call.name!r}; "
+                f"the registered tools are: {names}"
+            )
+        return tool
+
+    @staticmethod
+    def _run_call(tool: Tool, call: ToolCall) -> Any:
+        return tool.run(call.arguments)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="tool"
+            )
+        return self._executor
+
+    def submit(self, call: ToolCall) -> Future:
+        """
+        Schedules a single tool call.
+
+        Parameters
+        ----------
+        call : ToolCall
+            The call to execute.
+
+        Returns
+        -------
+        Future
+            A future holding the tool result, or the exception it raised
+            (`UnknownToolError` for a tool the toolkit does not hold).
+        """
+        future = Future()
+        try:
+            tool = self._tool(call)
+        except UnknownToolError as e:
+            future.set_exception(e)
+            return future
+
+        if tool.timeout is not None:
+            try:
+                started = self._start_thread(tool, call)
+            except ToolTimeoutError as e:
+                future.set_exception(e)
+                return future
+            return self._expire(call, started, tool.timeout)
+
+        if self.max_workers is None:
+            try:
+                future.set_result(self._run_call(tool, call))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        return self._submit_to_pool(tool, call)
+
+    def _submit_to_pool(self, tool: Tool, call: ToolCall) -> Future:
+        executor = self._get_executor()
+        if _trace._tracer is None:
+            return executor.submit(self._run_call, tool, call)
+        # Worker threads do not inherit context variables: carry the current span over.
+        return executor.submit(
+            contextvars.copy_context().run, self._run_call, tool, call
+        )
+
+    def _start_thread(self, tool: Tool, call: ToolCall) -> Future:
+        """
+        Runs a timed call in a daemon thread of its own, so a call that overruns
+        is abandoned without taking a worker of the pool.
+
+        Raises
+        ------
+        ToolTimeoutError
+            If `max_abandoned_threads` timed-out calls are still running.
+        """
+        abandoned = self.abandoned_threads
+        if abandoned >= self.max_abandoned_threads:
+            raise ToolTimeoutError(
+                f"call {call.id} to {call.name} was not started: {abandoned} "
+                "timed-out calls are still running"
+            )
+        future = Future()
+        future.set_running_or_notify_cancel()
+        run = self._run_call
+        if _trace._tracer is not None:
+            run = functools.partial(contextvars.copy_context().run, run)
+
+        def target():
+            try:
+                future.set_result(run(tool, call))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._abandoned.discard(future)
+
+        threading.Thread(target=target, name=f"tool-{call.name}", daemon=True).start()
+        return future
+
+    def _abandon(self, future: Future):
+        """
+        Counts the thread of a timed-out call among the abandoned ones until it ends.
+        """
+        with self._lock:
+            if not future.done():
+                self._abandoned.add(future)
+
+    def _expire(self, call: ToolCall, future: Future, timeout: float) -> Future:
+        """
+        Returns a future that mirrors `future`, or fails with `ToolTimeoutError`
+        if it is not done within `timeout` seconds.
+        """
+        timed = Future()
+        lock = threading.Lock()
+
+        def on_timeout():
+            with lock:
+                if timed.done():
+                    return
+                self._abandon(future)
+                timed.set_exception(
+                    ToolTimeoutError(
+                        f"call {call.id} to {call.name} timed out after {timeout}s"
+                    )
+                )
+
+        def on_done(done: Future):
+            timer.cancel()
+            with lock:
+                _chain(done, timed)
+
+        timer = threading.Timer(timeout, on_timeout)
+        timer.daemon = True
+        future.add_done_callback(on_done)
+        timer.start()
+        return timed
+
+    def dispatch(self, calls: List[ToolCall]) -> List[Tuple[ToolCall, Future]]:
+        """
+        Schedules every call of a model turn.
+
+        Parameters
+        ----------
+        calls : List[ToolCall]
+            The calls parsed from the model response.
+
+        Returns
+        -------
+        List[Tuple[ToolCall, Future]]
+            Each call paired with its future, ordered by call `id` so the
+            transcript built from the results stays deterministic.
+        """
+        graph = self.graph()
+        ordered = sorted(calls, key=lambda call: call.id)
+        scheduled = [(call, graph.submit(call)) for call in ordered]
+        graph.close()
+        return scheduled
+
+    def graph(self) -> ToolGraph:
+        """
+        Returns a graph that schedules the calls of one model turn as they arrive,
+        resolving the `{"$ref": <id>}` arguments between them.
+
+        Returns
+        -------
+        ToolGraph
+            A graph running its calls through this dispatcher.
+        """
+        return ToolGraph(self)
+
+    async def _arun_call(self, call: ToolCall) -> Any:
+        tool = self._tool(call)
+        if tool.timeout is None:
+            executor = None if self.max_workers is None else self._get_executor()
+            return await tool.arun(call.arguments, executor=executor)
+        started = None
+        if tool.is_coroutine or tool._process_pool is not None:
+            result = tool.arun(call.arguments)
+        else:
+            started = self._start_thread(tool, call)
+            result = asyncio.wrap_future(started)
+        try:
+            return await asyncio.wait_for(result, tool.timeout)
+        except asyncio.TimeoutError as e:
+            if started is not None:
+                self._abandon(started)
+            raise ToolTimeoutError(
+                f"call {call.id} to {call.name} timed out after {tool.timeout}s"
+            ) from e
+
+    def asubmit(self, call: ToolCall) -> asyncio.Task:
+        """
+        Schedules a single tool call on the running event loop.
+
+        Coroutine tools are awaited natively, while regular tools run in the
+        dispatcher's thread pool, or the loop's default executor when
+        `max_workers` is `None`.
+
+        Parameters
+        ----------
+        call : ToolCall
+            The call to execute.
+
+        Returns
+        -------
+        asyncio.Task
+            A task holding the tool result, or the exception it raised.
+        """
+        return asyncio.ensure_future(self._arun_call(call))
+
+    def adispatch(self, calls: List[ToolCall]) -> List[Tuple[ToolCall, asyncio.Future]]:
+        """
+        Schedules every call of a model turn on the running event loop.
+
+        Parameters
+        ----------
+        calls : List[ToolCall]
+            The calls parsed from the model response.
+
+        Returns
+        -------
+        List[Tuple[ToolCall, asyncio.Future]]
+            Each call paired with its future, ordered by call `id`.
+        """
+        graph = self.agraph()
+        ordered = sorted(calls, key=lambda call: call.id)
+        scheduled = [(call, graph.submit(call)) for call in ordered]
+        graph.close()
+        return scheduled
+
+    def agraph(self) -> AsyncToolGraph:
+        """
+        Returns a graph that schedules the calls of one model turn on the running
+        event loop as they arrive, resolving the `{"$ref": <id>}` arguments between them.
+
+        Returns
+        -------
+        AsyncToolGraph
+            A graph running its calls through this dispatcher.
+        """
+        return AsyncToolGraph(self)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Releases the thread pool, if one was created.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for running calls to finish, by default True.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __repr__(self):
+        return f"ToolDispatcher(toolkit={self.toolkit}, max_workers={self.max_workers})"
@@ -0,0 +1,369 @@
+import asyncio
+import contextvars
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Set
+
+from . import _trace
+from ._base import ToolCall
+
+REF_KEY = "$ref"
+
+
+class ToolDependencyError(Exception):
+    """
+    Raised for a call whose referenced result is unavailable: the referenced call
+    failed, does not exist, or depends back on the call itself.
+    """
+
+
+def _ref_id(value: Any):
+    if (
+        isinstance(value, dict)
+        and len(value) == 1
+        and isinstance(value.get(REF_KEY), int)
+        and not isinstance(value[REF_KEY], bool)
+    ):
+        return value[REF_KEY]
+    return None
+
+
+def call_references(value: Any) -> Set[int]:
+    """
+    Collects the ids referenced by `{"$ref": <id>}` placeholders in call arguments.
+
+    Parameters
+    ----------
+    value : Any
+        The arguments of a call, or any value nested in them.
+
+    Returns
+    -------
+    Set[int]
+        The referenced call ids.
+    """
+    ref = _ref_id(value)
+    if ref is not None:
+        return {ref}
+    if isinstance(value, dict):
+        return set().union(*(call_references(item) for item in value.values()))
+    if isinstance(value, list):
+        return set().union(*(call_references(item) for item in value))
+    return set()
+
+
+def resolve_references(value: Any, results: Dict[int, Any]) -> Any:
+    """
+    Replaces every `{"$ref": <id>}` placeholder with the result of call `id`.
+
+    Parameters
+    ----------
+    value : Any
+        The arguments of a call, or any value nested in them.
+    results : Dict[int, Any]
+        The results of the referenced calls.
+
+    Returns
+    -------
+    Any
+        A copy of `value` with the placeholders substituted.
+    """
+    ref = _ref_id(value)
+    if ref is not None:
+        return results[ref]
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    return value
+
+
+def _chain(source, target):
+    """
+    Copies the outcome of a finished future into another one.
+    """
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class _CallGraph(ABC):
+    """
+    Bookkeeping shared by the thread and event-loop graphs.
+    """
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+        self._futures = {}
+        self._deps = {}
+
+    @abstractmethod
+    def _new_future(self):
+        """
+        Returns a pending future of the graph's kind.
+        """
+
+    def _entry(self, call_id: int):
+        future = self._futures.get(call_id)
+        if future is None:
+            future = self._futures[call_id] = self._new_future()
+        return future
+
+    def _reaches(self, start: Set[int], target: int) -> bool:
+        """
+        Whether `target` is reachable from `start` following the known dependencies.
+        """
+        stack, seen = list(start), set()
+        while stack:
+            node = stack.pop()
+            if node == target:
+                return True
+            if node not in seen:
+                seen.add(node)
+                stack.extend(self._deps.get(node, ()))
+        return False
+
+    def _register(self, call: ToolCall):
+        """
+        Returns the future of a call, its dependencies and, for a call that cannot
+        run, the error it fails with.
+        """
+        if call.id in self._deps:
+            # Duplicate ids run, but only the first call can be referenced.
+            future, error = self._new_future(), None
+        else:
+            future, error = self._entry(call.id), None
+
+        deps = call_references(call.arguments)
+        if deps and self._reaches(deps, call.id):
+            error = ToolDependencyError(f"call {call.id} depends on its own result")
+        if call.id not in self._deps:
+            self._deps[call.id] = deps
+        return future, deps, error
+
+    def _missing(self) -> List[int]:
+        return [call_id for call_id in self._futures if call_id not in self._deps]
+
+    @staticmethod
+    def _failure(call: ToolCall, dep: int, dep_future) -> Optional[ToolDependencyError]:
+        """
+        Returns the error of a call whose dependency did not succeed, or `None`.
+        """
+        if dep_future.cancelled():
+            return ToolDependencyError(
+                f"call {call.id} depends on call {dep}, which was cancelled"
+            )
+        error = dep_future.exception()
+        if error is None:
+            return None
+        return ToolDependencyError(
+            f"call {call.id} depends on call {dep}, which failed: {error}"
+        )
+
+
+class ToolGraph(_CallGraph):
+    """
+    Runs the tool calls of one model turn as a dependency graph, on threads.
+
+    A call's arguments may hold `{"$ref": <id>}` placeholders, which are replaced
+    by the result of the call with that `id` before it runs. Calls are started as
+    soon as the results they reference are available, so independent branches run
+    concurrently on the dispatcher's thread pool. References may point to calls
+    submitted later in the same turn; `close` fails those that never arrive.
+
+    Parameters
+    ----------
+    dispatcher : ToolDispatcher
+        Runs the individual calls.
+
+    Methods
+    -------
+    submit(call: ToolCall) -> Future
+        Schedules a call once its references are resolved.
+    close()
+        Marks the end of the turn, failing the calls that reference unknown ids.
+    """
+
+    def __init__(self, dispatcher):
+        super().__init__(dispatcher)
+        self._lock = threading.Lock()
+        # Dependent calls are started from whichever thread finished their last
+        # dependency; run them in the context the graph was created in.
+        self._context = contextvars.copy_context()
+
+    def _new_future(self) -> Future:
+        return Future()
+
+    def submit(self, call: ToolCall) -> Future:
+        """
+        Schedules a call once the results it references are available.
+
+        Parameters
+        ----------
+        call : ToolCall
+            The call to execute.
+
+        Returns
+        -------
+        Future
+            A future holding the tool result, or the exception it raised. Calls
+            whose references cannot be resolved fail with `ToolDependencyError`.
+        """
+        with self._lock:
+            future, deps, error = self._register(call)
+            dep_futures = {dep: self._entry(dep) for dep in deps}
+
+        if error is not None:
+            future.set_exception(error)
+        elif not deps:
+            self.dispatcher.submit(call).add_done_callback(
+                lambda done: _chain(done, future)
+            )
+        else:
+            self._start_when_ready(call, dep_futures, future)
+        return future
+
+    def _start_when_ready(
+        self, call: ToolCall, dep_futures: Dict[int, Future], future: Future
+    ):
+        remaining = [len(dep_futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._start(call, dep_futures, future)
+
+        for dep_future in dep_futures.values():
+            dep_future.add_done_callback(on_done)
+
+    def _start(self, call: ToolCall, dep_futures: Dict[int, Future], future: Future):
+        results = {}
+        for dep, dep_future in dep_futures.items():
+            error = self._failure(call, dep, dep_future)
+            if error is not None:
+                future.set_exception(error)
+                return
+            results[dep] = dep_future.result()
+
+        resolved = call.model_copy(
+            update={"arguments": resolve_references(call.arguments, results)}
+        )
+        if _trace._tracer is None:
+            submitted = self.dispatcher.submit(resolved)
+        else:
+            submitted = self._context.copy().run(self.dispatcher.submit, resolved)
+        submitted.add_done_callback(lambda done: _chain(done, future))
+
+    def close(self):
+        """
+        Marks the end of the turn. Calls referencing ids that were never submitted
+        fail with `ToolDependencyError`.
+        """
+        with self._lock:
+            missing = {call_id: self._futures[call_id] for call_id in self._missing()}
+        for call_id, future in missing.items():
+            future.set_exception(ToolDependencyError(f"no call with id {call_id}"))
+
+
+class AsyncToolGraph(_CallGraph):
+    """
+    Runs the tool calls of one model turn as a dependency graph, on the event loop.
+
+    The event-loop counterpart of `ToolGraph`: each call is a task that awaits the
+    results it references before running.
+
+    Parameters
+    ----------
+    dispatcher : ToolDispatcher
+        Runs the individual calls.
+
+    Methods
+    -------
+    submit(call: ToolCall) -> asyncio.Future
+        Schedules a call once its references are resolved.
+    close()
+        Marks the end of the turn, failing the calls that reference unknown ids.
+    cancel()
+        Cancels the calls still running and waits for them to stop.
+    """
+
+    def __init__(self, dispatcher):
+        super().__init__(dispatcher)
+        self._tasks = []
+
+    def _new_future(self) -> asyncio.Future:
+        return asyncio.get_running_loop().create_future()
+
+    def submit(self, call: ToolCall) -> asyncio.Future:
+        """
+        Schedules a call once the results it references are available.
+
+        Parameters
+        ----------
+        call : ToolCall
+            The call to execute.
+
+        Returns
+        -------
+        asyncio.Future
+            A future holding the tool result, or the exception it raised. Calls
+            whose references cannot be resolved fail with `ToolDependencyError`.
+        """
+        future, deps, error = self._register(call)
+        if error is not None:
+            future.set_exception(error)
+            return future
+
+        dep_futures = {dep: self._entry(dep) for dep in deps}
+        task = asyncio.ensure_future(self._run(call, dep_futures))
+        task.add_done_callback(lambda done: _chain(done, future))
+        # Cancelling the call's future stops the task running it.
+        future.add_done_callback(lambda done: done.cancelled() and task.cancel())
+        self._tasks.append(task)
+        return future
+
+    async def _run(self, call: ToolCall, dep_futures: Dict[int, asyncio.Future]):
+        if not dep_futures:
+            return await self.dispatcher._arun_call(call)
+
+        await asyncio.wait(dep_futures.values())
+        results = {}
+        for dep, dep_future in dep_futures.items():
+            error = self._failure(call, dep, dep_future)
+            if error is not None:
+                raise error
+            results[dep] = dep_future.result()
+
+        resolved = call.model_copy(
+            update={"arguments": resolve_references(call.arguments, results)}
+        )
+        return await self.dispatcher._arun_call(resolved)
+
+    def close(self):
+        """
+        Marks the end of the turn. Calls referencing ids that were never submitted
+        fail with `ToolDependencyError`.
+        """
+        for call_id in self._missing():
+            self._futures[call_id].set_exception(
+                ToolDependencyError(f"no call with id {call_id}")
+            )
+
+    async def cancel(self):
+        """
+        Cancels the calls of the turn that are still running, and waits for their
+        tasks to finish. Regular tools running in a thread are abandoned to it:
+        their task stops waiting for them, but the thread runs to completion.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
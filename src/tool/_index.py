@@ -0,0 +1,203 @@
+import re
+import threading
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from ._base import Tool, ToolKit
+
+_WORD_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|[_\-.]+")
+
+
+def tool_document(tool: "Tool") -> str:
+    """
+    Returns the text a tool is indexed by: its name split into words, its
+    docstring and the names of its parameters.
+    """
+    schema = tool.schema
+    words = [_WORD_BOUNDARY.sub(" ", schema["name"])]
+    if schema.get("doc"):
+        words.append(schema["doc"])
+    for param in schema["parameters"]["properties"]:
+        words.append(_WORD_BOUNDARY.sub(" ", param))
+    return " ".join(words)
+
+
+class ToolIndex:
+    """
+    A TF-IDF index over the tools of a toolkit, used to send the model only the
+    schemas relevant to a query.
+
+    The index is built on the first search and rebuilt whenever tools are added
+    to the toolkit. It requires scikit-learn.
+
+    Parameters
+    ----------
+    toolkit : ToolKit
+        The toolkit to index.
+    top_k : int, optional
+        Number of tools returned by a search, by default 8.
+    min_score : float, optional
+        Minimum cosine similarity of a returned tool, by default 0, i.e. any tool
+        sharing a term with the query.
+
+    Methods
+    -------
+    search(query: str, k: int = None) -> List[str]
+        Returns the names of the tools most relevant to a query.
+    select(query: str, k: int = None) -> List[str]
+        Returns `k` tools for a query, padding the search results with other tools.
+    resolve(name: str, k: int = 1) -> List[str]
+        Maps a tool name requested by the model to tools of the toolkit.
+    expand(selected: Iterable[str], names: Iterable[str]) -> List[str]
+        Returns the tools to add to a selection for the names the model called.
+    """
+
+    def __init__(self, toolkit: "ToolKit", top_k: int = 8, min_score: float = 0.0):
+        self.toolkit = toolkit
+        self.top_k = top_k
+        self.min_score = min_score
+        self._names = []
+        self._vectorizer = None
+        self._matrix = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def _fit(self):
+        fingerprint = self.toolkit.fingerprint
+        if fingerprint == self._fingerprint:
+            return
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            try:
+                from sklearn.feature_extraction.text import TfidfVectorizer
+            except ImportError as e:
+                raise ImportError(
+                    "ToolIndex requires the 'scikit-learn' package: "
+                    "install agentic_workflow[index]"
+                ) from e
+
+            # Keyed by the names the toolkit resolved, which differ from the
+            # function names when several tools share one.
+            tools = self.toolkit._tools
+            vectorizer = TfidfVectorizer(sublinear_tf=True)
+            self._matrix = vectorizer.fit_transform(
+                [tool_document(tool) for tool in tools.values()]
+            )
+            self._vectorizer = vectorizer
+            self._names = list(tools)
+            self._fingerprint = fingerprint
+
+    def search(self, query: str, k: Optional[int] = None) -> List[str]:
+        """
+        Returns the names of the tools most relevant to a query.
+
+        Parameters
+        ----------
+        query : str
+            The user's message, or any text describing the task.
+        k : int, optional
+            Maximum number of tools returned, by default `top_k`.
+
+        Returns
+        -------
+        List[str]
+            Tool names, most relevant first. Tools sharing no term with the query
+            are never returned, so the list may be shorter than `k` or empty.
+        """
+        if not self.toolkit.tools:
+            return []
+        self._fit()
+        k = self.top_k if k is None else k
+        # Rows are L2-normalized, so the dot product is the cosine similarity.
+        scores = (
+            (self._matrix @ self._vectorizer.transform([query]).T).toarray().ravel()
+        )
+        ranked = (-scores).argsort(kind="stable")[:k]
+        return [
+            self._names[i]
+            for i in ranked
+            if scores[i] > 0 and scores[i] >= self.min_score
+        ]
+
+    def select(self, query: str, k: Optional[int] = None) -> List[str]:
+        """
+        Returns the tools to expose to the model for a query.
+
+        A search may match fewer than `k` tools, or none when the query shares no
+        term with the tool descriptions ("what is 25 times 12?" against `multiply`).
+        The results are padded with the other tools, in registration order, so
+        the model is never left without tools.
+
+        Parameters
+        ----------
+        query : str
+            The user's message, or any text describing the task.
+        k : int, optional
+            Number of tools returned, by default `top_k`.
+
+        Returns
+        -------
+        List[str]
+            Tool names, the search results first. All the tools of the toolkit if
+            it holds at most `k`.
+        """
+        k = self.top_k if k is None else k
+        selected = self.search(query, k=k)
+        if len(selected) < k:
+            found = set(selected)
+            others = (name for name in self.toolkit._tools if name not in found)
+            selected.extend(islice(others, k - len(selected)))
+        return selected
+
+    def resolve(self, name: str, k: int = 1) -> List[str]:
+        """
+        Maps a tool name requested by the model to tools of the toolkit.
+
+        Parameters
+        ----------
+        name : str
+            The requested name.
+        k : int, optional
+            Number of tools returned for a name the toolkit does not hold, by default 1.
+
+        Returns
+        -------
+        List[str]
+            `[name]` if the toolkit holds it, otherwise the tools whose names and
+            descriptions best match it.
+        """
+        if self.toolkit.get_tool_by_name(name) is not None:
+            return [name]
+        return self.search(_WORD_BOUNDARY.sub(" ", name), k=k)
+
+    def expand(self, selected: Iterable[str], names: Iterable[str]) -> List[str]:
+        """
+        Returns the tools to add to a selection for the names the model requested.
+
+        Parameters
+        ----------
+        selected : Iterable[str]
+            The tools already exposed to the model.
+        names : Iterable[str]
+            The tool names the model called.
+
+        Returns
+        -------
+        List[str]
+            The resolved tools missing from `selected`, without duplicates.
+        """
+        selected = set(selected)
+        added = []
+        for name in names:
+            if name in selected:
+                continue
+            for resolved in self.resolve(name):
+                if resolved not in selected:
+                    selected.add(resolved)
+                    added.append(resolved)
+        return added
+
+    def __repr__(self):
+        return f"ToolIndex(tools={len(self.toolkit.tools)}, top_k={self.top_k})"
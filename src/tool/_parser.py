@@ -0,0 +1,465 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ._base import ToolCall
+from ._repair import repair_json, repair_stats
+from ._trace import span
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+
+class ToolCallParser:
+    """
+    Single-pass scanner for the XML-like tags produced by the agents' prompts.
+
+    The parser recognises `<thought>`, `<tool_calls>`, `<tool_call>` and
+    `<response>` blocks. Text can be fed in chunks as it is streamed; every
+    character is inspected a bounded number of times, and consumed text is
+    dropped from the working buffer, so the cost stays linear in the length
+    of the transcript (the chunks of an open block are only joined once its
+    closing tag can be complete). Tool call blocks may hold one or more JSON
+    objects (or a JSON list of objects) spread over any number of lines.
+
+    Blocks that are not valid JSON go through `repair_json` (Python literals,
+    single quotes, trailing commas, raw control characters in strings) and calls
+    without an `id` are numbered after the highest id seen, so the common
+    mistakes of models cost microseconds instead of another turn. A call reusing
+    the id of an earlier call of the same turn is renumbered the same way.
+
+    Parameters
+    ----------
+    content : str, optional
+        Text to feed right away.
+    repair : bool, optional
+        Whether malformed payloads are repaired, by default True.
+
+    Attributes
+    ----------
+    content : str
+        The text received so far.
+    calls : List[ToolCall]
+        Every tool call completed so far, in arrival order.
+    raw_calls : List[dict]
+        The decoded JSON objects behind `calls`, including those that were not
+        valid `ToolCall` payloads.
+    thoughts : List[str]
+        The text of every completed `<thought>` block.
+    response : Optional[str]
+        The text of the first `<response>` block, once it is complete.
+    errors : List[Tuple[str, str]]
+        The blocks that could not be decoded, paired with the error message.
+    invalid_calls : List[Tuple[Any, str]]
+        Decoded values that are not valid `ToolCall` payloads, paired with the error message.
+    repairs : Dict[str, int]
+        The repairs applied by this parser, by kind. Every repair is also counted
+        in the process-wide `repair_stats()`.
+    done : bool
+        Whether the final `<response>` block has been received.
+
+    Methods
+    -------
+    feed(chunk: str) -> List[ToolCall]
+        Adds a chunk of text and returns the tool calls it completed.
+    feed_native(message: Mapping) -> List[ToolCall]
+        Adds the structured tool calls of a chat message.
+    """
+
+    BLOCKS = {
+        "<tool_calls>": "</tool_calls>",
+        "<tool_call>": "</tool_call>",
+        "<thought>": "</thought>",
+        "<response>": "</response>",
+    }
+    _OPEN_TAG = re.compile("|".join(re.escape(tag) for tag in BLOCKS))
+    _LONGEST_OPEN = max(len(tag) for tag in BLOCKS)
+
+    def __init__(self, content: str = None, repair: bool = True):
+        self.calls = []
+        self.raw_calls = []
+        self.thoughts = []
+        self.response = None
+        self.errors = []
+        self.invalid_calls = []
+        self.repairs = {}
+        self.repair = repair
+        self._next_id = 0
+        self._ids = set()
+        self._parts = []
+        self._content = ""
+        self._buffer = ""
+        self._pos = 0
+        self._open_tag = None
+        self._open_at = 0
+        self._pending = []
+        self._tail = ""
+        self._tail_size = 0
+        if content:
+            self.feed(content)
+
+    @property
+    def done(self) -> bool:
+        return self.response is not None
+
+    @property
+    def content(self) -> str:
+        if self._parts:
+            self._content += "".join(self._parts)
+            self._parts = []
+        return self._content
+
+    def feed(self, chunk: str) -> List[ToolCall]:
+        """
+        Adds a chunk of text.
+
+        Parameters
+        ----------
+        chunk : str
+            The next piece of the model response.
+
+        Returns
+        -------
+        List[ToolCall]
+            The tool calls whose closing tag arrived with this chunk.
+        """
+        if not chunk:
+            return []
+        self._parts.append(chunk)
+        if self.done:
+            return []
+
+        tag = self._open_tag
+        if tag is not None:
+            # Inside a block only its closing tag matters: hold the chunks back
+            # until one may complete it, so a long block is joined once.
+            window = self._tail + chunk
+            if self.BLOCKS[tag] not in window:
+                self._pending.append(chunk)
+                self._tail = window[-self._tail_size :]
+                return []
+            if self._pending:
+                self._pending.append(chunk)
+                chunk = "".join(self._pending)
+                self._pending = []
+
+        self._buffer += chunk
+        buffer = self._buffer
+        pos = self._pos
+        completed = []
+
+        while True:
+            if tag is None:
+                match = self._OPEN_TAG.search(buffer, pos)
+                if match is None:
+                    # Rescan the tail next time, a tag may be split across chunks.
+                    pos = max(pos, len(buffer) - self._LONGEST_OPEN + 1)
+                    break
+                tag = match.group()
+                pos = self._open_at = match.end()
+
+            close_tag = self.BLOCKS[tag]
+            end = buffer.find(close_tag, pos)
+            if end == -1:
+                pos = max(pos, len(buffer) - len(close_tag) + 1)
+                break
+            self._close_block(tag, buffer[self._open_at : end], completed)
+            tag = None
+            pos = end + len(close_tag)
+            if self.response is not None:
+                break
+
+        self._pos = pos
+        self._open_tag = tag
+        self._compact()
+        if tag is not None:
+            self._tail_size = len(self.BLOCKS[tag]) - 1
+            self._tail = self._buffer[-self._tail_size :]
+        self.calls.extend(completed)
+        return completed
+
+    def feed_native(self, message: Any) -> List[ToolCall]:
+        """
+        Adds the structured calls of a message, used when the toolkit is sent
+        through the `tools` argument of ollama's chat API.
+
+        The native format carries no id: the calls are numbered after the highest
+        id seen so far, so they never collide with the tagged calls of the same
+        turn. Calls that are malformed (missing fields, undecodable or invalid
+        arguments) are recorded in `invalid_calls`.
+
+        Parameters
+        ----------
+        message : Mapping
+            The `message` of a chat response or of a streamed chunk.
+
+        Returns
+        -------
+        List[ToolCall]
+            The calls of the message, or an empty list if it has none.
+        """
+        raw_calls = message["tool_calls"] if "tool_calls" in message else None
+        completed = []
+        for raw in raw_calls or ():
+            try:
+                function = raw["function"]
+                arguments = function["arguments"]
+                if isinstance(arguments, str):
+                    # OpenAI-compatible servers send the arguments as a JSON string.
+                    arguments = _load_arguments(arguments)
+                call = ToolCall(
+                    name=function["name"], arguments=arguments, id=self._next_id
+                )
+            except (KeyError, TypeError, json.JSONDecodeError, ValidationError) as e:
+                self.invalid_calls.append((raw, f"{type(e).__name__}: {e}"))
+                continue
+            self._ids.add(self._next_id)
+            self._next_id += 1
+            self.raw_calls.append(raw)
+            completed.append(call)
+        self.calls.extend(completed)
+        return completed
+
+    def _compact(self):
+        """
+        Drops the part of the buffer that can no longer be part of a block.
+        """
+        keep_from = self._open_at - len(self._open_tag) if self._open_tag else self._pos
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            self._open_at -= keep_from
+
+    def _close_block(self, tag: str, body: str, completed: List[ToolCall]):
+        """
+        Records a complete block, appending any tool calls it holds to `completed`.
+        """
+        if tag == "<thought>":
+            self.thoughts.append(body.strip())
+            return
+        if tag == "<response>":
+            self.response = body.strip()
+            return
+
+        for payload, error in self._decode(body):
+            if error is not None:
+                self.errors.append((payload, error))
+                continue
+            items = payload if isinstance(payload, list) else [payload]
+            for item in items:
+                missing_id = self.repair and isinstance(item, dict) and "id" not in item
+                if missing_id:
+                    item = dict(item, id=self._next_id)
+                self.raw_calls.append(item)
+                try:
+                    call = ToolCall(**item)
+                except (TypeError, ValidationError) as e:
+                    self.invalid_calls.append((item, str(e)))
+                    call = None
+                if missing_id:
+                    self._count(["missing_id"], call is not None)
+                if call is None:
+                    continue
+                if call.id in self._ids:
+                    # Ids key `$ref` arguments and results: keep them unique in a turn.
+                    call = call.model_copy(update={"id": self._next_id})
+                self._ids.add(call.id)
+                self._next_id = max(self._next_id, call.id + 1)
+                completed.append(call)
+
+    def _decode(self, body: str) -> List[Tuple[Any, Optional[str]]]:
+        """
+        Decodes every JSON value in a tool call block, repairing the rest of the
+        block once when a value fails to decode.
+        """
+        decoded = []
+        pos = 0
+        end = len(body)
+        repaired = None
+        ok = True
+        while True:
+            pos = _WHITESPACE.match(body, pos).end()
+            if pos == end:
+                break
+            try:
+                value, pos = _DECODER.raw_decode(body, pos)
+            except json.JSONDecodeError as e:
+                if self.repair and repaired is None:
+                    body, repaired = repair_json(body[pos:])
+                    pos, end = 0, len(body)
+                    if repaired:
+                        continue
+                decoded.append((body[pos:].strip(), str(e)))
+                ok = False
+                break
+            decoded.append((value, None))
+        if repaired is not None:
+            self._count(repaired, ok)
+        return decoded
+
+    def _count(self, kinds: List[str], ok: bool):
+        for kind in kinds:
+            self.repairs[kind] = self.repairs.get(kind, 0) + 1
+        repair_stats().record(kinds, ok)
+
+    def __repr__(self):
+        return (
+            f"ToolCallParser(calls={len(self.calls)}, thoughts={len(self.thoughts)}, "
+            f"done={self.done})"
+        )
+
+
+def parse_tool_calls(content: str) -> List[Dict[str, Any]]:
+    """
+    Parses every <tool_calls> or <tool_call> entry from a string and returns a list of dictionaries.
+
+    Parameters
+    ----------
+    content : str
+        A string containing XML-like tool call entries, where each entry contains JSON data.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        A list of dictionaries parsed from the JSON content inside each tool call tag.
+        Blocks that cannot be decoded are skipped; see `ToolCallParser.errors`.
+    """
+    return ToolCallParser(content).raw_calls
+
+
+def _load_arguments(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        repaired, kinds = repair_json(text)
+    try:
+        value = json.loads(repaired)
+    except json.JSONDecodeError:
+        repair_stats().record(kinds, False)
+        raise
+    repair_stats().record(kinds, True)
+    return value
+
+
+def native_tool_calls(message: Any, start: int = 0) -> List[ToolCall]:
+    """
+    Creates `ToolCall` instances from the structured calls of a chat response message.
+
+    Used when the toolkit is sent through the `tools` argument of ollama's chat
+    API, which returns the calls in `message.tool_calls` instead of tagged text.
+    Malformed calls are skipped; use `ToolCallParser.feed_native` to inspect them.
+
+    Parameters
+    ----------
+    message : Mapping
+        The `message` of a chat response or of a streamed chunk.
+    start : int, optional
+        The id of the first call, by default 0. The calls are numbered in order,
+        since the native format carries no id.
+
+    Returns
+    -------
+    List[ToolCall]
+        The calls of the message, or an empty list if it has none.
+    """
+    parser = ToolCallParser()
+    parser._next_id = start
+    return parser.feed_native(message)
+
+
+def format_native_calls(calls: List[ToolCall]) -> List[Dict[str, Any]]:
+    """
+    Formats tool calls as the `tool_calls` of an assistant message, so the calls a
+    model made through the `tools` argument can be kept in the history.
+
+    Parameters
+    ----------
+    calls : List[ToolCall]
+        The calls to format.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The calls in the format of ollama's chat API.
+    """
+    return [
+        {"function": {"name": call.name, "arguments": call.arguments}} for call in calls
+    ]
+
+
+class ToolCallProcessor:
+    """
+    Extracts the tool calls, thoughts and final response from a model message.
+
+    Parameters
+    ----------
+    message : str
+        The model message to process.
+
+    Attributes
+    ----------
+    message : str
+        The processed message.
+    parser : ToolCallParser
+        The parser that scanned the message.
+    calls : List[ToolCall]
+        The tool calls found in the message.
+    errors : List[Tuple[str, str]]
+        The blocks that could not be decoded, paired with the error message.
+    invalid_calls : List[Tuple[Any, str]]
+        Decoded values that are not valid `ToolCall` payloads, paired with the error message.
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+        self.parser = ToolCallParser()
+        with span("parse", length=len(message)) as parse_span:
+            self.calls = self.create_tool_calls(self.message)
+            parse_span.set(calls=len(self.calls), repairs=sum(self.repairs.values()))
+
+    @property
+    def thoughts(self) -> List[str]:
+        return self.parser.thoughts
+
+    @property
+    def response(self) -> Optional[str]:
+        return self.parser.response
+
+    @property
+    def repairs(self) -> Dict[str, int]:
+        return self.parser.repairs
+
+    @property
+    def errors(self) -> List[Tuple[str, str]]:
+        return self.parser.errors
+
+    @property
+    def invalid_calls(self) -> List[Tuple[Any, str]]:
+        return self.parser.invalid_calls
+
+    @property
+    def is_final(self) -> bool:
+        """
+        Whether the message holds a complete `<response>` block.
+        """
+        return self.parser.done
+
+    def create_tool_calls(self, content: str) -> List[ToolCall]:
+        """
+        Creates `ToolCall` instances from parsed tool calls in the content.
+
+        Parameters
+        ----------
+        content : str
+            The message content to parse for tool calls.
+
+        Returns
+        -------
+        List[ToolCall]
+            A list of `ToolCall` instances created from the parsed content. The
+        payloads that are not valid calls are recorded in `errors` and
+        `invalid_calls`.
+        """
+        return self.parser.feed(content)
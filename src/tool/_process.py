@@ -0,0 +1,246 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import os
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+def import_path(func: Callable[..., Any]) -> str:
+    """
+    Returns the `module:qualname` path a worker process imports a function from.
+
+    Parameters
+    ----------
+    func : Callable[..., Any]
+        A module-level function (or a function nested in module-level classes).
+
+    Returns
+    -------
+    str
+        The import path of `func`.
+
+    Raises
+    ------
+    ValueError
+        If `func` cannot be imported by name, e.g. a lambda, a closure or a
+        function replaced by a decorator that does not preserve its name.
+    """
+    module = getattr(func, "__module__", None)
+    qualname = getattr(func, "__qualname__", "")
+    if module is None or "<" in qualname:
+        raise ValueError(f"{func!r} cannot be imported by name in a worker process")
+    path = f"{module}:{qualname}"
+    if resolve_import_path(path) is not func:
+        raise ValueError(f"{path} does not resolve to {func!r}")
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_import_path(path: str) -> Callable[..., Any]:
+    """
+    Imports the function at a `module:qualname` path. Lookups are cached, so each
+    worker process imports a tool once.
+    """
+    module, _, qualname = path.partition(":")
+    target = importlib.import_module(module)
+    for attribute in qualname.split("."):
+        target = getattr(target, attribute)
+    return target
+
+
+def _call(path: str, kwargs: Mapping[str, Any]) -> Any:
+    """
+    Runs a tool inside a worker process.
+    """
+    result = resolve_import_path(path)(**kwargs)
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    return result
+
+
+def _call_isolated(conn, path: str, kwargs: Mapping[str, Any]):
+    """
+    Runs a timed tool in a process of its own and sends back the outcome.
+    """
+    try:
+        outcome = (True, _call(path, kwargs))
+    except BaseException as e:
+        outcome = (False, e)
+    try:
+        conn.send(outcome)
+    except Exception as e:
+        # The result or the exception could not be pickled.
+        conn.send((False, RuntimeError(f"{path} returned an unpicklable value: {e}")))
+    conn.close()
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class ProcessPool:
+    """
+    A lazily started pool of worker processes for CPU-bound tools.
+
+    Tools are shipped by import path and only their arguments and results are
+    pickled, so a call costs one small message each way. Workers are kept alive
+    and reuse the modules they imported, so only the first call of a tool in a
+    worker pays for the import.
+
+    Calls with a timeout run in a process of their own instead, which is
+    terminated when the call overruns, so a hung tool never holds a worker of
+    the pool. They pay for a process start and the import of the tool.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+    mp_context : multiprocessing.context.BaseContext, optional
+        The multiprocessing context used to start the workers, by default the
+        platform's default.
+
+    Methods
+    -------
+    submit(path: str, kwargs: Mapping[str, Any], timeout: float = None) -> Future
+        Schedules a call of the function at `path`.
+    warm()
+        Starts every worker process ahead of the first call.
+    shutdown(wait: bool = True)
+        Stops the worker processes.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.mp_context = mp_context
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> "ProcessPoolExecutor":
+        with self._lock:
+            if self._executor is None:
+                # Imported here: `multiprocessing` is only needed once a pool starts.
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=self.mp_context
+                )
+            return self._executor
+
+    def submit(
+        self, path: str, kwargs: Mapping[str, Any], timeout: Optional[float] = None
+    ) -> Future:
+        """
+        Schedules a call in a worker process.
+
+        Parameters
+        ----------
+        path : str
+            The `module:qualname` path of the function, see `import_path`.
+        kwargs : Mapping[str, Any]
+            The arguments of the call. They must be picklable.
+        timeout : float, optional
+            Seconds the call may run. A timed call runs in a process of its own,
+            which is terminated when the timeout passes. By default the call runs
+            in the pool and is not timed.
+
+        Returns
+        -------
+        Future
+            A future holding the result, or the exception raised by the call
+            (`TimeoutError` for a call that overran).
+        """
+        if timeout is not None:
+            return self._submit_isolated(path, kwargs, timeout)
+        return self._get_executor().submit(_call, path, dict(kwargs))
+
+    def _submit_isolated(
+        self, path: str, kwargs: Mapping[str, Any], timeout: float
+    ) -> Future:
+        import multiprocessing
+
+        context = self.mp_context or multiprocessing.get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_call_isolated, args=(sender, path, dict(kwargs)), daemon=True
+        )
+        future = Future()
+        future.set_running_or_notify_cancel()
+        process.start()
+        sender.close()
+
+        def wait():
+            try:
+                if receiver.poll(timeout):
+                    ok, value = receiver.recv()
+                else:
+                    ok, value = False, TimeoutError(
+                        f"{path} timed out after {timeout}s"
+                    )
+            except (EOFError, OSError):
+                ok, value = False, RuntimeError(
+                    f"the process running {path} exited unexpectedly"
+                )
+            finally:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+                receiver.close()
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        threading.Thread(target=wait, name="tool-process", daemon=True).start()
+        return future
+
+    def warm(self):
+        """
+        Starts every worker process, so the first tool calls do not pay for it.
+        """
+        executor = self._get_executor()
+        for future in [executor.submit(_ready) for _ in range(self.max_workers)]:
+            future.result()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops the worker processes. The pool starts new ones if it is used again.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for running calls to finish, by default True.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def __repr__(self):
+        state = "running" if self._executor is not None else "idle"
+        return f"ProcessPool(max_workers={self.max_workers}, {state})"
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_process_pool() -> ProcessPool:
+    """
+    Returns the process pool shared by every toolkit of the process.
+
+    Returns
+    -------
+    ProcessPool
+        The shared pool, created (but not started) on first use.
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ProcessPool()
+        return _shared_pool
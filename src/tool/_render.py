@@ -0,0 +1,190 @@
+import inspect
+import json
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from pydantic.errors import PydanticInvalidForJsonSchema
+
+if TYPE_CHECKING:
+    from ._base import Tool
+
+# Schema renderers, from the most to the least verbose.
+SCHEMA_STYLES = ("json", "compact", "summary", "signature")
+
+# Separator between the schemas of a prompt, per style.
+SEPARATORS = {"json": "\n\n", "compact": "\n", "summary": "\n", "signature": "\n"}
+
+
+def docstring_summary(doc: Optional[str]) -> str:
+    """
+    Returns the summary of a docstring: its first paragraph on a single line.
+
+    Parameters
+    ----------
+    doc : Optional[str]
+        A docstring, e.g. in numpydoc format.
+
+    Returns
+    -------
+    str
+        The text before the first blank line, or an empty string.
+    """
+    if not doc:
+        return ""
+    return " ".join(inspect.cleandoc(doc).split("\n\n", 1)[0].split())
+
+
+def approx_token_count(text: str) -> int:
+    """
+    Estimates the number of tokens of a text with the four-characters-per-token rule.
+
+    Parameters
+    ----------
+    text : str
+        The text to measure.
+
+    Returns
+    -------
+    int
+        The estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+
+def _annotation_name(annotation) -> str:
+    if annotation is inspect.Parameter.empty:
+        return "unknown"
+    if isinstance(annotation, type):
+        return annotation.__name__
+    return str(annotation).replace("typing.", "")
+
+
+def render_json(tool: "Tool") -> str:
+    """The schema as indented JSON, with the full docstring."""
+    return json.dumps(tool.schema, indent=4)
+
+
+def render_compact(tool: "Tool") -> str:
+    """The schema as JSON without whitespace, with the dedented docstring."""
+    schema = dict(tool.schema, doc=inspect.cleandoc(tool.doc) if tool.doc else None)
+    return json.dumps(schema, separators=(",", ":"))
+
+
+def render_summary(tool: "Tool") -> str:
+    """The schema as JSON without whitespace, with the docstring's summary only."""
+    schema = dict(tool.schema, doc=docstring_summary(tool.doc))
+    return json.dumps(schema, separators=(",", ":"))
+
+
+def render_signature(tool: "Tool") -> str:
+    """A Python-like signature line followed by the docstring's summary."""
+    params = []
+    for name, param in tool.signature.parameters.items():
+        text = f"{name}: {_annotation_name(param.annotation)}"
+        if param.default is not inspect.Parameter.empty:
+            text += f" = {param.default!r}"
+        params.append(text)
+    returns = _annotation_name(tool.signature.return_annotation)
+    line = f"{tool.name}({', '.join(params)}) -> {returns}"
+    summary = docstring_summary(tool.doc)
+    return f"{line}: {summary}" if summary else line
+
+
+def tool_definition(tool: "Tool") -> dict:
+    """
+    Describes a tool in the format of the `tools` argument of ollama's chat API.
+
+    Parameters
+    ----------
+    tool : Tool
+        The tool to describe.
+
+    Returns
+    -------
+    dict
+        A function definition whose parameters are the JSON schema of the tool's
+        arguments. Arguments without a default are required, and annotations
+        Pydantic cannot describe are left unconstrained.
+    """
+    try:
+        schema = tool.args_model.model_json_schema()
+    except PydanticInvalidForJsonSchema:
+        schema = {"properties": {name: {} for name in tool.signature.parameters}}
+
+    properties = schema.get("properties", {})
+    required = []
+    for name, param in tool.signature.parameters.items():
+        prop = properties.setdefault(name, {})
+        prop.pop("title", None)
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+        elif isinstance(param.default, (str, int, float, bool, type(None))):
+            prop["default"] = param.default
+
+    parameters = {"type": "object", "properties": properties, "required": required}
+    if "$defs" in schema:
+        parameters["$defs"] = schema["$defs"]
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": docstring_summary(tool.doc),
+            "parameters": parameters,
+        },
+    }
+
+
+RENDERERS: Dict[str, Callable[["Tool"], str]] = {
+    "json": render_json,
+    "compact": render_compact,
+    "summary": render_summary,
+    "signature": render_signature,
+}
+
+
+def check_style(style: str):
+    if style not in RENDERERS:
+        raise ValueError(f"style must be one of {SCHEMA_STYLES}, got {style!r}")
+
+
+class SchemaReport:
+    """
+    The prompt size of a toolkit's schemas in one rendering style.
+
+    Attributes
+    ----------
+    style : str
+        The rendering style.
+    tools : int
+        Number of tools rendered.
+    chars : int
+        Length of the rendered schemas.
+    tokens : int
+        Tokens of the rendered schemas, as measured by the report's counter.
+    """
+
+    __slots__ = ("style", "tools", "chars", "tokens")
+
+    def __init__(self, style: str, tools: int, chars: int, tokens: int):
+        self.style = style
+        self.tools = tools
+        self.chars = chars
+        self.tokens = tokens
+
+    @property
+    def tokens_per_tool(self) -> float:
+        return self.tokens / self.tools if self.tools else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "style": self.style,
+            "tools": self.tools,
+            "chars": self.chars,
+            "tokens": self.tokens,
+            "tokens_per_tool": self.tokens_per_tool,
+        }
+
+    def __repr__(self):
+        return (
+            f"SchemaReport(style={self.style!r}, tools={self.tools}, "
+            f"tokens={self.tokens}, tokens_per_tool={self.tokens_per_tool:.1f})"
+        )
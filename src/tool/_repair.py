@@ -0,0 +1,157 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Kinds of repair, in the order they are described in `repair_json`.
+REPAIRS = (
+    "single_quotes",
+    "control_characters",
+    "python_literals",
+    "trailing_commas",
+    "missing_id",
+)
+
+_TOKEN = re.compile(
+    r"""
+    (?P<double>"(?:[^"\\]|\\.)*")           # a JSON string
+    | (?P<single>'(?:[^'\\]|\\.)*')         # a Python-style string
+    | (?P<comma>,(?=\s*[}\]]))              # a comma closing nothing
+    | (?P<literal>\b(?:True|False|None)\b)  # a Python constant
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_CONTROL = re.compile(r"[\x00-\x1f]")
+_UNESCAPED_QUOTE = re.compile(r'(?<!\\)"')
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _escape_control(match: re.Match) -> str:
+    char = match.group()
+    return _ESCAPES.get(char) or f"\\u{ord(char):04x}"
+
+
+def repair_json(text: str) -> Tuple[str, List[str]]:
+    """
+    Rewrites the usual mistakes of models writing JSON into valid JSON.
+
+    The text is scanned once, outside and inside strings, and fixed as follows:
+
+    - "single_quotes": 'single-quoted' strings are double-quoted.
+    - "control_characters": raw newlines, tabs and other control characters in
+      strings are escaped.
+    - "python_literals": `True`, `False` and `None` become `true`, `false` and `null`.
+    - "trailing_commas": commas before a closing `}` or `]` are dropped.
+
+    Parameters
+    ----------
+    text : str
+        One or more JSON values that failed to decode.
+
+    Returns
+    -------
+    Tuple[str, List[str]]
+        The repaired text, and the kinds of repair applied (empty if the text
+        holds none of these mistakes).
+    """
+    applied = set()
+
+    def fix(match: re.Match) -> str:
+        kind = match.lastgroup
+        token = match.group()
+        if kind == "double":
+            if _CONTROL.search(token) is None:
+                return token
+            applied.add("control_characters")
+            return _CONTROL.sub(_escape_control, token)
+        if kind == "single":
+            applied.add("single_quotes")
+            body = _UNESCAPED_QUOTE.sub(r'\\"', token[1:-1].replace("\\'", "'"))
+            if _CONTROL.search(body) is not None:
+                applied.add("control_characters")
+                body = _CONTROL.sub(_escape_control, body)
+            return f'"{body}"'
+        if kind == "comma":
+            applied.add("trailing_commas")
+            return ""
+        applied.add("python_literals")
+        return _LITERALS[token]
+
+    repaired = _TOKEN.sub(fix, text)
+    return repaired, [kind for kind in REPAIRS if kind in applied]
+
+
+class RepairStats:
+    """
+    Counters of the tool call payloads repaired before validation.
+
+    Attributes
+    ----------
+    repaired : int
+        Payloads that decoded after a repair.
+    failed : int
+        Payloads that were still invalid after the repair stage.
+    counts : Dict[str, int]
+        Repairs applied, by kind (see `REPAIRS`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.repaired = 0
+        self.failed = 0
+        self.counts = dict.fromkeys(REPAIRS, 0)
+
+    def record(self, kinds: Iterable[str], ok: bool):
+        """
+        Counts the outcome of one repaired payload.
+
+        Parameters
+        ----------
+        kinds : Iterable[str]
+            The kinds of repair applied.
+        ok : bool
+            Whether the payload was valid afterwards.
+        """
+        with self._lock:
+            if ok:
+                self.repaired += 1
+            else:
+                self.failed += 1
+            for kind in kinds:
+                self.counts[kind] += 1
+
+    @property
+    def repair_rate(self) -> float:
+        total = self.repaired + self.failed
+        return self.repaired / total if total else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.repaired = 0
+            self.failed = 0
+            self.counts = dict.fromkeys(REPAIRS, 0)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"repaired": self.repaired, "failed": self.failed, **self.counts}
+
+    def __repr__(self):
+        applied = ", ".join(f"{kind}={n}" for kind, n in self.counts.items() if n)
+        return (
+            f"RepairStats(repaired={self.repaired}, failed={self.failed}"
+            f"{', ' + applied if applied else ''})"
+        )
+
+
+_STATS = RepairStats()
+
+
+def repair_stats() -> RepairStats:
+    """
+    Returns the repair counters of the process, shared by every parser.
+
+    Returns
+    -------
+    RepairStats
+        The counters. Call `reset` to start a new measurement.
+    """
+    return _STATS
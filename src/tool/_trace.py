@@ -0,0 +1,470 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import IO, Any, Dict, Iterable, Mapping, Optional, Union
+
+# Fields of an Ollama chat response describing where the time of a request went.
+OLLAMA_FIELDS = (
+    "prompt_eval_count",
+    "eval_count",
+    "total_duration",
+    "load_duration",
+    "prompt_eval_duration",
+    "eval_duration",
+)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_tracer = None
+
+
+class Span:
+    """
+    A timed operation of the agent loop, nested under the span active when it started.
+
+    Spans are context managers: entering one makes it the parent of the spans
+    started inside it, in the same thread or task.
+
+    Attributes
+    ----------
+    name : str
+        The operation, e.g. "agent.step", "llm.chat", "parse" or "tool".
+    attributes : Dict[str, Any]
+        Details of the operation, such as the tool name or the Ollama timings.
+    trace_id : str
+        Identifier shared by a root span and all its descendants.
+    span_id : str
+        Identifier of this span.
+    parent_id : Optional[str]
+        Identifier of the enclosing span.
+    start_time : int
+        Wall-clock start, in nanoseconds since the epoch.
+    end_time : Optional[int]
+        Wall-clock end, in nanoseconds since the epoch.
+    duration : Optional[float]
+        Duration in seconds, measured with a monotonic clock.
+    error : Optional[str]
+        The exception that escaped the span, if any.
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "duration",
+        "error",
+        "_tracer",
+        "_started",
+        "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = None
+        self.end_time = None
+        self.duration = None
+        self.error = None
+        self._tracer = tracer
+        self._started = None
+        self._token = None
+
+    def set(self, **attributes: Any):
+        """
+        Adds attributes to the span.
+        """
+        self.attributes.update(attributes)
+
+    def record_response(self, response: Any):
+        """
+        Copies the token counts and durations of an Ollama response into the span.
+
+        Parameters
+        ----------
+        response : Any
+            A chat response, or the last chunk of a streamed one.
+        """
+        if response is None:
+            return
+        for field in OLLAMA_FIELDS:
+            value = response.get(field)
+            if value is not None:
+                self.attributes[field] = value
+
+    def __enter__(self):
+        self.start_time = time.time_ns()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        self._tracer._on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self._started
+        self.end_time = self.start_time + int(self.duration * 1e9)
+        if exc is not None:
+            self.error = repr(exc)
+        _current_span.reset(self._token)
+        self._tracer._on_end(self)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the span as a JSON-serializable dictionary.
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def __repr__(self):
+        return f"Span(name={self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+class _NoopSpan:
+    """
+    The span handed out when tracing is disabled. It records nothing.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any):
+        pass
+
+    def record_response(self, response: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class LatencyHistogram:
+    """
+    A fixed-bucket histogram of latencies, in milliseconds.
+
+    Parameters
+    ----------
+    bounds : Iterable[float], optional
+        Upper bounds of the buckets, in milliseconds. Values above the last bound
+        fall in an overflow bucket. By default roughly 1-2-5 steps from 1 ms to 60 s.
+
+    Attributes
+    ----------
+    count : int
+        Number of observations.
+    total : float
+        Sum of the observations.
+    min : float
+        Smallest observation.
+    max : float
+        Largest observation.
+    """
+
+    BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+    def __init__(self, bounds: Iterable[float] = BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        Records a latency, in milliseconds.
+        """
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket that holds it.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float
+            The estimate, in milliseconds, capped by the largest observation.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def __repr__(self):
+        return (
+            f"LatencyHistogram(count={self.count}, mean={self.mean:.2f}ms, "
+            f"p95={self.quantile(0.95):.2f}ms)"
+        )
+
+
+class Tracer:
+    """
+    Collects the spans of the agent loop and forwards them to exporters.
+
+    Install a tracer with `set_tracer` to enable the hooks of the agents, the
+    parser and the tools; while no tracer is installed they cost a single check.
+
+    Parameters
+    ----------
+    exporters : Iterable, optional
+        Objects with `on_start(span)` and `on_end(span)` methods, such as
+        `JsonLinesExporter` or `OpenTelemetryExporter`.
+
+    Attributes
+    ----------
+    exporters : List
+        The exporters spans are forwarded to.
+    histograms : Dict[str, LatencyHistogram]
+        Latency of each tool, keyed by tool name.
+
+    Methods
+    -------
+    span(name: str, **attributes) -> Span
+        Creates a span nested under the current one.
+    """
+
+    def __init__(self, exporters: Iterable = ()):
+        self.exporters = list(exporters)
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        """
+        Creates a span, nested under the span active in the current thread or task.
+
+        Parameters
+        ----------
+        name : str
+            The operation.
+        **attributes : Any
+            Details of the operation.
+
+        Returns
+        -------
+        Span
+            The span, to be used as a context manager.
+        """
+        return Span(self, name, attributes)
+
+    def _on_start(self, span: Span):
+        for exporter in self.exporters:
+            exporter.on_start(span)
+
+    def _on_end(self, span: Span):
+        if span.name == "tool":
+            self.histogram(span.attributes.get("tool", "")).observe(span.duration * 1e3)
+        for exporter in self.exporters:
+            exporter.on_end(span)
+
+    def histogram(self, tool: str) -> LatencyHistogram:
+        """
+        Returns the latency histogram of a tool, creating it if needed.
+        """
+        histogram = self.histograms.get(tool)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(tool, LatencyHistogram())
+        return histogram
+
+    def latency_report(self) -> Dict[str, dict]:
+        """
+        Returns the latency summary (count, mean, min, max, p50, p95, p99) of each tool.
+        """
+        return {tool: h.to_dict() for tool, h in sorted(self.histograms.items())}
+
+    def __repr__(self):
+        return f"Tracer(exporters={self.exporters}, tools={len(self.histograms)})"
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """
+    Installs the tracer used by every agent and tool of the process.
+
+    Parameters
+    ----------
+    tracer : Optional[Tracer]
+        The tracer, or `None` to disable tracing.
+
+    Returns
+    -------
+    Optional[Tracer]
+        The previously installed tracer.
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Returns the installed tracer, or `None` when tracing is disabled.
+    """
+    return _tracer
+
+
+def span(name: str, **attributes: Any) -> Union[Span, _NoopSpan]:
+    """
+    Starts a span with the installed tracer, or returns a no-op span when tracing is disabled.
+
+    Parameters
+    ----------
+    name : str
+        The operation.
+    **attributes : Any
+        Details of the operation.
+
+    Returns
+    -------
+    Union[Span, _NoopSpan]
+        A context manager.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(tracer, name, attributes)
+
+
+class JsonLinesExporter:
+    """
+    Writes every finished span as one JSON object per line.
+
+    Parameters
+    ----------
+    file : Union[str, IO[str]]
+        A path, opened in append mode, or an open text file.
+    """
+
+    def __init__(self, file: Union[str, IO[str]]):
+        self._owned = isinstance(file, str)
+        self._file = open(file, "a", encoding="utf-8") if self._owned else file
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        line = json.dumps(span.to_dict(), default=repr)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        """
+        Flushes the file, and closes it if the exporter opened it.
+        """
+        with self._lock:
+            self._file.flush()
+            if self._owned:
+                self._file.close()
+
+
+class OpenTelemetryExporter:
+    """
+    Mirrors the spans into OpenTelemetry, preserving their nesting.
+
+    Requires the `opentelemetry-api` package; configure the SDK and its exporters
+    as usual.
+
+    Parameters
+    ----------
+    tracer : opentelemetry.trace.Tracer, optional
+        The OpenTelemetry tracer to use, by default one named "agentic_workflow"
+        from the global tracer provider.
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryExporter requires the 'opentelemetry-api' package: "
+                "install agentic_workflow[otel]"
+            ) from e
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("agentic_workflow")
+        self._spans = {}
+
+    def on_start(self, span: Span):
+        parent = self._spans.get(span.parent_id)
+        context = (
+            self._trace.set_span_in_context(parent) if parent is not None else None
+        )
+        self._spans[span.span_id] = self._tracer.start_span(
+            span.name,
+            context=context,
+            start_time=span.start_time,
+            attributes=_otel_attributes(span.attributes),
+        )
+
+    def on_end(self, span: Span):
+        otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(_otel_attributes(span.attributes))
+        if span.error is not None:
+            otel_span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, span.error)
+            )
+        otel_span.end(end_time=span.end_time)
+
+
+def _otel_attributes(attributes: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Keeps the attribute values OpenTelemetry accepts, stringifying the others.
+    """
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
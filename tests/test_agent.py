@@ -0,0 +1,156 @@
+import asyncio
+import re
+import threading
+
+import pytest
+from scripted_client import AsyncScriptedClient, ScriptedClient
+
+from agentic.agent import (
+    REFLECTION_PROMPT,
+    AsyncReflectionAgent,
+    ReflectionAgent,
+    critique_change,
+    parse_critique,
+    render_candidates,
+)
+
+
+def critique(round, best=0, done=False, words=None):
+    """A critique whose words are new at every round, unless `words` is given."""
+    words = words or " ".join(f"issue{round}_{i}" for i in range(8))
+    blocks = [f'<critique id="{i}">{words} for {i}</critique>' for i in range(3)]
+    return "\n".join(blocks + [f"<best>{best}</best>", "<DONE>" if done else ""])
+
+
+def reflection_script(done_at=None, same_critique=False, fail=None):
+    """
+    Drafts are "draft <round>"; the critic accepts candidate 1 at round `done_at`.
+    `fail(round)` tells whether a generator request fails.
+    """
+    lock = threading.Lock()
+    requests = []
+
+    def script(messages):
+        if messages[0]["content"] == REFLECTION_PROMPT:
+            round = int(re.search(r"draft (\d+)", messages[1]["content"]).group(1))
+            words = "same words every round" if same_critique else None
+            return critique(round, best=1, done=round == done_at, words=words)
+        round = sum(1 for m in messages if m["role"] == "assistant") + 1
+        with lock:
+            requests.append(round)
+            count = requests.count(round)
+        if fail is not None and fail(round, count):
+            raise ConnectionError(f"generator {count} of round {round} failed")
+        return f"draft {round}"
+
+    return script
+
+
+def test_parse_critique():
+    critiques, best, done = parse_critique(critique(1, best=2, done=True), 3)
+    assert critiques[2].endswith("for 2") and best == 2 and done
+    # Missing blocks fall back to the whole response; a bad <best> to the first.
+    content = '<critique id="1">only one</critique><best>7</best>'
+    critiques, best, done = parse_critique(content, 3)
+    assert critiques == [content, "only one", content]
+    assert (best, done) == (0, False)
+    assert '<candidate id="1">\nb\n</candidate>' in render_candidates("q", ["a", "b"])
+
+
+def test_critique_change():
+    assert critique_change("a b c", "a b c") == 0
+    assert critique_change("a b", "c d") == 1
+
+
+def test_stops_when_the_critic_is_done():
+    client = ScriptedClient(reflection_script(done_at=2))
+    agent = ReflectionAgent(client=client, model="scripted", candidates=3)
+    result = agent.run("Write f.")
+    assert (result.status, result.rounds, result.best) == ("done", 2, 1)
+    assert result.content == "draft 2" and result.drafts == ["draft 2"] * 3
+    assert client.requests == 2 * (3 + 1)
+    # Each candidate revised its draft with its own critique.
+    roles = [m["role"] for m in result.sessions[2].messages]
+    assert roles == ["system", "user", "assistant", "user", "assistant"]
+    assert result.sessions[2].messages[3]["content"].endswith("for 2")
+    assert agent.start("Write f.") == "draft 2"
+
+
+def test_stops_at_the_iteration_cap():
+    client = ScriptedClient(reflection_script())
+    agent = ReflectionAgent(client=client, model="scripted", candidates=2, max_iter=3)
+    result = agent.run("Write f.")
+    assert (result.status, result.rounds, result.content) == ("max_iter", 3, "draft 3")
+    assert client.requests == 3 * (2 + 1)
+    # The last critique is not handed back to the candidates.
+    assert result.sessions[0].messages[-1] == {
+        "role": "assistant",
+        "content": "draft 3",
+    }
+
+
+def test_stops_when_the_critique_converges():
+    client = ScriptedClient(reflection_script(same_critique=True))
+    agent = ReflectionAgent(client=client, model="scripted", max_iter=5)
+    result = agent.run("Write f.")
+    assert (result.status, result.rounds) == ("converged", 2)
+    agent = ReflectionAgent(client=client, model="scripted", max_iter=3, min_change=0)
+    assert agent.run("Write f.").status == "max_iter"
+
+
+def test_failed_candidates_are_dropped():
+    script = reflection_script(done_at=2, fail=lambda round, count: count == 1)
+    agent = ReflectionAgent(client=ScriptedClient(script), model="scripted")
+    result = agent.run("Write f.")
+    assert result.status == "done"
+    assert len(result.sessions) == len(result.drafts) == 1
+    # The best draft is picked among the survivors.
+    assert result.best == 0 and result.content == "draft 2"
+
+
+def test_fails_when_every_candidate_fails():
+    script = reflection_script(fail=lambda round, count: round == 2)
+    agent = ReflectionAgent(client=ScriptedClient(script), model="scripted")
+    with pytest.raises(ConnectionError):
+        agent.run("Write f.")
+
+
+@pytest.mark.parametrize("options", [{"candidates": 0}, {"max_iter": 0}])
+def test_rejects_invalid_limits(options):
+    with pytest.raises(ValueError):
+        ReflectionAgent(client=ScriptedClient([""]), model="scripted", **options)
+
+
+def test_async_stops_when_the_critic_is_done():
+    client = AsyncScriptedClient(reflection_script(done_at=3))
+    agent = AsyncReflectionAgent(client=client, model="scripted", candidates=3)
+    result = asyncio.run(agent.run("Write f."))
+    assert (result.status, result.rounds, result.best) == ("done", 3, 1)
+    assert result.content == "draft 3"
+    assert client.requests == 3 * (3 + 1)
+
+
+def test_async_stops_at_the_iteration_cap():
+    client = AsyncScriptedClient(reflection_script())
+    agent = AsyncReflectionAgent(client=client, model="scripted", max_iter=2)
+    result = asyncio.run(agent.run("Write f."))
+    assert (result.status, result.rounds) == ("max_iter", 2)
+    assert asyncio.run(agent.start("Write f.")) == "draft 2"
+
+
+def test_async_drops_failed_candidates():
+    script = reflection_script(done_at=1, fail=lambda round, count: count > 1)
+    agent = AsyncReflectionAgent(client=AsyncScriptedClient(script), model="scripted")
+    result = asyncio.run(agent.run("Write f."))
+    assert (result.status, len(result.drafts)) == ("done", 1)
+
+
+def test_async_start_many():
+    agent = AsyncReflectionAgent(
+        client=AsyncScriptedClient(reflection_script(done_at=1)), model="scripted"
+    )
+    results = asyncio.run(agent.start_many(["a", "b"]))
+    assert [(r.message, r.response) for r in results] == [
+        ("a", "draft 1"),
+        ("b", "draft 1"),
+    ]
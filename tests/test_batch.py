@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from scripted_client import AsyncScriptedClient, ScriptedClient
+
+from agentic.batch import aiter_batch, iter_batch
+from agentic.budget import Budget
+from agentic.planning import AsyncPlanningAgent, PlanningAgent
+from agentic.tool import ToolAgent
+
+
+def echo(message):
+    # Later messages finish first.
+    time.sleep(0.01 * (5 - int(message)))
+    if message == "3":
+        raise ValueError("three")
+    return message * 2
+
+
+def test_iter_batch_isolates_errors():
+    results = list(iter_batch(echo, [str(i) for i in range(5)], max_concurrency=5))
+    assert [r.index for r in results] != [0, 1, 2, 3, 4]
+    by_index = sorted(results, key=lambda r: r.index)
+    assert [r.response for r in by_index] == ["00", "11", "22", None, "44"]
+    assert [r.ok for r in by_index] == [True, True, True, False, True]
+    assert str(by_index[3].error) == "three"
+    assert by_index[3].message == "3"
+
+
+def test_iter_batch_bounds_concurrency():
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    taken = []
+
+    def serve(message):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return message
+
+    def messages():
+        for i in range(10):
+            taken.append(i)
+            yield i
+
+    batch = iter_batch(serve, messages(), max_concurrency=3)
+    next(batch)
+    # Messages are taken lazily, as slots free up.
+    assert len(taken) <= 4
+    assert len(list(batch)) == 9
+    assert peak[0] == 3
+    with pytest.raises(ValueError):
+        next(iter_batch(serve, [], max_concurrency=0))
+
+
+def test_aiter_batch_cancels_pending_items_when_stopped():
+    cancelled = []
+
+    async def serve(message):
+        try:
+            await asyncio.sleep(0 if message == 0 else 5)
+        except asyncio.CancelledError:
+            cancelled.append(message)
+            raise
+        return message
+
+    async def main():
+        batch = aiter_batch(serve, range(3), max_concurrency=3)
+        async for result in batch:
+            break
+        await batch.aclose()
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()).response == 0
+    assert sorted(cancelled) == [1, 2]
+
+
+def answer(messages):
+    question = messages[1]["content"]
+    if "fail" in question:
+        raise ConnectionError("backend down")
+    if "loop" in question:
+        return '<tool_call>{"name": "add", "arguments": {"a": 1, "b": 1}}</tool_call>'
+    return f"<response>{question}</response>"
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+QUESTIONS = ["one", "fail", "loop", "four"]
+
+
+def check(results):
+    assert [r.message for r in results] == QUESTIONS
+    one, failed, looped, four = results
+    assert one.response.status == "completed"
+    assert "<question>one</question>" in one.response.content
+    assert isinstance(failed.error, ConnectionError) and failed.response is None
+    assert looped.response.status == "max_iter"
+    assert looped.response.iterations == 2
+    assert four.response.completed
+
+
+def test_start_many_returns_run_results_in_order():
+    agent = PlanningAgent(
+        client=ScriptedClient(answer),
+        model="scripted",
+        toolkit=[add],
+        budget=Budget(max_iter=2),
+    )
+    check(agent.start_many(QUESTIONS, max_concurrency=2))
+
+
+def test_async_start_many_returns_run_results_in_order():
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient(answer),
+        model="scripted",
+        toolkit=[add],
+        budget=Budget(max_iter=2),
+    )
+    check(asyncio.run(agent.start_many(QUESTIONS, max_concurrency=2)))
+
+
+def test_tool_agent_batches_return_responses():
+    agent = ToolAgent(
+        client=ScriptedClient(lambda messages: messages[-1]["content"].upper()),
+        model="scripted",
+        toolkit=[add],
+    )
+    results = agent.start_many(["a", "b", "c"])
+    assert [r.response for r in results] == ["A", "B", "C"]
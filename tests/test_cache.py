@@ -0,0 +1,190 @@
+import asyncio
+
+import pytest
+
+from agentic.cache import (
+    AsyncCachingClient,
+    CacheMissError,
+    CachingClient,
+    ChatCache,
+    request_key,
+)
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def chunks(*parts, done=True):
+    received = [
+        {"model": "m", "message": {"role": "assistant", "content": part}, "done": False}
+        for part in parts
+    ]
+    if done:
+        received.append(
+            {
+                "model": "m",
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+            }
+        )
+    return received
+
+
+class StubClient:
+    """Answers every request with the same response, counting the calls."""
+
+    def __init__(self, streamed=None, fail_after=None):
+        self.streamed = streamed or chunks("Hel", "lo")
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def chat(self, model="", messages=None, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self._stream()
+        return {"model": model, "message": {"role": "assistant", "content": "Hello"}}
+
+    def _stream(self):
+        for i, chunk in enumerate(self.streamed):
+            if i == self.fail_after:
+                raise ConnectionError("lost")
+            yield chunk
+
+    def list(self):
+        return ["m"]
+
+
+class AsyncStubClient(StubClient):
+    async def chat(self, model="", messages=None, stream=False, **kwargs):
+        response = super().chat(model, messages, stream=False, **kwargs)
+        return self._astream() if stream else response
+
+    async def _astream(self):
+        for chunk in self.streamed:
+            yield chunk
+
+
+@pytest.fixture
+def cache():
+    cache = ChatCache(":memory:")
+    yield cache
+    cache.close()
+
+
+def test_request_key_ignores_unrelated_arguments():
+    key = request_key(model="m", messages=MESSAGES)
+    assert key == request_key(model="m", messages=MESSAGES, keep_alive=5)
+    assert key != request_key(model="m", messages=MESSAGES, options={"seed": 1})
+    assert key != request_key(model="m", messages=MESSAGES, stream=True)
+
+
+def test_unknown_mode(cache):
+    with pytest.raises(ValueError):
+        CachingClient(StubClient(), cache, mode="write_only")
+
+
+def test_read_write(cache):
+    backend = StubClient()
+    client = CachingClient(backend, cache)
+    first = client.chat(model="m", messages=MESSAGES)
+    second = client.chat(model="m", messages=MESSAGES)
+    assert first == second
+    assert backend.calls == 1
+    assert (client.hits, client.misses) == (1, 1)
+    assert client.list() == ["m"]
+
+
+def test_read_only_never_stores(cache):
+    backend = StubClient()
+    client = CachingClient(backend, cache, mode="read_only")
+    client.chat(model="m", messages=MESSAGES)
+    client.chat(model="m", messages=MESSAGES)
+    assert backend.calls == 2
+    assert len(cache) == 0
+
+
+def test_record_then_replay(cache):
+    recorder = CachingClient(StubClient(), cache, mode="record")
+    recorder.chat(model="m", messages=MESSAGES)
+    recorder.chat(model="m", messages=MESSAGES)
+    assert (recorder.client.calls, recorder.hits) == (2, 0)
+
+    replay = CachingClient(None, cache, mode="replay")
+    assert replay.chat(model="m", messages=MESSAGES)["message"]["content"] == "Hello"
+    with pytest.raises(CacheMissError):
+        replay.chat(model="m", messages=[{"role": "user", "content": "Bye"}])
+
+
+def test_streams_are_joined(cache):
+    streamed = chunks("Hel", "lo")
+    streamed[0]["message"]["thinking"] = "greet"
+    streamed[1]["message"]["tool_calls"] = [
+        {"function": {"name": "wave", "arguments": {}}}
+    ]
+    client = CachingClient(StubClient(streamed), cache)
+    assert list(client.chat(model="m", messages=MESSAGES, stream=True)) == streamed
+
+    (record,) = client.chat(model="m", messages=MESSAGES, stream=True)
+    assert record["done"]
+    assert record["message"] == {
+        "role": "assistant",
+        "content": "Hello",
+        "thinking": "greet",
+        "tool_calls": [{"function": {"name": "wave", "arguments": {}}}],
+    }
+    assert client.hits == 1
+
+
+@pytest.mark.parametrize("mode, stored", [("read_write", 0), ("record", 1)])
+def test_streams_closed_early(cache, mode, stored):
+    client = CachingClient(StubClient(), cache, mode=mode)
+    stream = client.chat(model="m", messages=MESSAGES, stream=True)
+    next(stream)
+    stream.close()
+    assert len(cache) == stored
+
+
+@pytest.mark.parametrize("mode, stored", [("read_write", 0), ("record", 1)])
+def test_streams_that_fail(cache, mode, stored):
+    client = CachingClient(StubClient(fail_after=1), cache, mode=mode)
+    with pytest.raises(ConnectionError):
+        list(client.chat(model="m", messages=MESSAGES, stream=True))
+    assert len(cache) == stored
+
+
+def test_async_client(cache):
+    backend = AsyncStubClient()
+    client = AsyncCachingClient(backend, cache)
+
+    async def main():
+        first = [c async for c in await client.chat("m", MESSAGES, stream=True)]
+        second = [c async for c in await client.chat("m", MESSAGES, stream=True)]
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(first) == 3
+    assert second[0]["message"]["content"] == "Hello"
+    assert backend.calls == 1
+
+
+def test_least_recently_read_entries_are_evicted():
+    cache = ChatCache(":memory:", max_bytes=300)
+    for i in range(4):
+        cache.put(str(i), {"content": "x" * 50})
+    cache.get("0")
+    for i in range(4, 6):
+        cache.put(str(i), {"content": "x" * 50})
+    assert len(cache) == 4
+    assert cache.get("0") is not None
+    assert cache.get("1") is None and cache.get("2") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ChatCache(path)
+    cache.put("key", {"content": "Hello"})
+    cache.close()
+    reopened = ChatCache(path)
+    assert reopened.get("key") == {"content": "Hello"}
+    reopened.close()
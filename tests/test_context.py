@@ -0,0 +1,170 @@
+import pytest
+from scripted_client import ScriptedClient
+
+from agentic import session as session_module
+from agentic.context import ContextWindow, summarize_turns
+from agentic.planning import PlanningAgent
+from agentic.session import Session
+
+SYSTEM = {"role": "system", "content": "sys"}
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def turn(i, result="x" * 40):
+    return [
+        {
+            "role": "assistant",
+            "content": (
+                f"<thought>step {i}</thought><tool_call>"
+                f'{{"name": "f", "arguments": {{"i": {i}}}, "id": 0}}</tool_call>'
+            ),
+        },
+        {"role": "tool", "content": f"<tool_response>{result}</tool_response>"},
+    ]
+
+
+def history(question, turns, start=0):
+    messages = [user(question)]
+    for i in range(start, start + turns):
+        messages += turn(i)
+    return messages
+
+
+def contents(messages):
+    return [m["content"] for m in messages]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ContextWindow(100, policy="forget")
+
+
+def test_histories_under_budget_are_unchanged():
+    messages = [SYSTEM] + history("Q1", 2)
+    fitted, report = ContextWindow(10_000, count_tokens=len).fit(messages, step=3)
+    assert fitted is messages
+    assert (report.step, report.saved, report.dropped_turns) == (3, 0, 0)
+
+
+def test_sliding_window_drops_the_oldest_turns():
+    messages = [SYSTEM] + history("Q1", 6)
+    window = ContextWindow(400, count_tokens=len)
+    fitted, report = window.fit(messages)
+    assert fitted[:2] == messages[:2]
+    assert fitted[-2:] == messages[-2:]
+    assert report.dropped_turns > 0
+    assert fitted[2:] == messages[2 + 2 * report.dropped_turns :]
+    assert report.tokens_after <= 400 < report.tokens_before
+
+
+def test_the_latest_turn_is_kept_over_budget():
+    messages = [SYSTEM] + history("Q1", 3)
+    fitted, report = ContextWindow(1, count_tokens=len).fit(messages)
+    assert fitted == messages[:2] + messages[-2:]
+    assert report.dropped_turns == 2
+
+
+def test_truncate_shortens_tool_responses_first():
+    messages = [SYSTEM, user("Q1")] + turn(0, "y" * 1000) + turn(1, "z" * 1000)
+    window = ContextWindow(
+        700, policy="truncate", max_tool_tokens=100, count_tokens=len
+    )
+    fitted, report = window.fit(messages)
+    assert report.dropped_turns == 0
+    assert len(fitted) == len(messages)
+    assert "[truncated" in fitted[3]["content"]
+    assert fitted[2] == messages[2]
+
+
+def test_summarize_replaces_the_dropped_turns():
+    messages = [SYSTEM] + history("Q1", 5)
+    window = ContextWindow(500, policy="summarize", count_tokens=len)
+    fitted, report = window.fit(messages)
+    summary = fitted[1]
+    assert summary["role"] == "system"
+    assert summary["content"].startswith("Summary of earlier steps:")
+    assert "- step 0 f({'i': 0}) -> " + "x" * 40 in summary["content"]
+    assert fitted[2] == user("Q1")
+    assert fitted[-2:] == messages[-2:]
+    assert report.dropped_turns == summary["content"].count("\n- ")
+
+
+def test_the_latest_question_is_pinned_in_a_reused_session():
+    first = history("Q1", 3)
+    messages = [SYSTEM] + first + [{"role": "assistant", "content": "A1"}]
+    messages += history("Q2", 3, start=3)
+    window = ContextWindow(400, policy="summarize", count_tokens=len)
+    fitted, report = window.fit(messages)
+    question = fitted.index(user("Q2"))
+    assert fitted[0] == SYSTEM
+    assert fitted[-2:] == messages[-2:]
+    assert all(m["role"] != "user" for m in fitted[question + 1 :])
+    assert "Earlier question: Q1" in fitted[1]["content"]
+    assert user("Q1") not in fitted
+
+
+def test_a_fresh_question_keeps_no_earlier_turn():
+    messages = [SYSTEM] + history("Q1", 3) + [user("Q2")]
+    fitted, report = ContextWindow(1, count_tokens=len).fit(messages)
+    assert fitted == [SYSTEM, user("Q2")]
+    assert report.dropped_turns == 4
+
+
+def test_summarize_turns():
+    assert summarize_turns([[user("What is 2+2?")], turn(0, "4")]) == (
+        "- Earlier question: What is 2+2?\n- step 0 f({'i': 0}) -> 4"
+    )
+
+
+def test_session_trimming_keeps_the_question():
+    session = Session(SYSTEM, max_messages=4)
+    session.extend(history("Q1", 1))
+    assert contents(session.messages)[:2] == ["sys", "Q1"]
+    session.extend(turn(1) + turn(2))
+    assert len(session) == 4
+    assert session.messages[:2] == [SYSTEM, user("Q1")]
+    assert session.messages[2:] == turn(2)
+    session.append(user("Q2"))
+    assert session.messages[-1] == user("Q2")
+    session.extend(turn(3))
+    assert session.messages == [SYSTEM, user("Q2")] + turn(3)
+
+
+def test_session_limits():
+    with pytest.raises(ValueError):
+        Session(SYSTEM, max_messages=2)
+    with Session(SYSTEM) as session:
+        session.append(user("Q1"))
+        session.reset()
+        assert session.messages == [SYSTEM]
+    with pytest.raises(RuntimeError):
+        session.messages
+
+
+def test_sessions_keep_the_latest_context_reports(monkeypatch):
+    monkeypatch.setattr(session_module, "MAX_CONTEXT_REPORTS", 3)
+
+    def f(i: int) -> int:
+        """Returns its argument."""
+        return i
+
+    step = turn(0)[0]["content"]
+    agent = PlanningAgent(
+        client=ScriptedClient([step] * 5 + ["<response>done</response>"]),
+        model="scripted",
+        toolkit=[f],
+        context=ContextWindow(10_000),
+    )
+    session = agent.session()
+    for question in ("Q1", "Q2"):
+        agent.run(question, session=session)
+    # Six steps answer Q1 and one answers Q2: only the last three reports are kept.
+    assert [report.step for report in session.context_reports] == [4, 5, 0]
+    session.reset()
+    assert len(session.context_reports) == 0
+    session.context_reports.append(object())
+    session.close()
+    assert len(session.context_reports) == 0
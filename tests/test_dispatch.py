@@ -0,0 +1,454 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import pytest
+from scripted_client import AsyncScriptedClient, ScriptedClient
+
+from agentic.budget import Budget
+from agentic.planning import AsyncPlanningAgent, PlanningAgent
+from agentic.tool import ToolAgent
+from tool import (
+    ProcessPool,
+    ToolCall,
+    ToolDispatcher,
+    ToolKit,
+    ToolTimeoutError,
+    UnknownToolError,
+)
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+def fail(x: int) -> int:
+    """Always fails."""
+    raise RuntimeError("tool failed")
+
+
+def spin(seconds: float) -> float:
+    """Keeps a worker process busy."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+    return seconds
+
+
+def call(name, arguments, id):
+    return ToolCall(name=name, arguments=arguments, id=id)
+
+
+def test_sequential_dispatch_runs_inline():
+    dispatcher = ToolDispatcher(ToolKit(tools=[add]))
+    scheduled = dispatcher.dispatch([call("add", {"a": 1, "b": 2}, 0)])
+    assert [(c.id, f.done(), f.result()) for c, f in scheduled] == [(0, True, 3)]
+    assert dispatcher._executor is None
+
+
+def test_dispatch_orders_results_by_id():
+    dispatcher = ToolDispatcher(ToolKit(tools=[add]), max_workers=4)
+    calls = [call("add", {"a": i, "b": 0}, i) for i in (3, 1, 2, 0)]
+    scheduled = dispatcher.dispatch(calls)
+    assert [c.id for c, _ in scheduled] == [0, 1, 2, 3]
+    assert [f.result() for _, f in scheduled] == [0, 1, 2, 3]
+    dispatcher.shutdown()
+
+
+def test_calls_of_a_turn_overlap():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_others(x: int) -> int:
+        """Returns once three calls run at the same time."""
+        barrier.wait()
+        return x
+
+    dispatcher = ToolDispatcher(ToolKit(tools=[wait_for_others]), max_workers=3)
+    scheduled = dispatcher.dispatch(
+        [call("wait_for_others", {"x": i}, i) for i in range(3)]
+    )
+    assert [f.result(timeout=5) for _, f in scheduled] == [0, 1, 2]
+    dispatcher.shutdown()
+
+
+def test_errors_are_held_by_their_future():
+    dispatcher = ToolDispatcher(ToolKit(tools=[add, fail]), max_workers=2)
+    scheduled = dispatcher.dispatch(
+        [
+            call("fail", {"x": 1}, 0),
+            call("add", {"a": 1, "b": 1}, 1),
+            call("missing", {}, 2),
+        ]
+    )
+    futures = [f for _, f in scheduled]
+    with pytest.raises(RuntimeError):
+        futures[0].result()
+    assert futures[1].result() == 2
+    with pytest.raises(UnknownToolError):
+        futures[2].result()
+    dispatcher.shutdown()
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_unknown_tools_are_named(max_workers):
+    dispatcher = ToolDispatcher(ToolKit(tools=[add, fail]), max_workers=max_workers)
+    ((_, future),) = dispatcher.dispatch([call("multiply", {"a": 1, "b": 2}, 3)])
+    message = "call 3 requests the unknown tool 'multiply'; the registered tools are: add, fail"
+    with pytest.raises(UnknownToolError, match=message):
+        future.result(timeout=5)
+
+    async def main():
+        ((_, future),) = dispatcher.adispatch([call("multiply", {}, 0)])
+        return await asyncio.gather(future, return_exceptions=True)
+
+    (error,) = asyncio.run(main())
+    assert isinstance(error, UnknownToolError)
+    dispatcher.shutdown()
+
+
+def test_unknown_tools_are_reported_to_the_model():
+    turn = '<tool_call>{"name": "multiply", "arguments": {"a": 2}, "id": 0}</tool_call>'
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient([turn, "<response>done</response>"]),
+        model="scripted",
+        toolkit=[add],
+    )
+    result = asyncio.run(agent.run("Multiply."))
+    (error,) = tool_messages(result.session)
+    assert (
+        "Error: UnknownToolError: call 0 requests the unknown tool 'multiply'" in error
+    )
+    assert "registered tools are: add" in error
+
+
+def test_adispatch_runs_on_the_event_loop():
+    async def slow_add(a: int, b: int) -> int:
+        """Adds two numbers, slowly."""
+        await asyncio.sleep(0.05)
+        return a + b
+
+    dispatcher = ToolDispatcher(ToolKit(tools=[slow_add]))
+
+    async def main():
+        scheduled = dispatcher.adispatch(
+            [call("slow_add", {"a": i, "b": 1}, i) for i in range(10)]
+        )
+        return await asyncio.gather(*(f for _, f in scheduled))
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == list(range(1, 11))
+    assert time.perf_counter() - start < 0.4
+
+
+def test_timed_out_calls_do_not_hold_the_pool():
+    release = threading.Event()
+    threads = []
+
+    def hang(x: int) -> int:
+        """Blocks until released."""
+        threads.append(threading.current_thread())
+        release.wait(5)
+        return x
+
+    toolkit = ToolKit(tools=[add])
+    toolkit.register(hang, timeout=0.1)
+    dispatcher = ToolDispatcher(toolkit, max_workers=1)
+    start = time.perf_counter()
+    scheduled = dispatcher.dispatch(
+        [call("hang", {"x": 1}, 0), call("add", {"a": 1, "b": 1}, 1)]
+    )
+    with pytest.raises(ToolTimeoutError):
+        scheduled[0][1].result(timeout=5)
+    assert time.perf_counter() - start < 1
+    assert scheduled[1][1].result(timeout=5) == 2
+    assert threads[0].daemon
+    release.set()
+    dispatcher.shutdown()
+
+
+def test_timed_out_coroutines_are_cancelled():
+    cancelled = []
+
+    async def hang(x: int) -> int:
+        """Sleeps until cancelled."""
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(x)
+            raise
+        return x
+
+    toolkit = ToolKit(tools=[])
+    toolkit.register(hang, timeout=0.1)
+    dispatcher = ToolDispatcher(toolkit)
+
+    async def main():
+        ((_, future),) = dispatcher.adispatch([call("hang", {"x": 1}, 0)])
+        with pytest.raises(ToolTimeoutError):
+            await future
+
+    asyncio.run(main())
+    assert cancelled == [1]
+
+
+def test_timed_out_process_calls_are_terminated():
+    pool = ProcessPool(max_workers=1)
+    toolkit = ToolKit(tools=[], process_pool=pool)
+    toolkit.register(spin, process=True, timeout=0.5)
+    dispatcher = ToolDispatcher(toolkit)
+    ((_, done),) = dispatcher.dispatch([call("spin", {"seconds": 0.01}, 0)])
+    assert done.result(timeout=10) == 0.01
+
+    ((_, future),) = dispatcher.dispatch([call("spin", {"seconds": 30}, 1)])
+    with pytest.raises(ToolTimeoutError):
+        future.result(timeout=10)
+    deadline = time.monotonic() + 5
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert multiprocessing.active_children() == []
+    pool.shutdown()
+
+
+TURN = (
+    "<tool_calls>\n"
+    '{"name": "add", "arguments": {"a": "not a number", "b": 1}, "id": 0}\n'
+    '{"name": "fail", "arguments": {"x": 1}, "id": 1}\n'
+    '{"name": "add", "arguments": {"a": 1, "b": 2}, "id": 2}\n'
+    "</tool_calls>"
+)
+SCRIPT = [TURN, "<response>done</response>"]
+
+
+def tool_messages(session):
+    return [m["content"] for m in session.messages if m["role"] == "tool"]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_failed_calls_are_reported_to_the_model(stream):
+    agent = PlanningAgent(
+        client=ScriptedClient(SCRIPT),
+        model="scripted",
+        toolkit=[add, fail],
+        max_workers=3,
+        stream=stream,
+    )
+    result = agent.run("Add.")
+    assert result.completed
+    invalid, failed, ok = tool_messages(result.session)
+    assert "ValidationError" in invalid
+    assert "RuntimeError: tool failed" in failed
+    assert ok == "<tool_response>3</tool_response>"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_failed_calls_are_reported_to_the_model_async(stream):
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient(SCRIPT),
+        model="scripted",
+        toolkit=[add, fail],
+        stream=stream,
+    )
+    result = asyncio.run(agent.run("Add."))
+    assert result.completed
+    assert len(tool_messages(result.session)) == 3
+
+
+BROKEN = (
+    "<tool_call>{'name': 'add', 'arguments': {</tool_call>\n"
+    '<tool_call>{"arguments": {"a": 1, "b": 2}}</tool_call>'
+)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_unreadable_calls_are_reported_to_the_model(stream, capsys):
+    agent = PlanningAgent(
+        client=ScriptedClient([BROKEN, "<response>done</response>"]),
+        model="scripted",
+        toolkit=[add],
+        stream=stream,
+    )
+    result = agent.run("Add.")
+    assert result.completed
+    undecodable, invalid = tool_messages(result.session)
+    assert undecodable.startswith("<tool_response>Error: invalid tool call ")
+    assert "Expecting property name" in undecodable
+    assert "invalid tool call {'arguments'" in invalid and "name" in invalid
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_rejected_native_calls_are_reported_to_the_model(stream):
+    rejected = {"content": "", "tool_calls": [{"function": {"arguments": {}}}]}
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient([rejected, "The answer is 3."]),
+        model="scripted",
+        toolkit=[add],
+        stream=stream,
+        tool_mode="native",
+    )
+    result = asyncio.run(agent.run("Add."))
+    assert result.completed and result.content == "The answer is 3."
+    (error,) = tool_messages(result.session)
+    assert error.startswith("Error: invalid tool call {'function'")
+    assert "KeyError" in error
+
+
+def test_tool_agents_report_unreadable_calls():
+    def script(messages):
+        return "Sorry." if messages[-1]["role"] == "tool" else BROKEN
+
+    agent = ToolAgent(client=ScriptedClient(script), model="scripted", toolkit=[add])
+    session = agent.session()
+    assert agent.start("Add.", session=session) == "Sorry."
+    errors = tool_messages(session)
+    assert len(errors) == 2
+    assert all(error.startswith("Error: invalid tool call ") for error in errors)
+
+
+class StalledClient:
+    """Streams a tool call, then stalls until the request is cancelled."""
+
+    def __init__(self, turn):
+        self.turn = turn
+
+    async def chat(self, model="", messages=None, stream=False, **_):
+        async def chunks():
+            yield {"message": {"role": "assistant", "content": self.turn}}
+            await asyncio.sleep(30)
+
+        return chunks()
+
+
+def test_a_step_timeout_cancels_the_scheduled_calls():
+    cancelled = []
+
+    async def hang(x: int) -> int:
+        """Sleeps until cancelled."""
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(x)
+            raise
+        return x
+
+    turn = '<tool_call>{"name": "hang", "arguments": {"x": 1}, "id": 0}</tool_call>'
+    agent = AsyncPlanningAgent(
+        client=StalledClient(turn),
+        model="scripted",
+        toolkit=[hang],
+        stream=True,
+        budget=Budget(timeout=0.2),
+    )
+
+    async def main():
+        result = await agent.run("Hang.")
+        # Nothing is left running once the run returns.
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return result, others
+
+    start = time.perf_counter()
+    result, others = asyncio.run(main())
+    assert result.status == "timeout"
+    assert time.perf_counter() - start < 2
+    assert cancelled == [1] and others == []
+
+
+def test_calls_pending_at_the_deadline_are_cancelled():
+    cancelled = []
+
+    async def hang(x: int) -> int:
+        """Sleeps until cancelled."""
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(x)
+            raise
+        return x
+
+    turn = '<tool_call>{"name": "hang", "arguments": {"x": 2}, "id": 0}</tool_call>'
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient([turn]),
+        model="scripted",
+        toolkit=[hang],
+        budget=Budget(timeout=0.2),
+    )
+
+    async def main():
+        result = await agent.run("Hang.")
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return result, list(cancelled)
+
+    result, cancelled_in_run = asyncio.run(main())
+    assert result.status == "timeout"
+    assert cancelled_in_run == [2]
+
+
+def test_abandoned_threads_are_capped():
+    release = threading.Event()
+
+    def hang(x: int) -> int:
+        """Blocks until released."""
+        release.wait(5)
+        return x
+
+    toolkit = ToolKit(tools=[add])
+    toolkit.register(hang, timeout=0.05)
+    dispatcher = ToolDispatcher(toolkit, max_abandoned_threads=2)
+    scheduled = dispatcher.dispatch([call("hang", {"x": i}, i) for i in range(2)])
+    for _, future in scheduled:
+        with pytest.raises(ToolTimeoutError, match="timed out"):
+            future.result(timeout=5)
+    assert dispatcher.abandoned_threads == 2
+
+    # New timed calls are refused without starting a thread, untimed ones still run.
+    threads = threading.active_count()
+    refused, done = dispatcher.dispatch(
+        [call("hang", {"x": 3}, 3), call("add", {"a": 1, "b": 1}, 4)]
+    )
+    with pytest.raises(ToolTimeoutError, match="2 timed-out calls are still running"):
+        refused[1].result(timeout=5)
+    assert done[1].result(timeout=5) == 2
+    assert threading.active_count() <= threads
+
+    async def main():
+        ((_, future),) = dispatcher.adispatch([call("hang", {"x": 5}, 5)])
+        return await asyncio.gather(future, return_exceptions=True)
+
+    (error,) = asyncio.run(main())
+    assert "was not started" in str(error)
+
+    # Threads are reclaimed as their calls return.
+    release.set()
+    deadline = time.monotonic() + 5
+    while dispatcher.abandoned_threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dispatcher.abandoned_threads == 0
+    ((_, future),) = dispatcher.dispatch([call("hang", {"x": 6}, 6)])
+    assert future.result(timeout=5) == 6
+
+
+def test_async_timeouts_count_abandoned_threads():
+    release = threading.Event()
+
+    def hang(x: int) -> int:
+        """Blocks until released."""
+        release.wait(5)
+        return x
+
+    toolkit = ToolKit(tools=[])
+    toolkit.register(hang, timeout=0.05)
+    dispatcher = ToolDispatcher(toolkit, max_abandoned_threads=1)
+
+    async def main():
+        ((_, future),) = dispatcher.adispatch([call("hang", {"x": 1}, 0)])
+        return await asyncio.gather(future, return_exceptions=True)
+
+    (error,) = asyncio.run(main())
+    assert isinstance(error, ToolTimeoutError) and "timed out" in str(error)
+    assert dispatcher.abandoned_threads == 1
+    (error,) = asyncio.run(main())
+    assert "was not started" in str(error)
+    release.set()
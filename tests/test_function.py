@@ -0,0 +1,146 @@
+import asyncio
+import inspect
+import sys
+import typing
+from typing import Any, Dict, List, Literal, Optional, TypeVar, Union
+
+import pytest
+
+from tool import Function, _base
+from tool._base import compile_type_check
+
+T = TypeVar("T")
+
+RECENT = []
+if sys.version_info >= (3, 10):
+    RECENT = [
+        (int | None, [1, None], ["a"]),
+        (typing.Annotated[int, "meta"], [1], ["1"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "annotation, accepted, rejected",
+    [
+        (int, [1, True], ["1", 1.0]),
+        (float, [1.0], [1]),
+        (None, [None], [0]),
+        (Optional[str], ["a", None], [1]),
+        (Union[int, str], [1, "a"], [1.0]),
+        (List[int], [[1], ["not checked"]], [(1,)]),
+        (Dict[str, int], [{}], [[]]),
+        (Literal["a", "b"], ["a"], ["c"]),
+        *RECENT,
+    ],
+)
+def test_compile_type_check(annotation, accepted, rejected):
+    check = compile_type_check(annotation)
+    assert all(check(value) for value in accepted)
+    assert not any(check(value) for value in rejected)
+
+
+@pytest.mark.parametrize(
+    "annotation", [Any, T, Union[int, Any], inspect.Signature.empty]
+)
+def test_unchecked_annotations(annotation):
+    assert compile_type_check(annotation) is None
+
+
+def test_type_checks_without_annotated_or_union_type(monkeypatch):
+    # Python 3.8 has neither `typing.Annotated` nor `types.UnionType`.
+    monkeypatch.setattr(_base, "_ANNOTATED", None)
+    monkeypatch.setattr(_base, "_UNION_TYPE", None)
+    assert compile_type_check(int)(1)
+    assert not compile_type_check(int)("1")
+    assert compile_type_check(Optional[int])(None)
+    assert compile_type_check(List[int])([])
+
+
+def count(n: int) -> List[int]:
+    """Counts up to n."""
+    return list(range(n)) if n >= 0 else ["negative"]
+
+
+def wrong(n: int) -> int:
+    """Returns a string."""
+    return str(n)
+
+
+def test_shallow_return_check():
+    assert Function(count).run({"n": 2}) == [0, 1]
+    # The shallow check only looks at the container.
+    assert Function(count).run({"n": -1}) == ["negative"]
+    with pytest.raises(AssertionError, match="Expected return type"):
+        Function(wrong).run({"n": 1})
+
+
+def test_deep_return_check():
+    assert Function(count, check_return="deep").run({"n": 2}) == [0, 1]
+    with pytest.raises(AssertionError):
+        Function(count, check_return="deep").run({"n": -1})
+
+
+def test_return_check_disabled():
+    assert Function(wrong, check_return=False).run({"n": 1}) == "1"
+
+
+def test_async_return_check():
+    async def awrong(n: int) -> int:
+        """Returns a string."""
+        return str(n)
+
+    function = Function(awrong)
+    assert function.is_coroutine
+    with pytest.raises(AssertionError):
+        asyncio.run(function.arun({"n": 1}))
+    assert asyncio.run(Function(awrong, check_return=False).arun({"n": 1})) == "1"
+
+
+def area(width: float, height: float = 1.0) -> float:
+    """Computes an area."""
+    return width * height
+
+
+def volume(width: float, height: float = 1.0) -> float:
+    """Computes a volume."""
+    return width * height
+
+
+def test_identical_signatures_share_one_model():
+    assert Function(area).args_model is Function(volume).args_model
+    assert Function(area).args_model(width=2).height == 1.0
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        lambda width, height=1.0: 0,  # annotations
+        lambda width: 0,  # parameters
+        lambda length, height=1.0: 0,  # names
+    ],
+)
+def test_different_signatures_do_not_share_models(other):
+    assert Function(other).args_model is not Function(area).args_model
+
+
+def test_defaults_of_different_types_do_not_share_models():
+    def flag(value: Any = False):
+        """Returns its argument."""
+        return value
+
+    def number(value: Any = 0):
+        """Returns its argument."""
+        return value
+
+    assert Function(flag).args_model is not Function(number).args_model
+    assert Function(flag).run({}) is False
+    assert Function(number).run({}) == 0
+
+
+def test_unhashable_defaults_get_their_own_model():
+    def first(items: list = []):  # noqa: B006
+        """Returns the first item."""
+        return items[0] if items else None
+
+    assert Function(first).args_model is not Function(first).args_model
+    assert Function(first).run({"items": [3]}) == 3
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+
+import pytest
+
+from tool import ToolCall, ToolDependencyError, ToolDispatcher, ToolKit
+from tool._graph import call_references, resolve_references
+
+order = []
+lock = threading.Lock()
+
+
+def record(name: str, value: int) -> int:
+    """Records the order calls ran in."""
+    with lock:
+        order.append(name)
+    return value
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+def fail(x: int) -> int:
+    """Always fails."""
+    raise RuntimeError("tool failed")
+
+
+def ref(id):
+    return {"$ref": id}
+
+
+def call(name, arguments, id):
+    return ToolCall(name=name, arguments=arguments, id=id)
+
+
+@pytest.fixture
+def dispatcher():
+    order.clear()
+    dispatcher = ToolDispatcher(ToolKit(tools=[record, add, fail]), max_workers=4)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def test_references_are_collected_and_resolved():
+    arguments = {"a": ref(0), "b": [1, ref(2)], "c": {"$ref": True}, "d": {"x": 1}}
+    assert call_references(arguments) == {0, 2}
+    assert resolve_references(arguments, {0: "zero", 2: "two"}) == {
+        "a": "zero",
+        "b": [1, "two"],
+        "c": {"$ref": True},
+        "d": {"x": 1},
+    }
+
+
+def test_calls_wait_for_the_results_they_reference(dispatcher):
+    scheduled = dispatcher.dispatch(
+        [
+            call("add", {"a": ref(1), "b": ref(2)}, 0),
+            call("record", {"name": "first", "value": 2}, 1),
+            call("record", {"name": "second", "value": 3}, 2),
+            call("add", {"a": ref(0), "b": 10}, 3),
+        ]
+    )
+    assert [f.result(timeout=5) for _, f in scheduled] == [5, 2, 3, 15]
+
+
+def test_references_may_point_to_later_calls(dispatcher):
+    graph = dispatcher.graph()
+    dependent = graph.submit(call("add", {"a": ref(1), "b": 1}, 0))
+    assert not dependent.done()
+    graph.submit(call("record", {"name": "late", "value": 41}, 1))
+    graph.close()
+    assert dependent.result(timeout=5) == 42
+
+
+def test_cycles_fail_without_running(dispatcher):
+    graph = dispatcher.graph()
+    first = graph.submit(call("record", {"name": "a", "value": ref(1)}, 0))
+    second = graph.submit(call("record", {"name": "b", "value": ref(0)}, 1))
+    itself = graph.submit(call("record", {"name": "c", "value": ref(2)}, 2))
+    graph.close()
+    for future in (second, itself):
+        with pytest.raises(ToolDependencyError, match="its own result"):
+            future.result(timeout=5)
+    with pytest.raises(ToolDependencyError):
+        first.result(timeout=5)
+    assert order == []
+
+
+def test_unknown_references_fail_on_close(dispatcher):
+    graph = dispatcher.graph()
+    future = graph.submit(call("add", {"a": ref(7), "b": 1}, 0))
+    graph.close()
+    with pytest.raises(ToolDependencyError, match="no call with id 7"):
+        future.result(timeout=5)
+
+
+def test_failures_propagate_to_dependents(dispatcher):
+    scheduled = dispatcher.dispatch(
+        [
+            call("fail", {"x": 1}, 0),
+            call("add", {"a": ref(0), "b": 1}, 1),
+            call("add", {"a": 1, "b": 1}, 2),
+        ]
+    )
+    failed, dependent, independent = [f for _, f in scheduled]
+    with pytest.raises(RuntimeError):
+        failed.result(timeout=5)
+    with pytest.raises(ToolDependencyError, match="which failed"):
+        dependent.result(timeout=5)
+    assert independent.result(timeout=5) == 2
+
+
+def test_async_graph_resolves_references(dispatcher):
+    async def main():
+        scheduled = dispatcher.adispatch(
+            [
+                call("add", {"a": ref(1), "b": 1}, 0),
+                call("add", {"a": 2, "b": 3}, 1),
+                call("add", {"a": ref(5), "b": 1}, 2),
+            ]
+        )
+        return await asyncio.gather(*(f for _, f in scheduled), return_exceptions=True)
+
+    total, value, missing = asyncio.run(main())
+    assert (total, value) == (6, 5)
+    assert isinstance(missing, ToolDependencyError)
+
+
+def sleeper(cancelled):
+    async def sleep(x: int) -> int:
+        """Sleeps until cancelled."""
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(x)
+            raise
+        return x
+
+    return sleep
+
+
+def test_async_graph_cancels_running_calls():
+    cancelled = []
+    dispatcher = ToolDispatcher(ToolKit(tools=[sleeper(cancelled), add]))
+
+    async def main():
+        graph = dispatcher.agraph()
+        done = graph.submit(call("add", {"a": 1, "b": 1}, 0))
+        sleeping = graph.submit(call("sleep", {"x": 1}, 1))
+        dependent = graph.submit(call("add", {"a": ref(1), "b": 1}, 2))
+        graph.close()
+        await done
+        await graph.cancel()
+        # Every task has stopped once `cancel` returns.
+        assert cancelled == [1]
+        assert done.result() == 2
+        assert sleeping.cancelled() and dependent.cancelled()
+
+    asyncio.run(main())
+
+
+def test_cancelling_a_future_stops_its_call():
+    cancelled = []
+    dispatcher = ToolDispatcher(ToolKit(tools=[sleeper(cancelled)]))
+
+    async def main():
+        ((_, future),) = dispatcher.adispatch([call("sleep", {"x": 7}, 0)])
+        await asyncio.sleep(0.01)
+        future.cancel()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if not task.done()]
+
+    assert len(asyncio.run(main())) == 1  # main itself
+    assert cancelled == [7]
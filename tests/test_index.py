@@ -0,0 +1,128 @@
+import pytest
+
+pytest.importorskip("sklearn")
+
+from scripted_client import ScriptedClient  # noqa: E402
+
+from agentic.planning import PlanningAgent  # noqa: E402
+from agentic.tool import ToolAgent  # noqa: E402
+from tool import ToolIndex, ToolKit  # noqa: E402
+
+
+def multiply(a: int, b: int) -> int:
+    """Multiplies two integers."""
+    return a * b
+
+
+def add(a: int, b: int) -> int:
+    """Adds two integers."""
+    return a + b
+
+
+def get_weather(city: str) -> str:
+    """Returns the weather forecast of a city."""
+    return "sunny"
+
+
+def send_email(recipient: str, body: str) -> str:
+    """Sends an email message to a recipient."""
+    return "sent"
+
+
+class RecordingClient(ScriptedClient):
+    """A scripted client that keeps the `tools` argument of every request."""
+
+    def __init__(self, script):
+        super().__init__(script)
+        self.tools = []
+
+    def chat(self, model="", messages=None, stream=False, **kwargs):
+        self.tools.append(kwargs.get("tools"))
+        return super().chat(model, messages, stream=stream, **kwargs)
+
+
+@pytest.fixture
+def toolkit():
+    return ToolKit(tools=[multiply, add, get_weather, send_email])
+
+
+def test_search_ranks_matching_tools(toolkit):
+    index = ToolIndex(toolkit, top_k=2)
+    assert index.search("what is the weather in Paris?")[0] == "get_weather"
+    assert index.search("email my recipient") == ["send_email"]
+    assert index.search("what is 25 times 12?") == []
+
+
+def test_select_pads_to_k(toolkit):
+    index = ToolIndex(toolkit, top_k=2)
+    assert index.select("what is the weather in Paris?") == ["get_weather", "multiply"]
+    assert index.select("what is 25 times 12?") == ["multiply", "add"]
+    assert index.select("what is 25 times 12?", k=10) == list(toolkit._tools)
+
+
+def test_resolve_and_expand(toolkit):
+    index = ToolIndex(toolkit)
+    assert index.resolve("add") == ["add"]
+    assert index.resolve("weather_lookup") == ["get_weather"]
+    assert index.expand(["add"], ["add", "weatherLookup", "get_weather"]) == [
+        "get_weather"
+    ]
+
+
+def test_the_index_follows_the_toolkit(toolkit):
+    index = ToolIndex(toolkit)
+    assert index.search("translate this text") == []
+
+    def translate(text: str, language: str) -> str:
+        """Translates a text into another language."""
+        return text
+
+    toolkit.register(translate)
+    assert index.search("translate this text") == ["translate"]
+
+
+def test_agents_keep_tools_when_nothing_matches(toolkit):
+    agent = ToolAgent(
+        client=ScriptedClient(["300"]),
+        model="scripted",
+        toolkit=toolkit,
+        tool_index=ToolIndex(toolkit, top_k=2),
+    )
+    session = agent.session()
+    assert agent.start("what is 25 times 12?", session=session) == "300"
+    assert session.tools == ["multiply", "add"]
+    prompt = session.messages[0]["content"]
+    assert '"multiply"' in prompt and '"add"' in prompt
+    assert "get_weather" not in prompt
+
+
+def test_native_agents_send_the_selected_tools(toolkit):
+    client = RecordingClient(["<response>300</response>"])
+    agent = PlanningAgent(
+        client=client,
+        model="scripted",
+        toolkit=toolkit,
+        tool_index=ToolIndex(toolkit, top_k=2),
+        tool_mode="native",
+    )
+    assert agent.run("what is 25 times 12?").completed
+    (tools,) = client.tools
+    assert [tool["function"]["name"] for tool in tools] == ["multiply", "add"]
+
+
+def test_called_tools_are_added_to_the_selection(toolkit):
+    script = [
+        '<tool_call>{"name": "send_email", "arguments": '
+        '{"recipient": "a", "body": "b"}, "id": 0}</tool_call>',
+        "<response>done</response>",
+    ]
+    agent = PlanningAgent(
+        client=ScriptedClient(script),
+        model="scripted",
+        toolkit=toolkit,
+        tool_index=ToolIndex(toolkit, top_k=1),
+    )
+    result = agent.run("what is the weather in Paris?")
+    assert result.completed
+    assert result.session.tools == ["get_weather", "send_email"]
+    assert "send_email" in result.session.messages[0]["content"]
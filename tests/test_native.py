@@ -0,0 +1,199 @@
+import asyncio
+
+import pytest
+from scripted_client import AsyncScriptedClient, ScriptedClient
+
+from agentic.cache import AsyncCachingClient, CachingClient, ChatCache
+from agentic.planning import AsyncPlanningAgent, PlanningAgent
+from agentic.tool import AsyncToolAgent, ToolAgent
+
+ollama = pytest.importorskip("ollama")
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+def native_call(name, **arguments):
+    return {"function": {"name": name, "arguments": arguments}}
+
+
+NATIVE = {"content": "", "tool_calls": [native_call("add", a=1, b=2)]}
+TAGGED = '<tool_call>{"name": "add", "arguments": {"a": 1, "b": 2}}</tool_call>'
+
+
+def script(first):
+    """Answers with `first` until a tool result is in the conversation."""
+
+    def reply(messages):
+        if any(message["role"] == "tool" for message in messages):
+            return "The answer is 3."
+        return first
+
+    return reply
+
+
+class Recording:
+    """Records the messages and tool definitions of every request."""
+
+    def chat(self, model="", messages=None, **kwargs):
+        self.sent.append(([dict(message) for message in messages], kwargs.get("tools")))
+        return super().chat(model=model, messages=messages, **kwargs)
+
+
+class RecordingClient(Recording, ScriptedClient):
+    def __init__(self, script):
+        super().__init__(script)
+        self.sent = []
+
+
+class AsyncRecordingClient(Recording, AsyncScriptedClient):
+    def __init__(self, script):
+        super().__init__(script)
+        self.sent = []
+
+
+class OllamaClient(RecordingClient):
+    """Answers with ollama's response objects instead of dictionaries."""
+
+    def chat(self, model="", messages=None, stream=False, **kwargs):
+        response = super().chat(model=model, messages=messages, stream=stream, **kwargs)
+        if stream:
+            return (ollama.ChatResponse(model=model, **chunk) for chunk in response)
+        return ollama.ChatResponse(**response)
+
+
+def first_content(client):
+    first = client.script([])
+    return first if isinstance(first, str) else first["content"]
+
+
+def tool_messages(session):
+    return [m for m in session.messages if m["role"] == "tool"]
+
+
+def echoed(session):
+    return [m["tool_calls"] for m in session.messages if m.get("tool_calls")]
+
+
+@pytest.mark.parametrize("client_type", [RecordingClient, OllamaClient])
+def test_tool_agent_reads_native_calls(client_type):
+    client = client_type(script(NATIVE))
+    agent = ToolAgent(
+        client=client, model="scripted", toolkit=[add], tool_mode="native"
+    )
+    session = agent.session()
+    assert agent.start("Add 1 and 2.", session=session) == "The answer is 3."
+    assert echoed(session) == [[native_call("add", a=1, b=2)]]
+    assert tool_messages(session) == [
+        {"role": "tool", "content": "3", "tool_name": "add"}
+    ]
+    (first, tools), (second, final_tools) = client.sent
+    assert [t["function"]["name"] for t in tools] == ["add"] and final_tools is None
+    # The echoed calls precede their results in the next request.
+    assert [m["role"] for m in second[-2:]] == ["assistant", "tool"]
+    assert second[-2]["tool_calls"] == [native_call("add", a=1, b=2)]
+
+
+def test_tool_agent_falls_back_to_tagged_calls():
+    client = RecordingClient(script(TAGGED))
+    agent = ToolAgent(
+        client=client, model="scripted", toolkit=[add], tool_mode="native"
+    )
+    session = agent.session()
+    assert agent.start("Add 1 and 2.", session=session) == "The answer is 3."
+    assert echoed(session) == []
+    assert tool_messages(session)[0]["content"] == "3"
+
+
+@pytest.mark.parametrize("first", [NATIVE, TAGGED])
+def test_async_tool_agent_native_calls(first):
+    client = AsyncRecordingClient(script(first))
+    agent = AsyncToolAgent(
+        client=client, model="scripted", toolkit=[add], tool_mode="native"
+    )
+    session = agent.session()
+    answer = asyncio.run(agent.start("Add 1 and 2.", session=session))
+    assert answer == "The answer is 3."
+    assert len(echoed(session)) == (first is NATIVE)
+    assert [m["content"] for m in tool_messages(session)] == ["3"]
+
+
+def check_planning_run(result, client):
+    assert result.completed and result.content == "The answer is 3."
+    assert result.iterations == 2
+    # Tagged calls are echoed in the native format as well.
+    assert echoed(result.session) == [[native_call("add", a=1, b=2)]]
+    assert tool_messages(result.session) == [
+        {"role": "tool", "content": "3", "tool_name": "add"}
+    ]
+    (first, tools), (second, _) = client.sent
+    assert [t["function"]["name"] for t in tools] == ["add"]
+    echo, result = second[len(first) :]
+    assert echo["role"] == "assistant" and echo["content"] == first_content(client)
+    assert echo["tool_calls"] == [native_call("add", a=1, b=2)]
+    assert result == {"role": "tool", "content": "3", "tool_name": "add"}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("first", [NATIVE, TAGGED])
+@pytest.mark.parametrize("client_type", [RecordingClient, OllamaClient])
+def test_planning_agent_native_calls(client_type, first, stream):
+    client = client_type(script(first))
+    agent = PlanningAgent(
+        client=client,
+        model="scripted",
+        toolkit=[add],
+        tool_mode="native",
+        stream=stream,
+    )
+    check_planning_run(agent.run("Add 1 and 2."), client)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("first", [NATIVE, TAGGED])
+def test_async_planning_agent_native_calls(first, stream):
+    client = AsyncRecordingClient(script(first))
+    agent = AsyncPlanningAgent(
+        client=client,
+        model="scripted",
+        toolkit=[add],
+        tool_mode="native",
+        stream=stream,
+    )
+    check_planning_run(asyncio.run(agent.run("Add 1 and 2.")), client)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_native_calls_survive_the_chat_cache(stream):
+    backend = OllamaClient(script(NATIVE))
+    client = CachingClient(backend, ChatCache(":memory:"))
+    agent = PlanningAgent(
+        client=client,
+        model="scripted",
+        toolkit=[add],
+        tool_mode="native",
+        stream=stream,
+    )
+    recorded = agent.run("Add 1 and 2.")
+    assert (client.hits, client.misses) == (0, 2)
+    # Replayed responses are dictionaries, with the calls in message.tool_calls.
+    client.mode = "replay"
+    replayed = agent.run("Add 1 and 2.")
+    assert (client.hits, len(backend.sent)) == (2, 2)
+    assert replayed.content == recorded.content == "The answer is 3."
+    assert replayed.session.messages == recorded.session.messages
+    assert echoed(replayed.session) == [[native_call("add", a=1, b=2)]]
+
+
+def test_tool_agent_native_calls_through_the_async_chat_cache():
+    client = AsyncCachingClient(
+        AsyncScriptedClient(script(NATIVE)), ChatCache(":memory:")
+    )
+    agent = AsyncToolAgent(
+        client=client, model="scripted", toolkit=[add], tool_mode="native"
+    )
+    answers = [asyncio.run(agent.start("Add 1 and 2.")) for _ in range(2)]
+    assert answers == ["The answer is 3."] * 2
+    assert (client.hits, client.misses) == (2, 2)
@@ -0,0 +1,194 @@
+import random
+import time
+
+import pytest
+
+from tool import (
+    ToolCallParser,
+    ToolCallProcessor,
+    native_tool_calls,
+    parse_tool_calls,
+)
+
+TEXT = (
+    "pre <thought>think</thought> x <tool_calls>"
+    '{"name": "a", "arguments": {"q": "</tool_call>"}, "id": 0}\n'
+    '{"name": "b", "arguments": {}, "id": 1}</tool_calls>'
+    '<tool_call>{"name": "c", "arguments": {"x": True,}, "id": 2}</tool_call>'
+    "<thought>two</thought><response>fin</response> tail "
+    "<tool_call>{}</tool_call>"
+)
+
+
+def dump(parser):
+    return [call.model_dump() for call in parser.calls]
+
+
+def native(*calls):
+    return {"role": "assistant", "content": "", "tool_calls": list(calls)}
+
+
+def test_single_feed():
+    parser = ToolCallParser(TEXT)
+    assert [(c.name, c.arguments, c.id) for c in parser.calls] == [
+        ("a", {"q": "</tool_call>"}, 0),
+        ("b", {}, 1),
+        ("c", {"x": True}, 2),
+    ]
+    assert parser.thoughts == ["think", "two"]
+    assert parser.response == "fin"
+    assert parser.done
+    assert parser.content == TEXT
+
+
+def test_chunk_boundaries_do_not_change_the_result():
+    expected = ToolCallParser(TEXT)
+    rnd = random.Random(1)
+    for _ in range(500):
+        parser = ToolCallParser()
+        pos = 0
+        while pos < len(TEXT):
+            size = rnd.randint(1, 12)
+            parser.feed(TEXT[pos : pos + size])
+            pos += size
+        assert dump(parser) == dump(expected)
+        assert parser.thoughts == expected.thoughts
+        assert parser.response == expected.response
+        assert parser.content == TEXT
+
+
+def test_feed_returns_the_calls_each_chunk_completed():
+    parser = ToolCallParser()
+    assert parser.feed("<tool_c") == []
+    assert parser.feed('all>{"name": "a", "arguments": {}, "id": 0}</tool_') == []
+    (completed,) = parser.feed("call>")
+    assert completed.name == "a"
+    assert parser.feed("<response>ok</resp") == []
+    assert not parser.done
+    parser.feed("onse>")
+    assert parser.response == "ok"
+
+
+def test_text_after_the_response_is_ignored():
+    parser = ToolCallParser("<response>a</response>")
+    assert parser.feed('<tool_call>{"name": "a", "arguments": {}}</tool_call>') == []
+    assert parser.calls == []
+
+
+def test_long_blocks_stay_linear():
+    def parse(chunks):
+        parser = ToolCallParser()
+        start = time.perf_counter()
+        parser.feed('<tool_call>{"name": "a", "arguments": {"text": "')
+        for _ in range(chunks):
+            parser.feed("x" * 8)
+        parser.feed('"}, "id": 0}</tool_call>')
+        assert len(parser.calls[0].arguments["text"]) == 8 * chunks
+        return time.perf_counter() - start
+
+    small, large = parse(20_000), parse(160_000)
+    # Quadratic joins would take ~64x longer; allow generous noise.
+    assert large < small * 24
+
+
+def test_repairs_are_counted():
+    parser = ToolCallParser(
+        "<tool_call>{'name': 'a', 'arguments': {'flag': True,},}</tool_call>"
+    )
+    assert [(c.name, c.arguments, c.id) for c in parser.calls] == [
+        ("a", {"flag": True}, 0)
+    ]
+    assert parser.repairs == {
+        "single_quotes": 1,
+        "python_literals": 1,
+        "trailing_commas": 1,
+        "missing_id": 1,
+    }
+
+
+def test_repair_can_be_disabled():
+    parser = ToolCallParser(
+        '<tool_call>{"name": "a", "arguments": {},}</tool_call>', repair=False
+    )
+    assert parser.calls == []
+    assert len(parser.errors) == 1
+
+
+def test_invalid_payloads_are_recorded():
+    parser = ToolCallParser(
+        '<tool_call>{"name": "a", "arguments": {}, "id": 0}\n{"id": 1}</tool_call>'
+    )
+    assert [c.name for c in parser.calls] == ["a"]
+    assert parser.invalid_calls[0][0] == {"id": 1}
+
+
+def test_duplicate_ids_are_renumbered():
+    parser = ToolCallParser(
+        "<tool_calls>"
+        '{"name": "a", "arguments": {}, "id": 0}\n'
+        '{"name": "b", "arguments": {}, "id": 0}\n'
+        '{"name": "c", "arguments": {}}'
+        "</tool_calls>"
+    )
+    assert [(c.name, c.id) for c in parser.calls] == [("a", 0), ("b", 1), ("c", 2)]
+
+
+def test_native_calls_follow_tagged_calls():
+    parser = ToolCallParser(
+        '<tool_call>{"name": "a", "arguments": {}, "id": 4}</tool_call>'
+    )
+    completed = parser.feed_native(
+        native(
+            {"function": {"name": "b", "arguments": {"x": 1}}},
+            {"function": {"name": "c", "arguments": '{"y": 2,}'}},
+        )
+    )
+    assert [(c.name, c.arguments, c.id) for c in completed] == [
+        ("b", {"x": 1}, 5),
+        ("c", {"y": 2}, 6),
+    ]
+    parser.feed('<tool_call>{"name": "d", "arguments": {}, "id": 5}</tool_call>')
+    assert [c.id for c in parser.calls] == [4, 5, 6, 7]
+
+
+@pytest.mark.parametrize(
+    "raw, error",
+    [
+        ({"function": {"arguments": {}}}, "KeyError"),
+        ({"type": "function"}, "KeyError"),
+        ({"function": {"name": "a", "arguments": "{oops"}}, "JSONDecodeError"),
+        ({"function": {"name": "a", "arguments": [1]}}, "ValidationError"),
+    ],
+)
+def test_malformed_native_calls_are_recorded(raw, error):
+    parser = ToolCallParser()
+    ok = {"function": {"name": "ok", "arguments": {}}}
+    assert [c.name for c in parser.feed_native(native(raw, ok))] == ["ok"]
+    ((recorded, message),) = parser.invalid_calls
+    assert recorded is raw
+    assert message.startswith(error)
+
+
+def test_native_tool_calls_numbers_from_start():
+    message = native({"function": {"name": "a", "arguments": {}}})
+    assert [c.id for c in native_tool_calls(message, start=3)] == [3]
+    assert native_tool_calls({"role": "assistant", "content": "hi"}) == []
+
+
+def test_parse_tool_calls():
+    assert parse_tool_calls(TEXT)[:2] == [
+        {"name": "a", "arguments": {"q": "</tool_call>"}, "id": 0},
+        {"name": "b", "arguments": {}, "id": 1},
+    ]
+
+
+def test_unreadable_blocks_are_recorded_not_printed(capsys):
+    processor = ToolCallProcessor(
+        '<tool_call>{"name": "a", "arguments": {</tool_call>'
+        '<tool_call>{"arguments": {}}</tool_call>'
+    )
+    assert processor.calls == []
+    assert len(processor.errors) == 1
+    assert processor.invalid_calls[0][0] == {"arguments": {}, "id": 0}
+    assert parse_tool_calls('<tool_call>{"name": </tool_call>') == []
+    assert capsys.readouterr().out == ""
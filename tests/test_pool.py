@@ -0,0 +1,175 @@
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from agentic.pool import AsyncClientPool, ClientPool  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+class Node:
+    """A stub ollama server answering `ps` and `chat` with its own port."""
+
+    def __init__(self, models, status=None):
+        self.models = set(models)
+        self.status = status
+        self.hits = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, code, body, content_type="application/json"):
+                data = body.encode()
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if node.status:
+                    return self.send(node.status, '{"error": "down"}')
+                models = [{"model": m, "name": m} for m in node.models]
+                self.send(200, json.dumps({"models": models}))
+
+            def do_POST(self):
+                request = json.loads(
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                )
+                node.hits += 1
+                if node.status:
+                    return self.send(node.status, '{"error": "boom"}')
+                if request["model"] not in node.models:
+                    return self.send(404, '{"error": "model not found"}')
+                message = {
+                    "model": request["model"],
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": node.url},
+                    "done": True,
+                }
+                if not request.get("stream", True):
+                    return self.send(200, json.dumps(message))
+                part = dict(message, done=False)
+                body = json.dumps(part) + "\n" + json.dumps(message) + "\n"
+                self.send(200, body, "application/x-ndjson")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def nodes():
+    started = []
+
+    def start(models, status=None):
+        node = Node(models, status)
+        started.append(node)
+        return node
+
+    yield start
+    for node in started:
+        node.stop()
+
+
+def answered_by(response):
+    return response["message"]["content"]
+
+
+def test_fails_over_on_server_errors(nodes):
+    down, up = nodes(["m"], status=500), nodes(["m"])
+    pool = ClientPool([down.url, up.url], health_interval=None)
+    for _ in range(4):
+        assert answered_by(pool.chat(model="m", messages=MESSAGES)) == up.url
+    # The failed backend is avoided during its cooldown.
+    assert down.hits == 1
+    assert not pool.endpoints[0].healthy
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
+
+
+def test_fails_over_on_refused_connections(nodes):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = f"http://127.0.0.1:{s.getsockname()[1]}"
+    up = nodes(["m"])
+    pool = ClientPool([closed, up.url], health_interval=None)
+    assert answered_by(pool.chat(model="m", messages=MESSAGES)) == up.url
+    assert pool.check_health() == {closed: False, up.url: True}
+
+
+def test_missing_models_fail_over_without_marking_the_backend(nodes):
+    other, up = nodes(["other"]), nodes(["m"])
+    pool = ClientPool([other.url, up.url], health_interval=None, spill_over=100)
+    pool.endpoints[1].outstanding = 1
+    assert answered_by(pool.chat(model="m", messages=MESSAGES)) == up.url
+    assert other.hits == 1
+    assert pool.endpoints[0].healthy
+    assert "m" in pool.endpoints[1].models
+
+
+def test_client_errors_are_not_retried(nodes):
+    bad, up = nodes(["m"], status=400), nodes(["m"])
+    pool = ClientPool([bad.url, up.url], health_interval=None)
+    pool.endpoints[1].outstanding = 1
+    with pytest.raises(Exception) as error:
+        pool.chat(model="m", messages=MESSAGES)
+    assert getattr(error.value, "status_code", None) == 400
+    assert up.hits == 0
+    assert pool.endpoints[0].healthy
+
+
+def test_requests_go_to_backends_with_the_model(nodes):
+    llama, qwen = nodes(["llama"]), nodes(["qwen"])
+    pool = ClientPool([llama.url, qwen.url], health_interval=None)
+    assert pool.check_health() == {llama.url: True, qwen.url: True}
+    for _ in range(3):
+        assert answered_by(pool.chat(model="qwen", messages=MESSAGES)) == qwen.url
+    assert llama.hits == 0
+
+
+def test_streams_release_their_backend(nodes):
+    node = nodes(["m"])
+    pool = ClientPool([node.url], health_interval=None)
+    stream = pool.chat(model="m", messages=MESSAGES, stream=True)
+    assert pool.endpoints[0].outstanding == 1
+    assert [chunk["done"] for chunk in stream] == [False, True]
+    assert pool.endpoints[0].outstanding == 0
+
+    stream = pool.chat(model="m", messages=MESSAGES, stream=True)
+    next(stream)
+    stream.close()
+    assert pool.endpoints[0].outstanding == 0
+
+
+def test_async_pool_fails_over(nodes):
+    down, up = nodes(["m"], status=503), nodes(["m"])
+
+    async def main():
+        pool = AsyncClientPool([down.url, up.url], health_interval=None)
+        responses = await asyncio.gather(
+            *(pool.chat(model="m", messages=MESSAGES) for _ in range(5))
+        )
+        stream = await pool.chat(model="m", messages=MESSAGES, stream=True)
+        chunks = [chunk async for chunk in stream]
+        return pool, responses, chunks
+
+    pool, responses, chunks = asyncio.run(main())
+    assert {answered_by(r) for r in responses} == {up.url}
+    assert answered_by(chunks[-1]) == up.url
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
@@ -0,0 +1,151 @@
+import json
+from typing import Callable, List, Optional
+
+import pytest
+
+from tool import ToolKit
+from tool._render import (
+    SCHEMA_STYLES,
+    approx_token_count,
+    docstring_summary,
+    render_compact,
+    render_json,
+    render_signature,
+    render_summary,
+    tool_definition,
+)
+
+
+def add(x: int, y: int = 0) -> int:
+    """
+    Add two integers.
+
+    Parameters
+    ----------
+    x : int
+        The first integer.
+    """
+    return x + y
+
+
+def tag(items: List[str], label: Optional[str] = None):
+    return items
+
+
+@pytest.fixture
+def toolkit():
+    return ToolKit(tools=[add, tag])
+
+
+@pytest.mark.parametrize(
+    "doc, summary",
+    [
+        (None, ""),
+        ("", ""),
+        ("One line.", "One line."),
+        ("\n    Spans\n    two lines.\n\n    Details.\n    ", "Spans two lines."),
+    ],
+)
+def test_docstring_summary(doc, summary):
+    assert docstring_summary(doc) == summary
+
+
+def test_approx_token_count():
+    assert [approx_token_count("x" * n) for n in (0, 1, 4, 5)] == [0, 1, 1, 2]
+
+
+def test_json_styles_keep_the_schema(toolkit):
+    tool = toolkit._tools["add"]
+    full, compact, summary = (
+        json.loads(render(tool))
+        for render in (render_json, render_compact, render_summary)
+    )
+    assert full == tool.schema
+    assert compact["doc"].startswith("Add two integers.\n\nParameters")
+    assert summary["doc"] == "Add two integers."
+    assert full["parameters"] == compact["parameters"] == summary["parameters"]
+    assert "\n" in render_json(tool) and "\n" not in render_summary(tool)
+    assert json.loads(render_summary(toolkit._tools["tag"]))["doc"] == ""
+
+
+def test_signature_style(toolkit):
+    assert render_signature(toolkit._tools["add"]) == (
+        "add(x: int, y: int = 0) -> int: Add two integers."
+    )
+    assert render_signature(toolkit._tools["tag"]) == (
+        "tag(items: List[str], label: Optional[str] = None) -> unknown"
+    )
+
+
+def test_render_schemas_joins_each_style(toolkit):
+    assert toolkit.render_schemas(style="json").count("\n\n{") == 1
+    assert toolkit.render_schemas(style="signature").splitlines() == [
+        render_signature(toolkit._tools["add"]),
+        render_signature(toolkit._tools["tag"]),
+    ]
+    assert toolkit.render_schemas(["tag"], style="summary") == render_summary(
+        toolkit._tools["tag"]
+    )
+    with pytest.raises(ValueError, match="style must be one of"):
+        toolkit.render_schemas(style="yaml")
+
+
+def test_tool_definition(toolkit):
+    assert tool_definition(toolkit._tools["add"]) == {
+        "type": "function",
+        "function": {
+            "name": "add",
+            "description": "Add two integers.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "x": {"type": "integer"},
+                    "y": {"type": "integer", "default": 0},
+                },
+                "required": ["x"],
+            },
+        },
+    }
+    parameters = tool_definition(toolkit._tools["tag"])["function"]["parameters"]
+    assert parameters["required"] == ["items"]
+    assert parameters["properties"]["items"] == {
+        "type": "array",
+        "items": {"type": "string"},
+    }
+    assert parameters["properties"]["label"]["default"] is None
+
+
+def test_tool_definition_of_undescribable_annotations():
+    def apply(func: Callable[[int], int], x: int) -> int:
+        """Applies a function."""
+        return func(x)
+
+    definition = tool_definition(ToolKit(tools=[apply])._tools["apply"])
+    assert definition["function"]["parameters"] == {
+        "type": "object",
+        "properties": {"func": {}, "x": {}},
+        "required": ["func", "x"],
+    }
+
+
+def test_schema_report(toolkit):
+    reports = toolkit.schema_report()
+    assert list(reports) == list(SCHEMA_STYLES)
+    for style, report in reports.items():
+        text = toolkit.render_schemas(style=style)
+        assert (report.style, report.tools, report.chars) == (style, 2, len(text))
+        assert report.tokens == approx_token_count(text)
+        assert report.tokens_per_tool == report.tokens / 2
+        assert report.to_dict()["tokens_per_tool"] == report.tokens_per_tool
+    # Styles are ordered from the most to the least verbose.
+    tokens = [report.tokens for report in reports.values()]
+    assert tokens == sorted(tokens, reverse=True)
+
+
+def test_schema_report_with_a_tokenizer(toolkit):
+    (report,) = toolkit.schema_report(
+        styles=["signature"], count_tokens=lambda text: len(text.split())
+    ).values()
+    assert report.tokens == len(toolkit.render_schemas(style="signature").split())
+    empty = ToolKit(tools=[]).schema_report(styles=["json"])["json"]
+    assert (empty.tools, empty.tokens, empty.tokens_per_tool) == (0, 0, 0.0)
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from tool import ToolCallParser, repair_json, repair_stats
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    repair_stats().reset()
+    yield repair_stats()
+    repair_stats().reset()
+
+
+@pytest.mark.parametrize(
+    "text, expected, kinds",
+    [
+        ("{'a': 'b'}", {"a": "b"}, ["single_quotes"]),
+        ("{'a': 'say \"hi\"'}", {"a": 'say "hi"'}, ["single_quotes"]),
+        ("{'a': 'it\\'s'}", {"a": "it's"}, ["single_quotes"]),
+        (
+            '{"a": "line\nbreak\there"}',
+            {"a": "line\nbreak\there"},
+            ["control_characters"],
+        ),
+        (
+            '{"a": True, "b": False, "c": None}',
+            {"a": True, "b": False, "c": None},
+            ["python_literals"],
+        ),
+        (
+            '{"a": [1, 2,], "b": {"c": 1,},}',
+            {"a": [1, 2], "b": {"c": 1}},
+            ["trailing_commas"],
+        ),
+        (
+            "{'a': True, 'b': 'x\ny',}",
+            {"a": True, "b": "x\ny"},
+            [
+                "single_quotes",
+                "control_characters",
+                "python_literals",
+                "trailing_commas",
+            ],
+        ),
+    ],
+)
+def test_repair_json(text, expected, kinds):
+    repaired, applied = repair_json(text)
+    assert json.loads(repaired) == expected
+    assert applied == kinds
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": "True, None, \'quoted\', [1,]"}',
+        '{"a": "escaped \\" quote, }"}',
+        '{"a": [1, 2], "b": null}',
+    ],
+)
+def test_valid_json_is_left_alone(text):
+    assert repair_json(text) == (text, [])
+
+
+def test_missing_ids_follow_the_highest_id():
+    parser = ToolCallParser(
+        "<tool_calls>"
+        '{"name": "a", "arguments": {}}\n'
+        '{"name": "b", "arguments": {}, "id": 5}\n'
+        '{"name": "c", "arguments": {}}'
+        "</tool_calls>"
+    )
+    assert [(c.name, c.id) for c in parser.calls] == [("a", 0), ("b", 5), ("c", 6)]
+    assert parser.repairs == {"missing_id": 2}
+
+
+def test_parser_records_repair_outcomes(stats):
+    ToolCallParser("<tool_call>{'name': 'a', 'arguments': {}, 'id': 0}</tool_call>")
+    ToolCallParser("<tool_call>{'name': 'a', 'arguments': {</tool_call>")
+    assert stats.repaired == 1
+    assert stats.failed == 1
+    assert stats.counts["single_quotes"] == 2
+    assert stats.repair_rate == 0.5
+    assert stats.to_dict()["repaired"] == 1
+
+
+def test_repairs_are_off_when_disabled(stats):
+    parser = ToolCallParser(
+        '<tool_call>{"name": "a", "arguments": {}}</tool_call>', repair=False
+    )
+    assert parser.calls == []
+    assert parser.invalid_calls
+    assert stats.to_dict() == {
+        "repaired": 0,
+        "failed": 0,
+        **dict.fromkeys(stats.counts, 0),
+    }
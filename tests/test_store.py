@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+
+import pytest
+from scripted_client import ScriptedClient
+
+from agentic.planning import PlanningAgent
+from agentic.store import SessionStore
+
+SYSTEM = {"role": "system", "content": "sys"}
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.log")
+
+
+def test_sessions_survive_reopening(path):
+    with SessionStore(path) as store:
+        session = store.create(SYSTEM, session_id="a")
+        session.extend([user("Q1"), {"role": "assistant", "content": "A1"}])
+        session.tools = ["add"]
+        session.set_system_message({"role": "system", "content": "sys 2"})
+        store.create(SYSTEM, session_id="b").append(user("other"))
+
+    with SessionStore(path) as store:
+        assert sorted(store.ids()) == ["a", "b"]
+        session = store.get("a")
+        assert not session.resident
+        assert [m["content"] for m in session.messages] == ["sys 2", "Q1", "A1"]
+        assert session.tools == ["add"]
+        assert store.get("a") is session
+
+
+def test_ids_are_unique(path):
+    with SessionStore(path) as store:
+        store.create(SYSTEM, session_id="a")
+        with pytest.raises(ValueError):
+            store.create(SYSTEM, session_id="a")
+        with pytest.raises(ValueError):
+            store.create(SYSTEM, session_id="a\tb")
+        with pytest.raises(KeyError):
+            store.get("missing")
+
+
+def test_evicted_sessions_are_reloaded(path):
+    with SessionStore(path) as store:
+        session = store.create(SYSTEM, max_messages=3)
+        session.extend([user("Q1"), user("Q2"), user("Q3")])
+        assert store.evict(session.session_id)
+        assert not store.evict(session.session_id)
+        assert not session.resident and store.resident == 0
+        # The log keeps every message; memory keeps max_messages of them.
+        assert [m["content"] for m in session.messages] == ["sys", "Q2", "Q3"]
+        assert session.resident and store.resident == 1
+
+
+def test_least_recently_used_sessions_are_evicted(path):
+    with SessionStore(path, max_resident=2) as store:
+        a, b = store.create(SYSTEM), store.create(SYSTEM)
+        a.append(user("a"))
+        c = store.create(SYSTEM)
+        assert (a.resident, b.resident, c.resident) == (True, False, True)
+        assert store.evict_idle(0) == 2
+        assert store.resident == 0
+        assert a.messages[-1] == user("a")
+
+
+def test_compact_drops_obsolete_records(path):
+    with SessionStore(path) as store:
+        kept, reset, deleted = (store.create(SYSTEM, session_id=i) for i in "krd")
+        for session in (kept, reset, deleted):
+            session.extend([user("x" * 100)] * 5)
+        reset.reset()
+        reset.append(user("after"))
+        store.delete("d")
+        assert deleted.closed and "d" not in store
+        before = store.size()
+        store.compact()
+        assert store.size() == os.path.getsize(path) < before / 2
+        kept.append(user("new"))
+        store.evict("k")
+        assert len(kept.messages) == 7
+        assert [m["content"] for m in store.get("r").messages] == ["sys", "after"]
+
+    with SessionStore(path) as store:
+        assert sorted(store.ids()) == ["k", "r"]
+        assert len(store.get("k").messages) == 7
+
+
+def test_a_torn_last_record_is_truncated(path):
+    with SessionStore(path) as store:
+        store.create(SYSTEM, session_id="a").append(user("Q1"))
+        size = store.size()
+    with open(path, "ab") as log:
+        log.write(b'a\tm\t{"role": "user", "con')
+
+    with SessionStore(path) as store:
+        assert os.path.getsize(path) == size
+        session = store.get("a")
+        assert session.messages[-1] == user("Q1")
+        session.append(user("Q2"))
+    with SessionStore(path) as store:
+        assert store.get("a").messages[-1] == user("Q2")
+
+
+def test_agent_sessions_are_stored(path):
+    agent = PlanningAgent(
+        client=ScriptedClient(["<response>done</response>"]),
+        model="scripted",
+        toolkit=[],
+    )
+    with SessionStore(path) as store:
+        session = agent.session(store=store, session_id="chat")
+        assert agent.run("Q1", session=session).completed
+        store.evict("chat")
+        assert agent.run("Q2", session=session).completed
+
+    with SessionStore(path) as store:
+        messages = store.get("chat").messages
+        assert messages[0] == agent.session().messages[0]
+        assert [m["content"] for m in messages[1:]] == [
+            "<question>Q1</question>",
+            "<response>done</response>",
+            "<question>Q2</question>",
+            "<response>done</response>",
+        ]
+
+
+def test_appends_race_with_evictions(path):
+    with SessionStore(path) as store:
+        session = store.create(SYSTEM, session_id="a", max_messages=8)
+        done = threading.Event()
+        errors = []
+
+        def evict():
+            while not done.is_set():
+                store.evict("a")
+                store.evict_idle(0)
+                time.sleep(0)
+
+        def append():
+            try:
+                for i in range(1000):
+                    session.append(user(str(i)))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        threads = [threading.Thread(target=evict), threading.Thread(target=append)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert session.messages[-1] == user("999")
+        assert len(session.messages) == 8
+
+    with SessionStore(path) as store:
+        assert len(store._read("a")) == 1001
+
+
+def test_stored_sessions_clear_their_context_reports(path):
+    store = SessionStore(path)
+    session = store.create(SYSTEM)
+    session.context_reports.append(object())
+    session.reset()
+    assert len(session.context_reports) == 0
+    session.context_reports.append(object())
+    store.evict(session.session_id)
+    assert len(session.context_reports) == 0
+    assert session.context_reports.maxlen is not None
+    store.close()
@@ -0,0 +1,154 @@
+import asyncio
+
+from tool import ToolCache, ToolCall, ToolDispatcher, ToolKit
+from tool._cache import canonical_args
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_canonical_args_ignore_key_order():
+    assert canonical_args({"b": 1, "a": [1, 2]}) == canonical_args(
+        {"a": [1, 2], "b": 1}
+    )
+    assert canonical_args({"a": object}) == '{"a":"%r"}' % (object,)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ToolCache(maxsize=2)
+    cache.set("f", 1, "one")
+    cache.set("f", 2, "two")
+    assert cache.get("f", 1) == (True, "one")
+    cache.set("f", 3, "three")
+    assert cache.get("f", 2) == (False, None)
+    assert cache.get("f", 1) == (True, "one")
+    assert cache.get("f", 3) == (True, "three")
+    assert len(cache) == 2
+
+
+def test_entries_expire():
+    clock = Clock()
+    cache = ToolCache(ttl=10, clock=clock)
+    cache.set("f", "default", 1)
+    cache.set("f", "short", 2, ttl=1)
+    clock.now = 5
+    assert cache.get("f", "default") == (True, 1)
+    assert cache.get("f", "short") == (False, None)
+    assert len(cache) == 1
+    clock.now = 10
+    assert cache.get("f", "default") == (False, None)
+    assert len(cache) == 0
+
+
+def test_stats_are_kept_per_tool():
+    cache = ToolCache()
+    cache.set("f", 1, "one")
+    cache.get("f", 1)
+    cache.get("f", 2)
+    cache.get("g", 3)
+    stats = cache.stats("f")
+    assert (stats.hits, stats.misses, stats.hit_rate) == (1, 1, 0.5)
+    stats.hits = 100
+    assert cache.stats("f").hits == 1
+    assert {name: s.misses for name, s in cache.stats().items()} == {"f": 1, "g": 1}
+    assert cache.stats("unknown").hit_rate == 0.0
+    cache.clear()
+    assert len(cache) == 0 and cache.stats() == {}
+
+
+runs = []
+
+
+def square(x: int) -> int:
+    """Squares a number."""
+    runs.append(x)
+    return x * x
+
+
+def impure(x: int) -> int:
+    """Squares a number, with side effects."""
+    runs.append(x)
+    return x * x
+
+
+def test_pure_tools_run_once_per_arguments():
+    runs.clear()
+    toolkit = ToolKit(tools=[])
+    toolkit.register(square, pure=True)
+    toolkit.register(impure)
+    dispatcher = ToolDispatcher(toolkit, max_workers=2)
+    calls = [
+        ToolCall(name=name, arguments={"x": x}, id=i)
+        for i, (name, x) in enumerate(
+            [
+                ("square", 3),
+                ("square", 3),
+                ("square", "3"),
+                ("impure", 3),
+                ("impure", 3),
+            ]
+        )
+    ]
+    for call in calls:
+        # One by one, so the calls with the same arguments do not overlap.
+        ((_, future),) = dispatcher.dispatch([call])
+        assert future.result(timeout=5) == 9
+    assert runs == [3, 3, 3]
+    # Counters are kept by qualified name, shared by the toolkits using the cache.
+    stats = toolkit.cache.stats(f"{__name__}.square")
+    assert (stats.hits, stats.misses) == (2, 1)
+    assert list(toolkit.cache.stats()) == [f"{__name__}.square"]
+    dispatcher.shutdown()
+
+
+def test_results_expire_with_the_tool_ttl():
+    runs.clear()
+    clock = Clock()
+    toolkit = ToolKit(tools=[], cache=ToolCache(clock=clock))
+    toolkit.register(square, pure=True, ttl=60)
+    tool = toolkit.get_tool_by_name("square")
+    tool.run({"x": 2})
+    clock.now = 59
+    tool.run({"x": 2})
+    clock.now = 61
+    tool.run({"x": 2})
+    assert runs == [2, 2]
+
+
+def test_toolkits_can_share_a_cache():
+    runs.clear()
+    cache = ToolCache()
+    first, second = ToolKit(tools=[], cache=cache), ToolKit(tools=[], cache=cache)
+    first.register(square, pure=True)
+    second.register(square, pure=True)
+    first.get_tool_by_name("square").run({"x": 4})
+    second.get_tool_by_name("square").run({"x": 4})
+    assert runs == [4]
+
+
+def test_pure_coroutine_tools_are_cached():
+    awaited = []
+
+    async def fetch(key: str) -> str:
+        """Fetches a value."""
+        awaited.append(key)
+        return key.upper()
+
+    toolkit = ToolKit(tools=[])
+    toolkit.register(fetch, pure=True)
+    dispatcher = ToolDispatcher(toolkit)
+
+    async def main():
+        for i in range(3):
+            ((_, future),) = dispatcher.adispatch(
+                [ToolCall(name="fetch", arguments={"key": "a"}, id=i)]
+            )
+            assert await future == "A"
+
+    asyncio.run(main())
+    assert awaited == ["a"]
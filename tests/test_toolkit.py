@@ -0,0 +1,145 @@
+import importlib
+import sys
+import textwrap
+
+import pytest
+from scripted_client import ScriptedClient
+
+from agentic.tool import ToolAgent
+from tool import ToolKit, _render
+
+HELPERS = """
+def shout(text: str) -> str:
+    \"\"\"Upper-cases a text.\"\"\"
+    return text.upper()
+"""
+
+MAIN = """
+from os.path import join
+from .helpers import shout
+
+
+def add(a: int, b: int) -> int:
+    \"\"\"Adds two numbers.\"\"\"
+    return a + b
+
+
+def _private(x: int) -> int:
+    \"\"\"Not a tool.\"\"\"
+    return x
+
+
+NUMBER = 3
+
+
+class Calculator:
+    def add(self, a: int, b: int) -> int:
+        return a + b
+
+
+def multiply(a: int, b: int) -> int:
+    \"\"\"Multiplies two numbers.\"\"\"
+    return a * b
+"""
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    root = tmp_path / "toolpack"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "helpers.py").write_text(textwrap.dedent(HELPERS))
+    (root / "main.py").write_text(textwrap.dedent(MAIN))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "toolpack"
+    for name in [name for name in sys.modules if name.startswith("toolpack")]:
+        del sys.modules[name]
+
+
+def test_module_registration_skips_private_and_imported_names(package):
+    toolkit = ToolKit.from_module(f"{package}.main")
+    assert list(toolkit._tools) == ["add", "multiply"]
+    assert toolkit._tools["add"].run({"a": 1, "b": 2}) == 3
+
+
+def test_module_registration_of_a_package(package):
+    assert list(ToolKit.from_module(package)._tools) == []
+    toolkit = ToolKit.from_module(package, recursive=True)
+    assert sorted(toolkit._tools) == ["add", "multiply", "shout"]
+
+
+def test_module_registration_options(package):
+    module = importlib.import_module(f"{package}.main")
+    toolkit = ToolKit(tools=[])
+    tools = toolkit.register_module(
+        module, predicate=lambda func: func.__doc__ is not None, pure=True
+    )
+    assert [tool._name for tool in tools] == ["add", "multiply"]
+    assert all(tool.pure for tool in tools)
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+def multiply(a: int, b: int) -> int:
+    """Multiplies two numbers."""
+    return a * b
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Counts the schemas rendered, per tool."""
+    counts = {}
+    render = _render.RENDERERS["signature"]
+
+    def counting(tool):
+        counts[tool.name] = counts.get(tool.name, 0) + 1
+        return render(tool)
+
+    monkeypatch.setitem(_render.RENDERERS, "signature", counting)
+    return counts
+
+
+def test_prompts_are_reused_until_a_tool_is_added(renders):
+    toolkit = ToolKit(tools=[add])
+    template = "Tools:\n%s"
+    prompt = toolkit.render_prompt(template, style="signature")
+    fingerprint = toolkit.fingerprint
+    assert toolkit.render_prompt(template, style="signature") is prompt
+    assert toolkit.render_schemas(style="signature") in prompt
+    assert toolkit.render_prompt(template, ["add"], style="signature") == prompt
+    assert renders == {"add": 1}
+
+    toolkit.register(multiply)
+    rebuilt = toolkit.render_prompt(template, style="signature")
+    assert "multiply(a: int, b: int)" in rebuilt and "add(a: int" in rebuilt
+    assert toolkit.fingerprint != fingerprint
+    assert toolkit.render_prompt(template, style="signature") is rebuilt
+    assert renders == {"add": 2, "multiply": 1}
+    assert [schema["name"] for schema in toolkit.tools_schemas()] == [
+        "add",
+        "multiply",
+    ]
+
+
+def test_prompts_are_cached_per_template_and_style(renders):
+    toolkit = ToolKit(tools=[add])
+    first = toolkit.render_prompt("A %s", style="signature")
+    second = toolkit.render_prompt("B %s", style="signature")
+    assert first == "A " + second[len("B ") :]
+    assert toolkit.render_prompt("A %s", style="json") != first
+    assert renders == {"add": 1}
+
+
+def test_agents_share_the_cached_prompt():
+    toolkit = ToolKit(tools=[add])
+    client = ScriptedClient(["done"])
+    first = ToolAgent(client=client, model="scripted", toolkit=toolkit)
+    second = ToolAgent(client=client, model="scripted", toolkit=toolkit)
+    assert first.system_message is second.system_message
+    toolkit.register(multiply)
+    third = ToolAgent(client=client, model="scripted", toolkit=toolkit)
+    assert '"name": "multiply"' in third.system_message
+    assert '"name": "multiply"' not in first.system_message
@@ -0,0 +1,213 @@
+import asyncio
+import io
+import json
+
+import pytest
+from scripted_client import AsyncScriptedClient, ScriptedClient
+
+from agentic.planning import AsyncPlanningAgent, PlanningAgent
+from tool import (
+    JsonLinesExporter,
+    LatencyHistogram,
+    Tracer,
+    get_tracer,
+    set_tracer,
+    span,
+)
+from tool._trace import NOOP_SPAN
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.started = []
+        self.ended = []
+
+    def on_start(self, span):
+        self.started.append(span)
+
+    def on_end(self, span):
+        self.ended.append(span)
+
+    def tree(self, parent_id=None):
+        """The (name, children) of the spans under a parent, in start order."""
+        return [
+            (span.name, self.tree(span.span_id))
+            for span in self.started
+            if span.parent_id == parent_id
+        ]
+
+    def find(self, name):
+        return [span for span in self.ended if span.name == name]
+
+
+@pytest.fixture
+def exporter():
+    exporter = MemoryExporter()
+    previous = set_tracer(Tracer([exporter]))
+    yield exporter
+    set_tracer(previous)
+
+
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+
+TURN = (
+    "<tool_calls>\n"
+    '{"name": "add", "arguments": {"a": 1, "b": 2}, "id": 0}\n'
+    '{"name": "add", "arguments": {"a": 3, "b": 4}, "id": 1}\n'
+    "</tool_calls>"
+)
+SCRIPT = [TURN, "<response>done</response>"]
+TOOL = ("tool", [("validate", []), ("execute", [])])
+
+
+def check_run(exporter, result, chat):
+    assert result.completed
+    (run,) = exporter.find("agent.run")
+    assert run.parent_id is None
+    assert run.attributes["status"] == "completed"
+    assert run.attributes["iterations"] == 2
+    assert run.attributes["tokens"] == result.tokens
+    assert {span.trace_id for span in exporter.ended} == {run.trace_id}
+    assert len(exporter.started) == len(exporter.ended)
+    assert [s.attributes["step"] for s in exporter.find("agent.step")] == [0, 1]
+    assert all(s.attributes["tool"] == "add" for s in exporter.find("tool"))
+    assert all(s.error is None and s.duration >= 0 for s in exporter.ended)
+    first, _ = exporter.find(chat)
+    assert first.attributes["model"] == "scripted"
+    assert first.attributes["eval_count"] > 0
+    assert "prompt_eval_count" in first.attributes
+    histogram = get_tracer().histograms["add"]
+    assert histogram.count == 2
+    assert get_tracer().latency_report()["add"]["count"] == 2
+
+
+def test_span_tree_of_a_run(exporter):
+    agent = PlanningAgent(
+        client=ScriptedClient(SCRIPT), model="scripted", toolkit=[add], max_workers=2
+    )
+    result = agent.run("Add.")
+    # Tool spans started in worker threads still nest under their step.
+    assert exporter.tree() == [
+        (
+            "agent.run",
+            [
+                (
+                    "agent.step",
+                    [
+                        ("llm.chat", []),
+                        ("parse", []),
+                        TOOL,
+                        TOOL,
+                        ("tools.wait", []),
+                    ],
+                ),
+                ("agent.step", [("llm.chat", []), ("parse", [])]),
+            ],
+        )
+    ]
+    check_run(exporter, result, "llm.chat")
+    parse = exporter.find("parse")[0]
+    assert parse.attributes == {"length": len(TURN), "calls": 2, "repairs": 0}
+
+
+def test_span_tree_of_a_streamed_run(exporter):
+    agent = PlanningAgent(
+        client=ScriptedClient(SCRIPT),
+        model="scripted",
+        toolkit=[add],
+        max_workers=2,
+        stream=True,
+    )
+    result = agent.run("Add.")
+    # Calls are dispatched while the response streams in.
+    assert exporter.tree() == [
+        (
+            "agent.run",
+            [
+                ("agent.step", [("llm.stream", [TOOL, TOOL]), ("tools.wait", [])]),
+                ("agent.step", [("llm.stream", [])]),
+            ],
+        )
+    ]
+    check_run(exporter, result, "llm.stream")
+    assert [s.attributes["tool_calls"] for s in exporter.find("llm.stream")] == [2, 0]
+
+
+def test_span_tree_of_an_async_run(exporter):
+    agent = AsyncPlanningAgent(
+        client=AsyncScriptedClient(SCRIPT), model="scripted", toolkit=[add]
+    )
+    result = asyncio.run(agent.run("Add."))
+    ((name, (step, final)),) = exporter.tree()
+    assert name == "agent.run"
+    assert step[0] == "agent.step" and step[1].count(TOOL) == 2
+    assert final == ("agent.step", [("llm.chat", []), ("parse", [])])
+    check_run(exporter, result, "llm.chat")
+
+
+def test_spans_record_escaping_errors(exporter):
+    with pytest.raises(KeyError):
+        with span("outer", user="u") as outer:
+            with span("inner") as inner:
+                outer.set(attempt=1)
+                raise KeyError("boom")
+    assert [s.name for s in exporter.ended] == ["inner", "outer"]
+    assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id
+    assert inner.error == outer.error == "KeyError('boom')"
+    assert outer.attributes == {"user": "u", "attempt": 1}
+    assert outer.end_time >= outer.start_time
+    with span("sibling") as sibling:
+        pass
+    assert sibling.parent_id is None and sibling.trace_id != outer.trace_id
+
+
+def test_span_is_a_noop_without_tracer():
+    previous = set_tracer(None)
+    try:
+        with span("ignored") as ignored:
+            ignored.set(a=1)
+            ignored.record_response({"eval_count": 1})
+        assert ignored is NOOP_SPAN
+    finally:
+        set_tracer(previous)
+
+
+def test_json_lines_exporter():
+    file = io.StringIO()
+    tracer = Tracer([JsonLinesExporter(file)])
+    with tracer.span("outer"):
+        with tracer.span("tool", tool="add", value=object()):
+            pass
+    inner, outer = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert (inner["name"], outer["name"]) == ("tool", "outer")
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["attributes"]["value"].startswith("<object object")
+    assert tracer.histograms["add"].count == 1
+
+
+def test_histogram_buckets():
+    histogram = LatencyHistogram(bounds=(1, 10, 100))
+    for value in (0.5, 1, 1.5, 10, 50, 100, 1000):
+        histogram.observe(value)
+    # A bucket holds the values up to and including its bound; the last overflows.
+    assert histogram.counts == [2, 2, 2, 1]
+    assert (histogram.count, histogram.min, histogram.max) == (7, 0.5, 1000)
+    assert histogram.mean == pytest.approx(1163 / 7)
+    assert histogram.quantile(0.25) == 1
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(0.8) == 100
+    assert histogram.quantile(1) == 1000
+    report = histogram.to_dict()
+    assert (report["p50"], report["p99"]) == (10, 1000)
+
+
+def test_histogram_quantiles_are_capped_by_the_largest_value():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) == 0.0
+    assert histogram.to_dict()["min"] == 0.0
+    histogram.observe(3)
+    assert histogram.quantile(0.99) == 3
+    assert histogram.counts[LatencyHistogram.BOUNDS.index(5)] == 1